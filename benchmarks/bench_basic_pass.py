@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from minesweeper_env import MinesweeperEnv
+from minesweeper_solver import MinesweeperSolver
+
+
+def loop_pass(solver: MinesweeperSolver, board: np.ndarray):
+    # the per-number python loop the vectorized pass replaced
+    safe_cells = []
+    mine_cells = []
+    for row, col in np.argwhere((board >= 0) & (board <= 8)):
+        unrevealed = []
+        flagged_count = 0
+        for nr, nc in solver.get_neighbours(row, col):
+            if (nr, nc) in solver.flagged or board[nr, nc] == 9:
+                flagged_count += 1
+            elif board[nr, nc] == -1:
+                unrevealed.append((nr, nc))
+        remaining = board[row, col] - flagged_count
+        if flagged_count == board[row, col] and unrevealed:
+            safe_cells.extend(unrevealed)
+        elif remaining > 0 and len(unrevealed) == remaining:
+            mine_cells.extend(unrevealed)
+    return safe_cells, mine_cells
+
+
+def midgame_board(rows: int, cols: int, mines: int, clicks: int, seed: int = 0) -> np.ndarray:
+    env = MinesweeperEnv(rows, cols, mines, seed=seed)
+    rng = np.random.default_rng(seed)
+    env.click_cell(rows // 2, cols // 2)
+    for row, col in rng.integers(0, (rows, cols), size=(clicks, 2)):
+        if env.game_over:
+            break
+        if (int(row), int(col)) not in env.mine_positions:
+            env.click_cell(int(row), int(col))
+    return env.board_state()
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    for rows, cols, mines, clicks, repeat in [(16, 30, 99, 30, 200), (500, 500, 40000, 3000, 3)]:
+        board = midgame_board(rows, cols, mines, clicks)
+        solver = MinesweeperSolver(rows, cols, mines)
+        loop = timed(lambda: loop_pass(solver, board), repeat)
+        vectorized = timed(lambda: solver._analyze_constraints(board), repeat)
+        revealed = int(np.count_nonzero((board >= 0) & (board <= 8)))
+        print(f"{rows}x{cols} ({revealed} revealed): loop {loop * 1e3:.2f} ms, "
+              f"vectorized {vectorized * 1e3:.2f} ms, {loop / vectorized:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ from minesweeper_ui import MinesweeperGUI
 from minesweeper_browser import open_browser as open_browser_playwright, board_state as board_state_playwright, click_cell as click_cell_playwright, flag_cell as flag_cell_playwright, game_state, start_game as start_game_playwright, restart_game as restart_game_playwright
 from minesweeper_browser_selenium import open_browser as open_browser_selenium, board_state as board_state_selenium, click_cell as click_cell_selenium, flag_cell as flag_cell_selenium, start_game as start_game_selenium, restart_game as restart_game_selenium
 from minesweeper_solver import solve_game_browser, solve_game_simulator
+from minesweeper_env import GameStream
 
 import minesweeper_browser
 import minesweeper_browser_selenium
@@ -153,7 +154,7 @@ def run_browser_mode(site, difficulty, num_games, browser_lib="playwright"):
             playwright.stop()
 
 
-def run_simulated_mode(difficulty, num_games, show_board):
+def run_simulated_mode(difficulty, num_games, show_board, seed=None):
     difficulty_configs = {
         "easy": (9, 9, 10),
         "intermediate": (16, 16, 40),
@@ -164,6 +165,9 @@ def run_simulated_mode(difficulty, num_games, show_board):
 
     print(f"\nTesting solver on simulated environment ({difficulty}, {rows}x{cols}, {mines} mines, {num_games} games)...")
 
+    # a fixed seed replays the exact same sequence of boards, so runs can be compared game-for-game
+    stream = GameStream(seed, (rows, cols, mines))
+
     wins = 0
     total_time = 0
 
@@ -172,7 +176,7 @@ def run_simulated_mode(difficulty, num_games, show_board):
             print(f"\nGame {game_num}/{num_games}", end="", flush=True)
 
         start_time = time.time()
-        won = solve_game_simulator(rows, cols, mines, show_board=show_board)
+        won = solve_game_simulator(rows, cols, mines, show_board=show_board, seed=stream.game_seed(game_num - 1))
         elapsed = time.time() - start_time
 
         if won:
@@ -222,7 +226,7 @@ def run_ui_mode(difficulty="intermediate"):
     gui.run()
 
 
-def run_cmd_mode():
+def run_cmd_mode(seed=None):
     print("Minesweeper Solver")
     print("=" * 50)
 
@@ -261,7 +265,7 @@ def run_cmd_mode():
 
         num_games = int(input("How many games? ").strip() or "100")
         show_board = input("Show board state? (y/n): ").strip().lower() == "y"
-        run_simulated_mode(difficulty, num_games, show_board)
+        run_simulated_mode(difficulty, num_games, show_board, seed)
 
     elif mode == "ui":
         difficulty = input("Difficulty? (easy/intermediate/expert): ").strip().lower()
@@ -279,6 +283,7 @@ def run_cmd_mode():
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Minesweeper Solver')
     parser.add_argument('-m', '--mode', dest='mode', choices=['ui', 'cmd'], help='Mode: ui (default GUI menu), cmd (command-line interface)')
+    parser.add_argument('-s', '--seed', dest='seed', type=int, default=None, help='Seed for reproducible simulated games')
     args = parser.parse_args()
 
     if args.mode == 'ui':
@@ -286,7 +291,7 @@ if __name__ == "__main__":
         run_ui_mode()
     elif args.mode == 'cmd':
         # command line mode
-        run_cmd_mode()
+        run_cmd_mode(args.seed)
     else:
         # default: show menu GUI
         menu = MenuGUI()
@@ -305,7 +310,7 @@ if __name__ == "__main__":
         if mode == "browser":
             run_browser_mode(site, difficulty, num_games, browser_lib)
         elif mode == "simulated":
-            run_simulated_mode(difficulty, num_games, show_board)
+            run_simulated_mode(difficulty, num_games, show_board, args.seed)
         elif mode == "ui":
             run_ui_mode(difficulty)
 
@@ -0,0 +1,271 @@
+import itertools
+import time
+
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from concurrent.futures import Executor
+
+import numpy as np
+
+from minesweeper_probability import (
+    PARALLEL_THRESHOLD,
+    Cell,
+    ComponentCache,
+    Constraint,
+    DeadlineExceeded,
+    FrontierAnalysis,
+    analyze_frontier,
+    split_components,
+)
+from minesweeper_sampling import sample_frontier
+
+try:
+    import pycosat
+except ImportError:  # optional, only the sat backend uses it
+    pycosat = None
+
+try:
+    from ortools.sat.python import cp_model
+except ImportError:  # optional, preferred over pycosat when both are installed
+    cp_model = None
+
+# frontiers above this many cells go to the sat backend when one is installed
+LARGE_FRONTIER = 400
+# seconds one sampling run may take when the caller gives no deadline
+SAMPLING_BUDGET = 1.0
+
+
+def heuristic_probabilities(constraints: List[Constraint]) -> Dict[Cell, float]:
+    # each constraint spreads its remaining mines evenly over its cells; a cell averages what it's told
+    probabilities = defaultdict(lambda: [0, 0])
+
+    for cells, remaining_mines in constraints:
+        if remaining_mines > 0:
+            for key in cells:
+                current = probabilities[key]
+                current[0] += remaining_mines
+                current[1] += len(cells)
+
+    prob_dict = {}
+    for cell, (mine_sum, constraint_sum) in probabilities.items():
+        if constraint_sum > 0:
+            prob_dict[cell] = mine_sum / constraint_sum
+        else:
+            prob_dict[cell] = 0.5
+
+    return prob_dict
+
+
+def _estimated_interior(probabilities: Dict[Cell, float], interior_cells: int, mines_left: int) -> Optional[float]:
+    if not interior_cells:
+        return None
+    return min(1.0, max(0.0, (mines_left - sum(probabilities.values())) / interior_cells))
+
+
+class FrontierBackend:
+    """Frontier inference engine: constraints, interior size and mines left in, a FrontierAnalysis out."""
+
+    name = "base"
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def analyze(self, constraints: List[Constraint], interior_cells: int, mines_left: int,
+                deadline: Optional[float] = None) -> FrontierAnalysis:
+        # deadline is a time.perf_counter() value; past it, return whatever is settled
+        raise NotImplementedError
+
+
+class HeuristicBackend(FrontierBackend):
+    """The old averaging heuristic: instant, never proves anything."""
+
+    name = "heuristic"
+
+    def analyze(self, constraints, interior_cells, mines_left, deadline=None):
+        probabilities = heuristic_probabilities(constraints)
+        return FrontierAnalysis(probabilities, [], [], _estimated_interior(probabilities, interior_cells, mines_left),
+                                exact=False)
+
+
+class SamplingBackend(FrontierBackend):
+    """Metropolis estimates with confidence intervals, for frontiers too big to count; proves nothing."""
+
+    name = "sampling"
+
+    def __init__(self, chains: Optional[int] = None, budget: float = SAMPLING_BUDGET, confidence: float = 0.95,
+                 tolerance: float = 0.02, seed=None):
+        self.chains = chains
+        self.budget = budget
+        self.confidence = confidence
+        self.tolerance = tolerance
+        self.rng = np.random.default_rng(seed)
+
+    def analyze(self, constraints, interior_cells, mines_left, deadline=None):
+        limit = time.perf_counter() + self.budget
+        analysis = sample_frontier(constraints, interior_cells, mines_left, chains=self.chains,
+                                   confidence=self.confidence, tolerance=self.tolerance, seed=self.rng,
+                                   deadline=limit if deadline is None else min(deadline, limit))
+        # running out of its own budget is routine; only the caller's deadline makes the answer partial
+        analysis.timed_out = deadline is not None and time.perf_counter() > deadline
+        return analysis
+
+
+class ExactBackend(FrontierBackend):
+    """Per-component enumeration combined under the global mine count; components over the node budget
+    are sampled instead."""
+
+    name = "exact"
+
+    def __init__(self, max_nodes: Optional[int] = 200000, cache: Optional[ComponentCache] = None,
+                 executor: Optional[Executor] = None, parallel_threshold: int = PARALLEL_THRESHOLD,
+                 sampler: Optional[SamplingBackend] = None):
+        self.max_nodes = max_nodes
+        self.cache = cache
+        self.executor = executor
+        self.parallel_threshold = parallel_threshold
+        self.sampler = SamplingBackend() if sampler is None else sampler
+
+    def analyze(self, constraints, interior_cells, mines_left, deadline=None):
+        sampled = []
+
+        def sample(group):
+            # each component is sampled against the whole interior; the other components' mines are
+            # left out of its count, as the heuristic this replaces left out everything
+            analysis = self.sampler.analyze(group, interior_cells, mines_left, deadline)
+            sampled.append(analysis)
+            return analysis.probabilities
+
+        analysis = analyze_frontier(constraints, interior_cells, mines_left, max_nodes=self.max_nodes,
+                                    fallback=sample, cache=self.cache, executor=self.executor,
+                                    parallel_threshold=self.parallel_threshold, deadline=deadline)
+        if sampled:
+            analysis.stage = self.sampler.name
+            analysis.intervals = {cell: interval for part in sampled for cell, interval in part.intervals.items()}
+            analysis.timed_out = analysis.timed_out or any(part.timed_out for part in sampled)
+        return analysis
+
+
+def _forced_cells(cells: List[Cell], solve: Callable[[Dict[Cell, bool]], Optional[Dict[Cell, bool]]],
+                  deadline: Optional[float] = None):
+    # a cell is forced when only one value was ever seen and asking for the other is unsatisfiable;
+    # every model found along the way clears more cells without a dedicated call
+    first = solve({})
+    if first is None:
+        return None
+    seen_mine = {cell for cell in cells if first[cell]}
+    seen_clear = set(cells) - seen_mine
+    forced = {}
+    for cell in cells:
+        if cell in seen_mine and cell in seen_clear:
+            continue
+        if deadline is not None and time.perf_counter() > deadline:
+            raise DeadlineExceeded()
+        value = cell in seen_mine
+        model = solve({cell: not value})
+        if model is None:
+            forced[cell] = value
+            continue
+        seen_mine.update(c for c in cells if model[c])
+        seen_clear.update(c for c in cells if not model[c])
+    return forced
+
+
+def _pycosat_solver(cells: List[Cell], constraints: List[Constraint]):
+    index = {cell: i + 1 for i, cell in enumerate(cells)}
+    clauses = []
+    for group, value in constraints:
+        if not 0 <= value <= len(group):
+            return lambda assumptions: None
+        variables = [index[cell] for cell in group]
+        # exactly value of the variables: no value+1 of them all mines, no len-value+1 of them all clear
+        clauses.extend([-v for v in subset] for subset in itertools.combinations(variables, value + 1))
+        clauses.extend(list(subset) for subset in itertools.combinations(variables, len(variables) - value + 1))
+
+    def solve(assumptions):
+        units = [[index[cell] if value else -index[cell]] for cell, value in assumptions.items()]
+        model = pycosat.solve(clauses + units)
+        if model == "UNSAT":
+            return None
+        return {cell: model[index[cell] - 1] > 0 for cell in cells}
+
+    return solve
+
+
+def _cp_sat_solver(cells: List[Cell], constraints: List[Constraint]):
+    model = cp_model.CpModel()
+    variables = {cell: model.NewBoolVar(f"{cell[0]}_{cell[1]}") for cell in cells}
+    for group, value in constraints:
+        model.Add(sum(variables[cell] for cell in group) == value)
+
+    def solve(assumptions):
+        model.ClearAssumptions()
+        model.AddAssumptions([variables[cell] if value else variables[cell].Not()
+                              for cell, value in assumptions.items()])
+        solver = cp_model.CpSolver()
+        status = solver.Solve(model)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return None
+        return {cell: bool(solver.Value(variables[cell])) for cell in cells}
+
+    return solve
+
+
+class SatBackend(FrontierBackend):
+    """Proves safe/mine cells with a SAT or CP-SAT solver, one component at a time, using only the local
+    constraints; the cells left unproven are sampled."""
+
+    name = "sat"
+
+    def __init__(self, engine: str = "auto", sampler: Optional[SamplingBackend] = None):
+        if engine == "auto":
+            engine = "cp-sat" if cp_model is not None else "pycosat"
+        self.engine = engine
+        self.sampler = SamplingBackend() if sampler is None else sampler
+
+    @property
+    def available(self) -> bool:
+        return (cp_model if self.engine == "cp-sat" else pycosat) is not None
+
+    def make_solver(self, cells: List[Cell], constraints: List[Constraint]):
+        return (_cp_sat_solver if self.engine == "cp-sat" else _pycosat_solver)(cells, constraints)
+
+    def analyze(self, constraints, interior_cells, mines_left, deadline=None):
+        known = {}
+        timed_out = False
+        for cells, group in split_components(constraints):
+            try:
+                forced = _forced_cells(cells, self.make_solver(cells, group), deadline)
+            except DeadlineExceeded:
+                timed_out = True
+                break
+            if forced:
+                known.update(forced)
+
+        # what's left once the proven cells are filled in goes to the sampler
+        reduced = []
+        for group, value in constraints:
+            rest = tuple(cell for cell in group if cell not in known)
+            if rest:
+                reduced.append((rest, value - sum(known[cell] for cell in group if cell in known)))
+        mines = [cell for cell, is_mine in known.items() if is_mine]
+        analysis = self.sampler.analyze(reduced, interior_cells, mines_left - len(mines), deadline)
+        for cell, is_mine in known.items():
+            analysis.probabilities[cell] = float(is_mine)
+            analysis.intervals[cell] = (float(is_mine), float(is_mine))
+        analysis.safe = [cell for cell, is_mine in known.items() if not is_mine]
+        analysis.mines = mines
+        analysis.timed_out = timed_out or analysis.timed_out
+        return analysis
+
+
+def default_backends(max_nodes: Optional[int] = 200000, cache: Optional[ComponentCache] = None,
+                     executor: Optional[Executor] = None, seed=None) -> List[Tuple[Optional[int], FrontierBackend]]:
+    # (largest frontier it takes, backend); None takes anything
+    sampler = SamplingBackend(seed=seed)
+    exact = ExactBackend(max_nodes, cache, executor, sampler=sampler)
+    sat = SatBackend(sampler=sampler)
+    if sat.available:
+        return [(LARGE_FRONTIER, exact), (None, sat)]
+    return [(None, exact)]
@@ -0,0 +1,158 @@
+import numpy as np
+from typing import Optional, Tuple
+
+from minesweeper_env import neighbour_sum
+
+
+class BatchMinesweeperEnv:
+    """N independent games of the same size stored as stacked (N, rows, cols) arrays."""
+
+    def __init__(self, num_games: int, rows: int, cols: int, mines: int, auto_reset: bool = True, seed: Optional[int] = None):
+        self.num_games = num_games
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.auto_reset = auto_reset
+        self.rng = np.random.default_rng(seed)
+
+        shape = (num_games, rows, cols)
+        self.mine_mask = np.zeros(shape, dtype=bool)
+        self.adjacent_counts = np.zeros(shape, dtype=np.int8)
+        self.revealed = np.zeros(shape, dtype=bool)
+        self.flagged = np.zeros(shape, dtype=bool)
+        self.board = np.full(shape, -1, dtype=np.int8)
+        self.mine_count = np.zeros(num_games, dtype=np.int32)
+        self.mines_placed = np.zeros(num_games, dtype=bool)
+        self.revealed_count = np.zeros(num_games, dtype=np.int32)
+        self.flagged_count = np.zeros(num_games, dtype=np.int32)
+        self.game_over = np.zeros(num_games, dtype=bool)
+        self.won = np.zeros(num_games, dtype=bool)
+
+        self.games_finished = 0
+        self.games_won = 0
+
+    def reset(self, game_idx=None):
+        idx = slice(None) if game_idx is None else np.atleast_1d(game_idx)
+        self.mine_mask[idx] = False
+        self.adjacent_counts[idx] = 0
+        self.revealed[idx] = False
+        self.flagged[idx] = False
+        self.board[idx] = -1
+        self.mine_count[idx] = 0
+        self.mines_placed[idx] = False
+        self.revealed_count[idx] = 0
+        self.flagged_count[idx] = 0
+        self.game_over[idx] = False
+        self.won[idx] = False
+
+    def _place_mines(self, game_idx: np.ndarray, first_rows: np.ndarray, first_cols: np.ndarray):
+        # random keys with the first-click block pushed to the back, then the k smallest keys of
+        # every game become its mines
+        near = (np.abs(np.arange(self.rows)[None, :, None] - first_rows[:, None, None]) <= 1) & \
+               (np.abs(np.arange(self.cols)[None, None, :] - first_cols[:, None, None]) <= 1)
+        keys = self.rng.random((len(game_idx), self.rows, self.cols))
+        keys[near] = 2.0
+
+        counts = np.minimum(self.mines, self.rows * self.cols - near.sum(axis=(1, 2)))
+        mines = np.zeros(keys.shape, dtype=bool)
+        max_count = int(counts.max()) if len(counts) else 0
+        if max_count > 0:
+            flat = keys.reshape(len(game_idx), -1)
+            smallest = np.argpartition(flat, max_count - 1, axis=1)[:, :max_count]
+            smallest = np.take_along_axis(smallest, np.argsort(np.take_along_axis(flat, smallest, axis=1), axis=1), axis=1)
+            keep = np.arange(max_count)[None, :] < counts[:, None]
+            mines.reshape(len(game_idx), -1)[np.nonzero(keep)[0], smallest[keep]] = True
+
+        self.mine_mask[game_idx] = mines
+        self.adjacent_counts[game_idx] = neighbour_sum(mines)
+        self.mine_count[game_idx] = counts
+        self.mines_placed[game_idx] = True
+
+    def _flood(self, game_idx: np.ndarray, frontier: np.ndarray):
+        # grow outward from newly revealed zero cells one ring at a time across all games at once
+        revealed = self.revealed[game_idx]
+        blocked = self.flagged[game_idx]
+        zeros = self.adjacent_counts[game_idx] == 0
+        opened = np.zeros(revealed.shape, dtype=bool)
+        while frontier.any():
+            grow = (neighbour_sum(frontier) > 0) & ~revealed & ~blocked
+            revealed |= grow
+            opened |= grow
+            frontier = grow & zeros
+
+        board = self.board[game_idx]
+        board[opened] = self.adjacent_counts[game_idx][opened]
+        self.board[game_idx] = board
+        self.revealed[game_idx] = revealed
+        self.revealed_count[game_idx] += opened.sum(axis=(1, 2), dtype=np.int32)
+
+    def click_cells(self, game_idx, rows, cols) -> Tuple[np.ndarray, np.ndarray]:
+        game_idx, rows, cols = (np.atleast_1d(np.asarray(a, dtype=np.intp)) for a in np.broadcast_arrays(game_idx, rows, cols))
+
+        active = ~self.game_over[game_idx]
+        game_idx, rows, cols = game_idx[active], rows[active], cols[active]
+
+        unplaced = ~self.mines_placed[game_idx]
+        if unplaced.any():
+            first_games, first = np.unique(game_idx[unplaced], return_index=True)
+            self._place_mines(first_games, rows[unplaced][first], cols[unplaced][first])
+
+        _, unique = np.unique((game_idx * self.rows + rows) * self.cols + cols, return_index=True)
+        game_idx, rows, cols = game_idx[unique], rows[unique], cols[unique]
+        hidden = ~self.revealed[game_idx, rows, cols] & ~self.flagged[game_idx, rows, cols]
+        game_idx, rows, cols = game_idx[hidden], rows[hidden], cols[hidden]
+
+        self.revealed[game_idx, rows, cols] = True
+        np.add.at(self.revealed_count, game_idx, 1)
+
+        hit = self.mine_mask[game_idx, rows, cols]
+        self.board[game_idx[hit], rows[hit], cols[hit]] = 11
+        self.game_over[game_idx[hit]] = True
+
+        safe_games, safe_rows, safe_cols = game_idx[~hit], rows[~hit], cols[~hit]
+        counts = self.adjacent_counts[safe_games, safe_rows, safe_cols]
+        self.board[safe_games, safe_rows, safe_cols] = counts
+
+        zero = (counts == 0) & ~self.game_over[safe_games]
+        if zero.any():
+            flood_games, inverse = np.unique(safe_games[zero], return_inverse=True)
+            frontier = np.zeros((len(flood_games), self.rows, self.cols), dtype=bool)
+            frontier[inverse, safe_rows[zero], safe_cols[zero]] = True
+            self._flood(flood_games, frontier)
+
+        touched = np.unique(game_idx)
+        finished = touched[~self.game_over[touched] & (self.revealed_count[touched] == self.rows * self.cols - self.mine_count[touched])]
+        self.game_over[finished] = True
+        self.won[finished] = True
+
+        won = np.zeros(self.num_games, dtype=bool)
+        done = np.zeros(self.num_games, dtype=bool)
+        ended = touched[self.game_over[touched]]
+        done[ended] = True
+        won[ended] = self.won[ended]
+
+        self.games_finished += len(ended)
+        self.games_won += int(won.sum())
+        if self.auto_reset and len(ended):
+            self.reset(ended)
+
+        return won, done
+
+    def flag_cells(self, game_idx, rows, cols):
+        game_idx, rows, cols = (np.atleast_1d(np.asarray(a, dtype=np.intp)) for a in np.broadcast_arrays(game_idx, rows, cols))
+        _, unique = np.unique((game_idx * self.rows + rows) * self.cols + cols, return_index=True)
+        game_idx, rows, cols = game_idx[unique], rows[unique], cols[unique]
+
+        allowed = ~self.game_over[game_idx] & ~self.revealed[game_idx, rows, cols]
+        game_idx, rows, cols = game_idx[allowed], rows[allowed], cols[allowed]
+
+        flagged = ~self.flagged[game_idx, rows, cols]
+        self.flagged[game_idx, rows, cols] = flagged
+        self.board[game_idx, rows, cols] = np.where(flagged, 9, -1)
+        np.add.at(self.flagged_count, game_idx, np.where(flagged, 1, -1))
+
+    def game_states(self) -> np.ndarray:
+        states = np.full(self.num_games, "playing", dtype=object)
+        states[self.game_over & self.won] = "won"
+        states[self.game_over & ~self.won] = "lost"
+        return states
@@ -0,0 +1,114 @@
+import numpy as np
+from typing import Tuple
+
+# fixed-size header followed by fixed-size records, so board i lives at a computable offset
+CORPUS_MAGIC = b"MSCORPUS"
+CORPUS_VERSION = 1
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("rows", "<u4"),
+    ("cols", "<u4"),
+    ("mines", "<u4"),
+    ("count", "<u8"),
+])
+
+
+def record_dtype(rows: int, cols: int) -> np.dtype:
+    return np.dtype([
+        ("first_row", "<u4"),
+        ("first_col", "<u4"),
+        ("mines", "u1", ((rows * cols + 7) // 8,)),
+    ])
+
+
+class CorpusWriter:
+    """Appends boards to a corpus file batch by batch, so suites never have to sit in memory."""
+
+    def __init__(self, path: str, rows: int, cols: int, mines: int):
+        self.path = path
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.count = 0
+        self.record_dtype = record_dtype(rows, cols)
+        self._file = open(path, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header[0] = (CORPUS_MAGIC, CORPUS_VERSION, self.rows, self.cols, self.mines, self.count)
+        self._file.seek(0)
+        header.tofile(self._file)
+
+    def append(self, mine_masks: np.ndarray, first_clicks: np.ndarray):
+        count = len(mine_masks)
+        records = np.zeros(count, dtype=self.record_dtype)
+        records["first_row"] = first_clicks[:, 0]
+        records["first_col"] = first_clicks[:, 1]
+        records["mines"] = np.packbits(mine_masks.reshape(count, -1), axis=1)
+        self._file.seek(0, 2)
+        records.tofile(self._file)
+        self.count += count
+
+    def close(self):
+        if not self._file.closed:
+            self._write_header()
+            self._file.close()
+
+    def __enter__(self) -> "CorpusWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BoardCorpus:
+    """Memory-mapped, read-only view of a corpus file; boards are unpacked one at a time on access."""
+
+    def __init__(self, path: str):
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header[0]["magic"] != CORPUS_MAGIC or header[0]["version"] != CORPUS_VERSION:
+            raise ValueError(f"{path} is not a minesweeper corpus file")
+
+        header = header[0]
+        self.path = path
+        self.rows = int(header["rows"])
+        self.cols = int(header["cols"])
+        self.mines = int(header["mines"])
+        self.count = int(header["count"])
+        self.records = np.memmap(path, dtype=record_dtype(self.rows, self.cols), mode="r",
+                                 offset=HEADER_DTYPE.itemsize, shape=(self.count,))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def mine_mask(self, index: int) -> np.ndarray:
+        bits = self.records[index]["mines"]
+        return np.unpackbits(bits, count=self.rows * self.cols).view(bool).reshape(self.rows, self.cols)
+
+    def first_click(self, index: int) -> Tuple[int, int]:
+        record = self.records[index]
+        return int(record["first_row"]), int(record["first_col"])
+
+    def batch(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        records = self.records[start:stop]
+        mine_masks = np.unpackbits(records["mines"], axis=1, count=self.rows * self.cols).view(bool)
+        first_clicks = np.stack([records["first_row"], records["first_col"]], axis=1).astype(np.int64)
+        return mine_masks.reshape(len(records), self.rows, self.cols), first_clicks
+
+    def iter_batches(self, batch_size: int = 4096):
+        for start in range(0, self.count, batch_size):
+            yield self.batch(start, min(self.count, start + batch_size))
+
+
+def write_corpus(path: str, mine_masks: np.ndarray, first_clicks: np.ndarray, mines: int):
+    _, rows, cols = mine_masks.shape
+    with CorpusWriter(path, rows, cols, mines) as writer:
+        writer.append(mine_masks, first_clicks)
+
+
+def read_corpus(path: str) -> Tuple[np.ndarray, np.ndarray, int]:
+    corpus = BoardCorpus(path)
+    mine_masks, first_clicks = corpus.batch(0, len(corpus))
+    return mine_masks, first_clicks, corpus.mines
@@ -1,123 +1,558 @@
-import random
 import numpy as np
-from typing import Tuple
+from typing import Callable, List, Optional, Tuple, Union
+
+# popcount of every byte value, for counting set cells in packed bitmaps
+_BYTE_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+def neighbour_sum(mask: np.ndarray) -> np.ndarray:
+    # 3x3 box sum (including the centre) over the last two axes, done as a separable row pass then
+    # column pass on a zero-padded copy, so stacked boards are handled in the same calls
+    rows, cols = mask.shape[-2:]
+    padded = np.zeros(mask.shape[:-2] + (rows + 2, cols + 2), dtype=np.int16)
+    padded[..., 1:-1, 1:-1] = mask
+    across = padded[..., :, :-2] + padded[..., :, 1:-1] + padded[..., :, 2:]
+    return across[..., :-2, :] + across[..., 1:-1, :] + across[..., 2:, :]
+
+
+def label_zero_regions(zero_mask: np.ndarray) -> Tuple[np.ndarray, list]:
+    # 8-connected labelling done over horizontal runs with a union-find, so the python work
+    # scales with the number of runs rather than the number of cells
+    rows, cols = zero_mask.shape
+    labels = np.zeros((rows, cols), dtype=np.int32)
+    runs = []
+    row_runs = []
+    for r in range(rows):
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], zero_mask[r].view(np.int8), [0]))))
+        row_runs.append(list(range(len(runs), len(runs) + len(edges) // 2)))
+        runs.extend((r, int(start), int(end)) for start, end in zip(edges[::2], edges[1::2]))
+
+    parent = list(range(len(runs)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for r in range(1, rows):
+        above, below = row_runs[r - 1], row_runs[r]
+        i = j = 0
+        while i < len(above) and j < len(below):
+            _, a_start, a_end = runs[above[i]]
+            _, b_start, b_end = runs[below[j]]
+            # diagonal contact counts, hence the one cell of slack on each side
+            if a_start <= b_end and b_start <= a_end:
+                root_a, root_b = find(above[i]), find(below[j])
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+            if a_end < b_end:
+                i += 1
+            else:
+                j += 1
+
+    boxes = [None]
+    root_labels = {}
+    for i, (r, start, end) in enumerate(runs):
+        root = find(i)
+        if root not in root_labels:
+            root_labels[root] = len(boxes)
+            boxes.append([r, r + 1, start, end])
+        label = root_labels[root]
+        labels[r, start:end] = label
+        box = boxes[label]
+        box[1] = r + 1
+        box[2] = min(box[2], start)
+        box[3] = max(box[3], end)
+
+    # grow each box by one cell so it also covers the numbered border of the region
+    regions = [None] + [
+        (slice(max(0, r0 - 1), min(rows, r1 + 1)), slice(max(0, c0 - 1), min(cols, c1 + 1)))
+        for r0, r1, c0, c1 in boxes[1:]
+    ]
+    return labels, regions
+
+
+class BitGrid:
+    """Boolean (rows, cols) grid packed eight cells to a byte along each row."""
+
+    def __init__(self, rows: int, cols: int):
+        self.shape = (rows, cols)
+        self.bits = np.zeros((rows, (cols + 7) // 8), dtype=np.uint8)
+
+    def __getitem__(self, key) -> bool:
+        row, col = key
+        return bool(self.bits[row, col >> 3] & (0x80 >> (col & 7)))
+
+    def __setitem__(self, key, value: bool):
+        row, col = key
+        if value:
+            self.bits[row, col >> 3] |= 0x80 >> (col & 7)
+        else:
+            self.bits[row, col >> 3] &= ~(0x80 >> (col & 7)) & 0xFF
+
+    def unpack_rows(self, start: int, stop: int) -> np.ndarray:
+        return np.unpackbits(self.bits[start:stop], axis=1, count=self.shape[1]).view(bool)
+
+    def pack_rows(self, start: int, mask: np.ndarray):
+        self.bits[start:start + len(mask)] = np.packbits(mask, axis=1)
+
+    def count(self) -> int:
+        return int(_BYTE_POPCOUNT[self.bits].sum(dtype=np.int64))
+
+    def __array__(self, dtype=None, copy=None):
+        mask = self.unpack_rows(0, self.shape[0])
+        return mask if dtype is None else mask.astype(dtype)
+
+
+def unpacked_rows(mask, start: int, stop: int) -> np.ndarray:
+    if isinstance(mask, BitGrid):
+        return mask.unpack_rows(start, stop)
+    return mask[start:stop]
+
+
+class MinePositions:
+    """Read-only, set-like view of the mine layout backed by a dense or packed mask."""
+
+    def __init__(self, mask, count: int):
+        self.mask = mask
+        self.count = count
+
+    def __contains__(self, cell) -> bool:
+        row, col = cell
+        rows, cols = self.mask.shape
+        return 0 <= row < rows and 0 <= col < cols and bool(self.mask[row, col])
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        rows, cols = self.mask.shape
+        step = max(1, (1 << 20) // max(1, cols))
+        for start in range(0, rows, step):
+            for r, c in np.argwhere(unpacked_rows(self.mask, start, start + step)):
+                yield (start + int(r), int(c))
 
 
 class MinesweeperEnv:
-    def __init__(self, rows: int, cols: int, mines: int):
+    def __init__(self, rows: int, cols: int, mines: int, readonly_views: bool = False, compact: bool = False, seed=None):
         self.rows = rows
         self.cols = cols
         self.mines = mines
+        # compact mode keeps an int8 board plus bit-packed mine/revealed/flag grids and works out
+        # adjacency on demand, roughly 1.4 bytes per cell in total
+        self.compact = compact
+        # per-env generator so parallel runs and replays don't depend on global random state
+        self.rng = np.random.default_rng(seed)
+        # hand out read-only views of the live board instead of copies; pair with `version`
+        # to tell whether anything changed since the last look
+        self.readonly_views = readonly_views
+        self.version = 0
+        # callbacks receiving the [(row, col, new_value), ...] cells touched by each click/flag
+        self.subscribers = []
+        self._changes = None
+        # undo log of (state before, cell changes) per action, only kept while snapshots are live
+        self._journal = None
+        # set when the layout comes from a corpus that also fixes where the game starts; reset replays it
+        self.first_click = None
+        self._layout = None
         self.reset()
 
     def reset(self):
-        self.mine_positions = set()
-        self.revealed = np.zeros((self.rows, self.cols), dtype=bool)
-        self.flagged = np.zeros((self.rows, self.cols), dtype=bool)
-        self.board = np.full((self.rows, self.cols), -1)
+        if self.compact:
+            self.revealed = BitGrid(self.rows, self.cols)
+            self.flagged = BitGrid(self.rows, self.cols)
+            self.board = np.full((self.rows, self.cols), -1, dtype=np.int8)
+        else:
+            self.revealed = np.zeros((self.rows, self.cols), dtype=bool)
+            self.flagged = np.zeros((self.rows, self.cols), dtype=bool)
+            self.board = np.full((self.rows, self.cols), -1)
+        self._clear_mines()
+        if self._layout is not None:
+            self._set_mine_layout(self._layout)
+        self._journal = None
+        self.revealed_count = 0
+        self.flagged_count = 0
         self.game_over = False
         self.won = False
         self.exploded_mine = None
+        self.mines_shown = False
+        self.version += 1
+
+    def _clear_mines(self):
+        if self.compact:
+            self.mine_mask = BitGrid(self.rows, self.cols)
+            self.adjacent_counts = None
+            self.zero_labels = None
+        else:
+            self.mine_mask = np.zeros((self.rows, self.cols), dtype=bool)
+            self.adjacent_counts = np.zeros((self.rows, self.cols), dtype=np.int8)
+            self.zero_labels = np.zeros((self.rows, self.cols), dtype=np.int32)
+        self.zero_regions = [None]
+        self.mine_positions = MinePositions(self.mine_mask, 0)
+        self.mines_placed = False
+        self.mine_count = self.mines
+
+    def _mine_blocks(self, first_click_row: int, first_click_col: int, block_cells: int = 1 << 20):
+        # mines are drawn in row blocks: a multivariate hypergeometric split of the mine count over
+        # the blocks, then a sample inside each block, so memory stays bounded on giant boards
+        excluded_rows = range(max(0, first_click_row - 1), min(self.rows, first_click_row + 2))
+        excluded_cols = range(max(0, first_click_col - 1), min(self.cols, first_click_col + 2))
+        block_rows = max(1, block_cells // self.cols)
+        starts = range(0, self.rows, block_rows)
+
+        sizes = []
+        for start in starts:
+            stop = min(self.rows, start + block_rows)
+            overlap = max(0, min(stop, excluded_rows.stop) - max(start, excluded_rows.start))
+            sizes.append((stop - start) * self.cols - overlap * len(excluded_cols))
+
+        self.mine_count = min(self.mines, sum(sizes))
+        per_block = self.rng.multivariate_hypergeometric(sizes, self.mine_count) if len(sizes) > 1 else [self.mine_count]
+
+        for start, size, count in zip(starts, sizes, per_block):
+            stop = min(self.rows, start + block_rows)
+            picks = self.rng.choice(size, int(count), replace=False).astype(np.int64)
+            # map indices over the available cells back onto the block, skipping the excluded cells
+            for flat in sorted((r - start) * self.cols + c for r in excluded_rows if start <= r < stop for c in excluded_cols):
+                picks += picks >= flat
+            block = np.zeros((stop - start, self.cols), dtype=bool)
+            block.flat[picks] = True
+            yield start, block
 
     def _place_mines(self, first_click_row: int, first_click_col: int):
-        excluded = set()
-        for r in range(max(0, first_click_row - 1), min(self.rows, first_click_row + 2)):
-            for c in range(max(0, first_click_col - 1), min(self.cols, first_click_col + 2)):
-                excluded.add((r, c))
+        if self.compact:
+            mine_mask = BitGrid(self.rows, self.cols)
+            for start, block in self._mine_blocks(first_click_row, first_click_col):
+                mine_mask.pack_rows(start, block)
+        else:
+            mine_mask = np.zeros((self.rows, self.cols), dtype=bool)
+            for start, block in self._mine_blocks(first_click_row, first_click_col):
+                mine_mask[start:start + len(block)] = block
+        self._set_mine_layout(mine_mask, self.mine_count)
+
+    def _set_mine_layout(self, mine_mask, mine_count: Optional[int] = None):
+        if self.compact and not isinstance(mine_mask, BitGrid):
+            packed = BitGrid(self.rows, self.cols)
+            packed.pack_rows(0, mine_mask)
+            mine_mask = packed
 
-        available = [(r, c) for r in range(self.rows) for c in range(self.cols) if (r, c) not in excluded]
-        self.mine_positions = set(random.sample(available, min(self.mines, len(available))))
+        self.mine_mask = mine_mask
+        if mine_count is None:
+            mine_count = mine_mask.count() if self.compact else int(np.count_nonzero(mine_mask))
+        self.mine_count = mine_count
+
+        if not self.compact:
+            self.adjacent_counts = neighbour_sum(mine_mask).astype(np.int8)
+            self.zero_labels, self.zero_regions = label_zero_regions((self.adjacent_counts == 0) & ~mine_mask)
+
+        self.mine_positions = MinePositions(self.mine_mask, self.mine_count)
+        self.mines_placed = True
+
+    @classmethod
+    def from_corpus(cls, corpus, index: int, **kwargs) -> "MinesweeperEnv":
+        # play a stored layout; the corpus' first click for this board is kept on the env
+        if isinstance(corpus, str):
+            from minesweeper_corpus import BoardCorpus
+            corpus = BoardCorpus(corpus)
+
+        env = cls(corpus.rows, corpus.cols, corpus.mines, **kwargs)
+        env._layout = corpus.mine_mask(index)
+        env._set_mine_layout(env._layout)
+        env.first_click = corpus.first_click(index)
+        return env
 
     def _count_adjacent_mines(self, row: int, col: int) -> int:
+        if self.adjacent_counts is not None:
+            return int(self.adjacent_counts[row, col])
+
         count = 0
         for r in range(max(0, row - 1), min(self.rows, row + 2)):
             for c in range(max(0, col - 1), min(self.cols, col + 2)):
-                if (r, c) in self.mine_positions:
-                    count += 1
+                count += self.mine_mask[r, c]
         return count
 
     def _reveal_cell(self, row: int, col: int):
         if self.revealed[row, col] or self.flagged[row, col]:
             return
 
-        self.revealed[row, col] = True
-
-        if (row, col) in self.mine_positions:
+        if self.mine_mask[row, col]:
+            self.revealed[row, col] = True
+            self.revealed_count += 1
             self.board[row, col] = 11
+            self._record(row, col, 11)
             self.exploded_mine = (row, col)
             self.game_over = True
             self.won = False
+            self.version += 1
             return
 
-        count = self._count_adjacent_mines(row, col)
-        self.board[row, col] = count
+        if self.zero_labels is None:
+            if self._count_adjacent_mines(row, col) == 0:
+                self._flood_fill(row, col)
+                return
+        elif self.zero_labels[row, col]:
+            self._reveal_zero_region(self.zero_labels[row, col], row, col)
+            return
 
-        if count == 0:
-            for r in range(max(0, row - 1), min(self.rows, row + 2)):
-                for c in range(max(0, col - 1), min(self.cols, col + 2)):
-                    if not self.revealed[r, c] and not self.flagged[r, c]:
-                        self._reveal_cell(r, c)
+        self.revealed[row, col] = True
+        self.revealed_count += 1
+        self.board[row, col] = self._count_adjacent_mines(row, col)
+        self._record(row, col, int(self.board[row, col]))
+        self.version += 1
 
-    def click_cell(self, row: int, col: int) -> Tuple[np.ndarray, bool, bool]:
-        if self.game_over:
-            return self.board, False, True
+    def _reveal_zero_region(self, label: int, row: int, col: int):
+        box = self.zero_regions[label]
+        region = self.zero_labels[box] == label
+        revealed = self.revealed[box]
+        flagged = self.flagged[box]
 
-        if not self.mine_positions:
-            self._place_mines(row, col)
+        # a flag or an earlier partial reveal inside the region can cut it apart, so only the
+        # untouched case can be opened wholesale
+        if np.any(region & (revealed | flagged)):
+            self._flood_fill(row, col)
+            return
 
-        if self.flagged[row, col]:
-            return self.board, False, self.game_over
+        opened = (neighbour_sum(region) > 0) & ~revealed & ~flagged
+        revealed |= opened
+        self.revealed_count += int(np.count_nonzero(opened))
+        self.board[box][opened] = self.adjacent_counts[box][opened]
+        if self._changes is not None:
+            rows, cols = np.nonzero(opened)
+            rows += box[0].start
+            cols += box[1].start
+            self._changes.extend(zip(rows.tolist(), cols.tolist(), self.adjacent_counts[rows, cols].tolist()))
+        self.version += 1
 
-        self._reveal_cell(row, col)
+    def _flood_fill(self, row: int, col: int):
+        self.version += 1
+        stack = [(row, col)]
+        while stack:
+            row, col = stack.pop()
+            if self.revealed[row, col] or self.flagged[row, col]:
+                continue
 
-        if not self.game_over:
-            total_cells = self.rows * self.cols
-            revealed_count = np.sum(self.revealed)
-            if revealed_count == total_cells - self.mines:
-                self.game_over = True
-                self.won = True
+            self.revealed[row, col] = True
+            self.revealed_count += 1
+            count = self._count_adjacent_mines(row, col)
+            self.board[row, col] = count
+            self._record(row, col, count)
 
-        return self.board.copy(), self.won, self.game_over
+            if count == 0:
+                for r in range(max(0, row - 1), min(self.rows, row + 2)):
+                    for c in range(max(0, col - 1), min(self.cols, col + 2)):
+                        if not self.revealed[r, c] and not self.flagged[r, c]:
+                            stack.append((r, c))
 
-    def flag_cell(self, row: int, col: int):
-        if self.game_over or self.revealed[row, col]:
-            return
+    def _record(self, row: int, col: int, value: int):
+        if self._changes is not None:
+            self._changes.append((int(row), int(col), value))
 
-        self.flagged[row, col] = not self.flagged[row, col]
-        if self.flagged[row, col]:
-            self.board[row, col] = 9
+    def _start_changes(self, return_changes: bool):
+        if self._journal is not None:
+            self._journal.append((self._scalar_state(), []))
+            self._changes = []
         else:
-            self.board[row, col] = -1
+            self._changes = [] if return_changes or self.subscribers else None
+
+    def _publish_changes(self) -> List[Tuple[int, int, int]]:
+        changes, self._changes = self._changes, None
+        if self._journal is not None:
+            self._journal[-1][1].extend(changes)
+        if changes:
+            for callback in self.subscribers:
+                callback(changes)
+        return changes or []
+
+    def subscribe(self, callback: Callable[[List[Tuple[int, int, int]]], None]):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[List[Tuple[int, int, int]]], None]):
+        self.subscribers.remove(callback)
+
+    def _scalar_state(self) -> tuple:
+        return (self.mines_placed, self.game_over, self.won, self.exploded_mine, self.revealed_count, self.flagged_count,
+                self.mines_shown)
+
+    def snapshot(self) -> int:
+        # cheap marker into the undo log; every action from here on records only the cells it touches
+        if self._journal is None:
+            self._journal = []
+        return len(self._journal)
+
+    def restore(self, token: int):
+        # restoring the outermost snapshot also ends journaling; take a fresh snapshot to search again
+        restored = {}
+        while len(self._journal) > token:
+            state, changes = self._journal.pop()
+            for row, col, value in reversed(changes):
+                # every action starts from a hidden cell, so the old value is either blank or a flag;
+                # revealing mines at the end keeps the flag state, which tells the two apart
+                if value == -1:
+                    old = 9
+                elif value == 10:
+                    old = 9 if self.flagged[row, col] else -1
+                else:
+                    old = -1
+                self.board[row, col] = old
+                self.revealed[row, col] = False
+                self.flagged[row, col] = old == 9
+                restored[row, col] = old
+
+            mines_placed, self.game_over, self.won, self.exploded_mine, self.revealed_count, self.flagged_count, \
+                self.mines_shown = state
+            if not mines_placed and self.mines_placed:
+                self._clear_mines()
+        if token == 0:
+            self.drop_snapshots()
+        self.version += 1
+        # subscribers see the reverted cells like any other change
+        changes = [(int(row), int(col), old) for (row, col), old in restored.items()]
+        if changes:
+            for callback in self.subscribers:
+                callback(changes)
+
+    def drop_snapshots(self):
+        self._journal = None
+
+    def make_move(self, row: int, col: int, flag: bool = False) -> int:
+        token = self.snapshot()
+        if flag:
+            self.flag_cell(row, col)
+        else:
+            self.click_cell(row, col)
+        return token
+
+    def unmake_move(self, token: int):
+        self.restore(token)
+
+    def click_cell(self, row: int, col: int, return_changes: bool = False) -> Union[
+            Tuple[np.ndarray, bool, bool], Tuple[np.ndarray, bool, bool, List[Tuple[int, int, int]]]]:
+        self._start_changes(return_changes)
+
+        if self.game_over:
+            result = (self._board_output(copy=False), False, True)
+        else:
+            if not self.mines_placed:
+                self._place_mines(row, col)
+
+            if self.flagged[row, col]:
+                result = (self._board_output(copy=False), False, self.game_over)
+            else:
+                self._reveal_cell(row, col)
+
+                if not self.game_over and self.safe_remaining == 0:
+                    self.game_over = True
+                    self.won = True
+
+                result = (self._board_output(), self.won, self.game_over)
+
+        changes = self._publish_changes()
+        return result + (changes,) if return_changes else result
+
+    def flag_cell(self, row: int, col: int, return_changes: bool = False) -> Optional[List[Tuple[int, int, int]]]:
+        self._start_changes(return_changes)
+
+        if not self.game_over and not self.revealed[row, col]:
+            self.flagged[row, col] = not self.flagged[row, col]
+            self.version += 1
+            if self.flagged[row, col]:
+                self.flagged_count += 1
+                self.board[row, col] = 9
+            else:
+                self.flagged_count -= 1
+                self.board[row, col] = -1
+            self._record(row, col, int(self.board[row, col]))
+
+        changes = self._publish_changes()
+        if return_changes:
+            return changes
+
+    @property
+    def safe_remaining(self) -> int:
+        return self.rows * self.cols - self.mine_count - self.revealed_count
+
+    def _board_output(self, copy: bool = True) -> np.ndarray:
+        if self.readonly_views:
+            view = self.board.view()
+            view.flags.writeable = False
+            return view
+        return self.board.copy() if copy else self.board
 
     def board_state(self) -> np.ndarray:
-        return self.board.copy()
+        return self._board_output()
+
+    def _row_blocks(self):
+        # packed grids are unpacked a band of rows at a time; dense ones are handled in one go
+        step = max(1, (1 << 20) // self.cols) if self.compact else self.rows
+        for start in range(0, self.rows, step):
+            yield start, min(self.rows, start + step)
+
+    def _record_mask(self, start: int, mask: np.ndarray, value: int):
+        if self._changes is not None:
+            rows, cols = np.nonzero(mask)
+            self._changes.extend((int(r) + start, int(c), value) for r, c in zip(rows, cols))
 
     def reveal_remaining_mines(self):
-        if not self.won:
+        if not self.won or self.mines_shown:
             return
 
-        for row in range(self.rows):
-            for col in range(self.cols):
-                if not self.revealed[row, col] and not self.flagged[row, col]:
-                    if (row, col) in self.mine_positions:
-                        self.flagged[row, col] = True
-                        self.board[row, col] = 9
+        self._start_changes(False)
+        for start, stop in self._row_blocks():
+            flagged = unpacked_rows(self.flagged, start, stop)
+            hidden_mines = unpacked_rows(self.mine_mask, start, stop) & ~unpacked_rows(self.revealed, start, stop) & ~flagged
+            if not hidden_mines.any():
+                continue
+
+            self.board[start:stop][hidden_mines] = 9
+            if self.compact:
+                self.flagged.pack_rows(start, flagged | hidden_mines)
+            else:
+                flagged |= hidden_mines
+            self.flagged_count += int(np.count_nonzero(hidden_mines))
+            self._record_mask(start, hidden_mines, 9)
+
+        self.mines_shown = True
+        self.version += 1
+        self._publish_changes()
 
     def reveal_all_mines(self):
-        if not self.game_over or self.won:
+        if not self.game_over or self.won or self.mines_shown:
             return
 
-        for row in range(self.rows):
-            for col in range(self.cols):
-                if (row, col) in self.mine_positions:
-                    if not self.revealed[row, col]:
-                        if (row, col) == self.exploded_mine:
-                            self.board[row, col] = 11
-                        else:
-                            self.board[row, col] = 10
+        self._start_changes(False)
+        for start, stop in self._row_blocks():
+            # the exploded mine is already revealed and keeps its 11
+            hidden_mines = unpacked_rows(self.mine_mask, start, stop) & ~unpacked_rows(self.revealed, start, stop)
+            self.board[start:stop][hidden_mines] = 10
+            self._record_mask(start, hidden_mines, 10)
+
+        self.mines_shown = True
+        self.version += 1
+        self._publish_changes()
 
     def game_state(self) -> str:
         if self.game_over:
             return "won" if self.won else "lost"
         return "playing"
 
+
+class GameStream:
+    """Deterministic, randomly addressable sequence of seeded games for one (rows, cols, mines) config."""
+
+    def __init__(self, seed: Optional[int], config: Tuple[int, int, int]):
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.rows, self.cols, self.mines = config
+
+    def game_seed(self, index: int) -> np.random.SeedSequence:
+        # same as the index-th child of seed_sequence.spawn(), without having to spawn in order
+        return np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=self.seed_sequence.spawn_key + (index,))
+
+    def env(self, index: int, **kwargs) -> MinesweeperEnv:
+        return MinesweeperEnv(self.rows, self.cols, self.mines, seed=self.game_seed(index), **kwargs)
+
+    def __iter__(self):
+        index = 0
+        while True:
+            yield self.env(index)
+            index += 1
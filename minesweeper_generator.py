@@ -0,0 +1,300 @@
+import numpy as np
+from typing import List, Optional, Tuple
+
+from minesweeper_corpus import CorpusWriter
+from minesweeper_env import neighbour_sum
+
+UNKNOWN, REVEALED, MINE = 0, 1, 2
+
+
+class GenerationFailed(Exception):
+    pass
+
+
+class NoGuessGenerator:
+    """Generates boards that basic and pairwise (subset) deduction can clear from the first click.
+
+    Instead of throwing a stuck board away, a mine is moved between an undecided frontier cell and
+    the unexplored interior. Every known cell remembers the deduction step it became known in, so
+    after a relocation only the steps that could have read a changed number are undone, and only
+    the numbers around what changed are checked again.
+    """
+
+    def __init__(self, rows: int, cols: int, mines: int, seed=None, max_relocations: Optional[int] = None,
+                 max_restarts: int = 100):
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.rng = np.random.default_rng(seed)
+        self.max_relocations = max_relocations if max_relocations is not None else rows * cols
+        # fresh layouts tried before generate gives up on the density
+        self.max_restarts = max_restarts
+        self.stats = {"boards": 0, "relocations": 0, "restarts": 0}
+
+        # flat-index neighbourhoods: the 3x3 a number reads, and the 5x5 its overlapping numbers sit in
+        self._neighbours = []
+        self._partners = []
+        for row in range(rows):
+            for col in range(cols):
+                for reach, table in ((1, self._neighbours), (2, self._partners)):
+                    table.append(tuple(r * cols + c
+                                       for r in range(max(0, row - reach), min(rows, row + reach + 1))
+                                       for c in range(max(0, col - reach), min(cols, col + reach + 1))
+                                       if (r, c) != (row, col)))
+        self._allowed = {}
+
+    def generate(self, first_click: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        first_click = first_click if first_click is not None else (self.rows // 2, self.cols // 2)
+        for _ in range(self.max_restarts + 1):
+            mines = self._make_solvable(self._place_mines(first_click), first_click)
+            if mines is not None:
+                self.stats["boards"] += 1
+                return mines
+            self.stats["restarts"] += 1
+        raise GenerationFailed(f"no solvable {self.rows}x{self.cols} layout with {self.mines} mines "
+                               f"after {self.max_restarts} restarts")
+
+    def generate_many(self, count: int, first_click: Optional[Tuple[int, int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        first_click = first_click if first_click is not None else (self.rows // 2, self.cols // 2)
+        mine_masks = np.stack([self.generate(first_click) for _ in range(count)])
+        first_clicks = np.tile(np.array(first_click, dtype=np.int64), (count, 1))
+        return mine_masks, first_clicks
+
+    def write_corpus(self, path: str, count: int, first_click: Optional[Tuple[int, int]] = None, batch_size: int = 1024):
+        with CorpusWriter(path, self.rows, self.cols, self.mines) as writer:
+            for start in range(0, count, batch_size):
+                writer.append(*self.generate_many(min(batch_size, count - start), first_click))
+
+    def _place_mines(self, first_click: Tuple[int, int]) -> np.ndarray:
+        # uniform over the cells outside the first click's 3x3, like the env's own placement
+        allowed = self._allowed.get(first_click)
+        if allowed is None:
+            start = first_click[0] * self.cols + first_click[1]
+            excluded = set(self._neighbours[start]) | {start}
+            allowed = np.array([i for i in range(self.rows * self.cols) if i not in excluded], dtype=np.int64)
+            self._allowed[first_click] = allowed
+        mines = np.zeros((self.rows, self.cols), dtype=bool)
+        mines.flat[self.rng.choice(allowed, min(self.mines, len(allowed)), replace=False)] = True
+        return mines
+
+    def _make_solvable(self, mines: np.ndarray, first_click: Tuple[int, int]) -> Optional[np.ndarray]:
+        neighbours = self._neighbours
+        self._mine = mine = mines.ravel().astype(np.uint8).tolist()
+        self._count = (neighbour_sum(mines) - mines).ravel().tolist()
+        # per cell: neighbours still unknown, known to be mines, and revealed
+        self._unknown_around = [len(around) for around in neighbours]
+        self._mines_around = [0] * len(mine)
+        self._revealed_around = [0] * len(mine)
+        self._state = bytearray(len(mine))
+        self._known_step = [-1] * len(mine)
+        # per deduction step, the cells it settled and the numbers it read (None: the whole board);
+        # undone steps become None
+        self._steps = []
+        self._queue = set()
+        self._pair_queue = set()
+        self._known_mines = 0
+        self._safe_left = len(mine) - sum(mine)
+
+        self._begin_step(())
+        self._reveal([first_click[0] * self.cols + first_click[1]])
+        relocations = 0
+        while True:
+            if self._deduce():
+                continue
+            if not self._safe_left:
+                return np.array(self._mine, dtype=bool).reshape(self.rows, self.cols)
+            if relocations >= self.max_relocations:
+                return None
+            if not self._relocate():
+                return None
+            relocations += 1
+            self.stats["relocations"] += 1
+
+    def _begin_step(self, reads):
+        self._steps.append(([], reads))
+
+    def _touch(self, cell: int, unknown_delta: int, mine_delta: int, revealed_delta: int):
+        # a cell became known (or unknown again): update the tallies around it and requeue the numbers
+        # that read it
+        state, unknown_around, mines_around = self._state, self._unknown_around, self._mines_around
+        revealed_around = self._revealed_around
+        for other in self._neighbours[cell]:
+            unknown_around[other] += unknown_delta
+            mines_around[other] += mine_delta
+            revealed_around[other] += revealed_delta
+            if state[other] == REVEALED:
+                self._queue.add(other)
+                self._pair_queue.add(other)
+
+    def _reveal(self, cells: List[int]):
+        # reveal plus the usual zero cascade, all part of the current step
+        state, step = self._state, len(self._steps) - 1
+        settled = self._steps[step][0]
+        stack = list(cells)
+        while stack:
+            cell = stack.pop()
+            if state[cell] != UNKNOWN:
+                continue
+            state[cell] = REVEALED
+            self._known_step[cell] = step
+            settled.append(cell)
+            self._safe_left -= 1
+            self._queue.add(cell)
+            self._pair_queue.add(cell)
+            self._touch(cell, -1, 0, 1)
+            if not self._count[cell]:
+                stack.extend(other for other in self._neighbours[cell] if state[other] == UNKNOWN)
+
+    def _flag(self, cells: List[int]):
+        state, step = self._state, len(self._steps) - 1
+        settled = self._steps[step][0]
+        for cell in cells:
+            if state[cell] != UNKNOWN:
+                continue
+            state[cell] = MINE
+            self._known_step[cell] = step
+            settled.append(cell)
+            self._known_mines += 1
+            self._touch(cell, -1, 1, 0)
+
+    def _unknown_cells(self, cell: int) -> List[int]:
+        state = self._state
+        return [other for other in self._neighbours[cell] if state[other] == UNKNOWN]
+
+    def _deduce(self) -> bool:
+        # one step: a single number settling its cells, else one pass of pairwise checks over the numbers
+        # that changed since the last pass, else the global mine count
+        state, unknown_around, mines_around, count = self._state, self._unknown_around, self._mines_around, self._count
+        while self._queue:
+            cell = self._queue.pop()
+            if state[cell] != REVEALED:
+                continue
+            remaining = count[cell] - mines_around[cell]
+            if not unknown_around[cell] or 0 < remaining < unknown_around[cell]:
+                continue
+            self._begin_step((cell,))
+            if remaining:
+                self._flag(self._unknown_cells(cell))
+            else:
+                self._reveal(self._unknown_cells(cell))
+            return True
+
+        safe, mines, reads = self._pairwise()
+        if safe or mines:
+            self._begin_step(tuple(reads))
+            self._flag(mines)
+            self._reveal(safe)
+            return True
+
+        unknown = [cell for cell, value in enumerate(state) if value == UNKNOWN]
+        if not unknown:
+            return False
+        # endgame: the global mine count can settle everything that is left
+        mines_left = self.mines - self._known_mines
+        if mines_left and mines_left != len(unknown):
+            return False
+        self._begin_step(None)
+        if mines_left:
+            self._flag(unknown)
+        else:
+            self._reveal(unknown)
+        return True
+
+    def _pairwise(self) -> Tuple[List[int], List[int], set]:
+        # bounds on how many mines two overlapping constraints can share decide the cells only one of them
+        # sees; a pair can only say something new once one of its two numbers has changed
+        state, unknown_around, mines_around, count = self._state, self._unknown_around, self._mines_around, self._count
+        constraints = {}
+
+        def constraint(cell):
+            if cell not in constraints:
+                constraints[cell] = (frozenset(self._unknown_cells(cell)), count[cell] - mines_around[cell])
+            return constraints[cell]
+
+        safe, mines, reads = set(), set(), set()
+        changed, self._pair_queue = self._pair_queue, set()
+        for a in changed:
+            if state[a] != REVEALED or not unknown_around[a]:
+                continue
+            cells_a, value_a = constraint(a)
+            for b in self._partners[a]:
+                if state[b] != REVEALED or not unknown_around[b]:
+                    continue
+                cells_b, value_b = constraint(b)
+                shared = cells_a & cells_b
+                if not shared:
+                    continue
+                only_a, only_b = cells_a - shared, cells_b - shared
+                most_shared = min(len(shared), value_a, value_b)
+                least_shared = max(0, value_a - len(only_a), value_b - len(only_b))
+                for only, value in ((only_a, value_a), (only_b, value_b)):
+                    if only and value - most_shared == len(only):
+                        mines |= only
+                    elif only and value - least_shared == 0:
+                        safe |= only
+                    else:
+                        continue
+                    reads.update((a, b))
+        return list(safe), list(mines), reads
+
+    def _relocate(self) -> bool:
+        # swap the mine status of an undecided frontier cell with an interior cell; interior cells touch
+        # no revealed number, so only the numbers around the frontier cell change
+        state, mine, neighbours, revealed_around = self._state, self._mine, self._neighbours, self._revealed_around
+        frontier, interior = [], []
+        for cell, value in enumerate(state):
+            if value == UNKNOWN:
+                (frontier if revealed_around[cell] else interior).append(cell)
+
+        for index in self.rng.permutation(len(frontier)):
+            cell = frontier[index]
+            candidates = [other for other in interior if mine[other] != mine[cell]]
+            if not candidates:
+                continue
+            other = candidates[self.rng.integers(len(candidates))]
+
+            mine[cell], mine[other] = mine[other], mine[cell]
+            for moved in (cell, other):
+                delta = 1 if mine[moved] else -1
+                for around in neighbours[moved]:
+                    self._count[around] += delta
+
+            changed = {around for around in neighbours[cell] if state[around] == REVEALED}
+            self._undo_steps_reading(changed)
+            self._queue |= changed
+            self._pair_queue |= changed
+            return True
+        return False
+
+    def _undo_steps_reading(self, changed: set):
+        # a step stands if every number it read kept its value and everything it read around those numbers
+        # was settled by steps that stand; the rest, and whatever they settled, go back to unknown
+        state, known_step, neighbours, steps = self._state, self._known_step, self._neighbours, self._steps
+        undone = set()
+        for step in range(min(known_step[cell] for cell in changed) + 1, len(steps)):
+            entry = steps[step]
+            if entry is None:
+                continue
+            settled, reads = entry
+            if reads is not None and not any(
+                    number in changed or number in undone or any(other in undone for other in neighbours[number])
+                    for number in reads):
+                continue
+            undone.update(settled)
+            steps[step] = None
+
+        for cell in undone:
+            was_mine = state[cell] == MINE
+            if was_mine:
+                self._known_mines -= 1
+            else:
+                self._safe_left += 1
+            state[cell] = UNKNOWN
+            known_step[cell] = -1
+            self._touch(cell, 1, -was_mine, was_mine - 1)
+
+
+def generate_corpus(path: str, rows: int, cols: int, mines: int, count: int, seed=None) -> dict:
+    generator = NoGuessGenerator(rows, cols, mines, seed=seed)
+    generator.write_corpus(path, count)
+    return generator.stats
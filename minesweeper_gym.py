@@ -0,0 +1,215 @@
+import multiprocessing as mp
+import numpy as np
+from multiprocessing import shared_memory
+from typing import Optional
+
+from minesweeper_batch_env import BatchMinesweeperEnv
+from minesweeper_env import MinesweeperEnv
+
+try:
+    import gymnasium as gym
+    from gymnasium import spaces
+except ImportError:  # the wrappers work without gymnasium, just without the space objects
+    gym = None
+    spaces = None
+
+# one int8 plane per revealed number 0-8, then hidden, then flagged
+PLANE_CODES = np.array(list(range(9)) + [-1, 9], dtype=np.int8)
+NUM_PLANES = len(PLANE_CODES)
+
+
+def encode_planes(board: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    # board (..., rows, cols) -> planes (..., NUM_PLANES, rows, cols)
+    planes = board[..., None, :, :] == PLANE_CODES.reshape((NUM_PLANES, 1, 1))
+    if out is None:
+        return planes.view(np.int8)
+    out[...] = planes
+    return out
+
+
+def _spaces(rows: int, cols: int, batch: Optional[int] = None):
+    if spaces is None:
+        return None, None
+    obs_shape = (NUM_PLANES, rows, cols) if batch is None else (batch, NUM_PLANES, rows, cols)
+    observation_space = spaces.Box(0, 1, shape=obs_shape, dtype=np.int8)
+    action_space = spaces.Discrete(rows * cols) if batch is None else spaces.MultiDiscrete([rows * cols] * batch)
+    return observation_space, action_space
+
+
+class MinesweeperGymEnv(gym.Env if gym is not None else object):
+    """Gymnasium-style single game: actions are flat cell indices, observations int8 planes."""
+
+    metadata = {"render_modes": []}
+
+    def __init__(self, rows: int, cols: int, mines: int, seed: Optional[int] = None):
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.observation_space, self.action_space = _spaces(rows, cols)
+        self._seed = seed
+        self.env = None
+        self._obs = np.zeros((NUM_PLANES, rows, cols), dtype=np.int8)
+
+    def reset(self, seed: Optional[int] = None, options: Optional[dict] = None):
+        if seed is not None:
+            self._seed = seed
+        rng = self.env.rng if self.env is not None and seed is None else self._seed
+        self.env = MinesweeperEnv(self.rows, self.cols, self.mines, readonly_views=True, seed=rng)
+        encode_planes(self.env.board, out=self._obs)
+        return self._obs.copy(), {"action_mask": self.action_masks()}
+
+    def action_masks(self) -> np.ndarray:
+        return (self.env.board == -1).reshape(-1)
+
+    def step(self, action: int):
+        row, col = divmod(int(action), self.cols)
+        before = self.env.revealed_count
+        _, won, done, changes = self.env.click_cell(row, col, return_changes=True)
+
+        # only the touched cells need re-encoding
+        for r, c, value in changes:
+            self._obs[:, r, c] = PLANE_CODES == value
+
+        if done:
+            reward = 1.0 if won else -1.0
+        else:
+            reward = (self.env.revealed_count - before) / (self.rows * self.cols - self.env.mine_count)
+        return self._obs.copy(), reward, done, False, {"action_mask": self.action_masks()}
+
+
+class MinesweeperVectorEnv:
+    """Synchronous vector of games stepped together through BatchMinesweeperEnv.
+
+    Finished games are reset inside the same step, so the returned observation of a game that just
+    ended is already its next game's first observation.
+    """
+
+    def __init__(self, num_envs: int, rows: int, cols: int, mines: int, seed: Optional[int] = None):
+        self.num_envs = num_envs
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.single_observation_space, self.single_action_space = _spaces(rows, cols)
+        self.observation_space, self.action_space = _spaces(rows, cols, num_envs)
+        self.batch = BatchMinesweeperEnv(num_envs, rows, cols, mines, auto_reset=True, seed=seed)
+
+    def reset(self, seed: Optional[int] = None, options: Optional[dict] = None):
+        if seed is not None:
+            self.batch.rng = np.random.default_rng(seed)
+        self.batch.reset()
+        return encode_planes(self.batch.board), {"action_mask": self.action_masks()}
+
+    def action_masks(self) -> np.ndarray:
+        return (self.batch.board == -1).reshape(self.num_envs, -1)
+
+    def step(self, actions: np.ndarray, obs_out: Optional[np.ndarray] = None):
+        rows, cols = np.divmod(np.asarray(actions, dtype=np.intp), self.cols)
+        before = self.batch.revealed_count.copy()
+        won, done = self.batch.click_cells(np.arange(self.num_envs), rows, cols)
+
+        safe_cells = self.rows * self.cols - self.batch.mine_count
+        progress = (self.batch.revealed_count - before) / np.maximum(safe_cells, 1)
+        rewards = np.where(done, np.where(won, 1.0, -1.0), progress)
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        return encode_planes(self.batch.board, out=obs_out), rewards, done, truncated, {"action_mask": self.action_masks()}
+
+    def close(self):
+        pass
+
+
+def _subproc_worker(conn, names, num_envs, start, stop, rows, cols, mines, seed):
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    obs, masks, actions, rewards, dones = SubprocMinesweeperVectorEnv._views(blocks, num_envs, rows, cols)
+    env = MinesweeperVectorEnv(stop - start, rows, cols, mines, seed=seed)
+    try:
+        while True:
+            command, seed = conn.recv()
+            if command == "step":
+                _, reward, done, _, info = env.step(actions[start:stop], obs_out=obs[start:stop])
+                rewards[start:stop] = reward
+                dones[start:stop] = done
+                masks[start:stop] = info["action_mask"]
+            elif command == "reset":
+                observation, info = env.reset(seed=seed)
+                obs[start:stop] = observation
+                masks[start:stop] = info["action_mask"]
+            else:
+                break
+            conn.send(True)
+    finally:
+        for block in blocks:
+            block.close()
+
+
+class SubprocMinesweeperVectorEnv:
+    """Vector env split across worker processes that write straight into shared-memory buffers."""
+
+    def __init__(self, num_envs: int, rows: int, cols: int, mines: int, num_workers: Optional[int] = None,
+                 seed: Optional[int] = None):
+        self.num_envs = num_envs
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.single_observation_space, self.single_action_space = _spaces(rows, cols)
+        self.observation_space, self.action_space = _spaces(rows, cols, num_envs)
+
+        num_workers = min(num_envs, num_workers or mp.cpu_count())
+        sizes = [num_envs * NUM_PLANES * rows * cols, num_envs * rows * cols, num_envs * 8, num_envs * 8, num_envs]
+        self._blocks = [shared_memory.SharedMemory(create=True, size=size) for size in sizes]
+        self.obs, self.masks, self.actions, self.rewards, self.dones = self._views(self._blocks, num_envs, rows, cols)
+
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        seeds = np.random.SeedSequence(seed).spawn(num_workers)
+        self._conns = []
+        self._workers = []
+        for i in range(num_workers):
+            parent, child = mp.Pipe()
+            worker = mp.Process(
+                target=_subproc_worker,
+                args=(child, [b.name for b in self._blocks], num_envs, bounds[i], bounds[i + 1], rows, cols, mines, seeds[i]),
+                daemon=True,
+            )
+            worker.start()
+            child.close()
+            self._conns.append(parent)
+            self._workers.append(worker)
+
+    @staticmethod
+    def _views(blocks, num_envs: int, rows: int, cols: int):
+        return (
+            np.ndarray((num_envs, NUM_PLANES, rows, cols), dtype=np.int8, buffer=blocks[0].buf),
+            np.ndarray((num_envs, rows * cols), dtype=bool, buffer=blocks[1].buf),
+            np.ndarray((num_envs,), dtype=np.int64, buffer=blocks[2].buf),
+            np.ndarray((num_envs,), dtype=np.float64, buffer=blocks[3].buf),
+            np.ndarray((num_envs,), dtype=bool, buffer=blocks[4].buf),
+        )
+
+    def _broadcast(self, command: str, seeds=None):
+        for i, conn in enumerate(self._conns):
+            conn.send((command, seeds[i] if seeds is not None else None))
+        for conn in self._conns:
+            conn.recv()
+
+    def reset(self, seed: Optional[int] = None, options: Optional[dict] = None):
+        # one child seed per worker, spawned the same way as in __init__
+        seeds = np.random.SeedSequence(seed).spawn(len(self._conns)) if seed is not None else None
+        self._broadcast("reset", seeds)
+        return self.obs.copy(), {"action_mask": self.masks.copy()}
+
+    def step(self, actions: np.ndarray):
+        self.actions[:] = actions
+        self._broadcast("step")
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        return self.obs.copy(), self.rewards.copy(), self.dones.copy(), truncated, {"action_mask": self.masks.copy()}
+
+    def close(self):
+        for conn in self._conns:
+            conn.send(("close", None))
+        for worker in self._workers:
+            worker.join()
+        self._conns = []
+        self._workers = []
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
@@ -0,0 +1,242 @@
+import argparse
+import os
+
+import numpy as np
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from minesweeper_probability import combine_components, enumerate_component, split_components
+
+# a 5x5 window around a number: the inner 3x3 keeps full cell values (0-8, unknown, flag, other) and the
+# outer ring only unknown / flag / other, since ring numbers have neighbours outside the window; windows
+# are stored in their smallest-encoding orientation, so one entry covers all 8 symmetric copies
+WINDOW = 5
+INNER_STATES = 12
+RING_STATES = 3
+UNKNOWN, FLAG, OTHER = 9, 10, 11
+
+PATTERN_MAGIC = b"MSPATTRN"
+PATTERN_VERSION = 1
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("count", "<u8"),
+])
+RECORD_DTYPE = np.dtype([
+    ("key", "<u8"),
+    ("safe", "<u4"),
+    ("mines", "<u4"),
+])
+
+DEFAULT_PATTERN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "patterns.bin")
+
+
+def _window_weights() -> Tuple[np.ndarray, np.ndarray]:
+    inner = np.zeros((WINDOW, WINDOW), dtype=bool)
+    inner[1:-1, 1:-1] = True
+    weights = np.zeros((WINDOW, WINDOW), dtype=np.int64)
+    radix = np.where(inner, INNER_STATES, RING_STATES)
+    weight = 1
+    for r, c in np.ndindex(WINDOW, WINDOW):
+        weights[r, c] = weight
+        weight *= int(radix[r, c])
+    return weights, inner
+
+
+WINDOW_WEIGHTS, INNER_MASK = _window_weights()
+
+
+# the 8 rotations/reflections of a window, and for each the original cell index at every transformed position
+_TRANSFORMS = [
+    lambda w: w,
+    lambda w: np.rot90(w, 1, axes=(-2, -1)),
+    lambda w: np.rot90(w, 2, axes=(-2, -1)),
+    lambda w: np.rot90(w, 3, axes=(-2, -1)),
+    lambda w: np.flip(w, axis=-1),
+    lambda w: np.rot90(np.flip(w, axis=-1), 1, axes=(-2, -1)),
+    lambda w: np.rot90(np.flip(w, axis=-1), 2, axes=(-2, -1)),
+    lambda w: np.rot90(np.flip(w, axis=-1), 3, axes=(-2, -1)),
+]
+_POSITIONS = np.stack([t(np.arange(WINDOW * WINDOW).reshape(WINDOW, WINDOW)) for t in _TRANSFORMS]).reshape(8, -1)
+
+
+def cell_codes(board: np.ndarray, flagged: np.ndarray) -> np.ndarray:
+    # board codes padded by two cells of "other", so every window around a board cell is in range
+    codes = np.full(board.shape, OTHER, dtype=np.int64)
+    numbers = (board >= 0) & (board <= 8)
+    codes[numbers] = board[numbers]
+    codes[board == -1] = UNKNOWN
+    codes[(board == 9) | flagged] = FLAG
+    return np.pad(codes, 2, constant_values=OTHER)
+
+
+def canonical_windows(codes: np.ndarray, centers: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # windows around the centers, each in whichever of its 8 orientations encodes smallest; returns the
+    # keys, which orientation was used, and the oriented windows
+    offsets = np.arange(WINDOW)
+    rows = centers[:, 0, None, None] + offsets[None, :, None]
+    cols = centers[:, 1, None, None] + offsets[None, None, :]
+    windows = codes[rows, cols]
+    # ring numbers are only "other", their neighbourhoods reach outside the window
+    windows = np.where(INNER_MASK | (windows >= UNKNOWN), windows, OTHER)
+    oriented = np.stack([t(windows) for t in _TRANSFORMS], axis=1)
+    digits = np.where(INNER_MASK, oriented, oriented - UNKNOWN)
+    keys = (digits * WINDOW_WEIGHTS).sum(axis=(2, 3))
+    best = keys.argmin(axis=1)
+    picked = np.arange(len(centers))
+    return keys[picked, best], best, oriented[picked, best]
+
+
+def solve_window(window: np.ndarray) -> Tuple[int, int]:
+    # forced cells using only the inner numbers, whose whole neighbourhood is inside the window
+    constraints = []
+    for r in range(1, WINDOW - 1):
+        for c in range(1, WINDOW - 1):
+            value = window[r, c]
+            if value > 8:
+                continue
+            unknown = []
+            flags = 0
+            for nr in range(r - 1, r + 2):
+                for nc in range(c - 1, c + 2):
+                    if window[nr, nc] == UNKNOWN:
+                        unknown.append((nr, nc))
+                    elif window[nr, nc] == FLAG:
+                        flags += 1
+            if unknown:
+                constraints.append((tuple(unknown), int(value) - flags))
+            elif value != flags:
+                return 0, 0
+
+    solutions = []
+    for cells, group in split_components(constraints):
+        solution = enumerate_component(cells, group)
+        if not solution.counts:
+            return 0, 0
+        solutions.append(solution)
+    analysis = combine_components(solutions, 0, None)
+    safe = sum(1 << (r * WINDOW + c) for r, c in analysis.safe)
+    mines = sum(1 << (r * WINDOW + c) for r, c in analysis.mines)
+    return safe, mines
+
+
+class PatternTable:
+    """Encoded 5x5 window -> forced safe/mine bitmasks, for windows that force anything at all."""
+
+    def __init__(self, entries: Optional[Dict[int, Tuple[int, int]]] = None):
+        self.entries = entries if entries is not None else {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, board: np.ndarray, flagged: np.ndarray, centers: Iterable[Tuple[int, int]]):
+        centers = np.asarray(list(centers), dtype=np.int64).reshape(-1, 2)
+        safe = set()
+        mines = set()
+        if not len(centers) or not self.entries:
+            return safe, mines
+        keys, orientations, _ = canonical_windows(cell_codes(board, flagged), centers)
+        for (row, col), key, orientation in zip(centers.tolist(), keys.tolist(), orientations.tolist()):
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            positions = _POSITIONS[orientation]
+            for mask, found in zip(entry, (safe, mines)):
+                while mask:
+                    bit = mask & -mask
+                    index = int(positions[bit.bit_length() - 1])
+                    found.add((row - 2 + index // WINDOW, col - 2 + index % WINDOW))
+                    mask ^= bit
+        return safe, mines
+
+    def save(self, path: str):
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header[0] = (PATTERN_MAGIC, PATTERN_VERSION, len(self.entries))
+        records = np.zeros(len(self.entries), dtype=RECORD_DTYPE)
+        keys = sorted(self.entries)
+        records["key"] = keys
+        records["safe"] = [self.entries[key][0] for key in keys]
+        records["mines"] = [self.entries[key][1] for key in keys]
+        with open(path, "wb") as f:
+            header.tofile(f)
+            records.tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> "PatternTable":
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header[0]["magic"] != PATTERN_MAGIC or header[0]["version"] != PATTERN_VERSION:
+            raise ValueError(f"{path} is not a minesweeper pattern table")
+        records = np.fromfile(path, dtype=RECORD_DTYPE, count=int(header[0]["count"]), offset=HEADER_DTYPE.itemsize)
+        return cls(dict(zip(records["key"].tolist(), zip(records["safe"].tolist(), records["mines"].tolist()))))
+
+
+_default_table = None
+
+
+def default_pattern_table() -> PatternTable:
+    # loaded once per process; an empty table if the file hasn't been built
+    global _default_table
+    if _default_table is None:
+        if os.path.exists(DEFAULT_PATTERN_PATH):
+            _default_table = PatternTable.load(DEFAULT_PATTERN_PATH)
+        else:
+            _default_table = PatternTable()
+    return _default_table
+
+
+def build_pattern_table(configs: List[Tuple[int, int, int]], games: int, seed=None) -> PatternTable:
+    # record every window the solver meets around a number while self-playing, keep the ones that force
+    from minesweeper_solver import MinesweeperSolver, split_seed
+    from minesweeper_env import MinesweeperEnv
+
+    table = PatternTable()
+    seen = set()
+    root = np.random.SeedSequence(seed)
+    for config, config_seed in zip(configs, root.spawn(len(configs))):
+        for game_seed in config_seed.spawn(games):
+            rows, cols, mines = config
+            env_seed, solver_seed = split_seed(game_seed)
+            env = MinesweeperEnv(rows, cols, mines, seed=env_seed)
+            solver = MinesweeperSolver(rows, cols, mines, seed=solver_seed, pattern_table=PatternTable())
+            env.click_cell(rows // 2, cols // 2)
+            while env.game_state() == "playing":
+                board = env.board_state()
+                solver.observe(board)
+                flagged = solver._flags
+                centers = np.array(sorted(solver._constraints), dtype=np.int64).reshape(-1, 2)
+                keys, _, windows = canonical_windows(cell_codes(board, flagged), centers)
+                for key, window in zip(keys.tolist(), windows):
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    safe, forced = solve_window(window)
+                    if safe or forced:
+                        table.entries[key] = (safe, forced)
+
+                action = solver.get_action(board, "playing")
+                if action is None:
+                    break
+                kind, data = action
+                if kind == "click":
+                    env.click_cell(*data)
+                elif kind == "click_all":
+                    for row, col in data:
+                        if env.game_state() == "playing":
+                            env.click_cell(row, col)
+                else:
+                    for row, col in data:
+                        if (row, col) not in solver.flagged:
+                            env.flag_cell(row, col)
+                            solver.update_flag(row, col, True)
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the solver's local pattern table from self-play")
+    parser.add_argument("output", nargs="?", default=DEFAULT_PATTERN_PATH)
+    parser.add_argument("-g", "--games", type=int, default=50, help="Games per difficulty")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args()
+    table = build_pattern_table([(9, 9, 10), (16, 16, 40), (16, 30, 99)], args.games, args.seed)
+    table.save(args.output)
+    print(f"Wrote {len(table)} patterns to {args.output}")
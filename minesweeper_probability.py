@@ -0,0 +1,631 @@
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional, Tuple
+
+Cell = Tuple[int, int]
+Constraint = Tuple[Tuple[Cell, ...], int]
+
+
+class EnumerationLimitExceeded(Exception):
+    pass
+
+
+class DeadlineExceeded(EnumerationLimitExceeded):
+    pass
+
+
+class ComponentSolution:
+    """Solution counts of one frontier component, bucketed by how many mines the assignment uses."""
+
+    def __init__(self, cells: List[Cell], counts: Dict[int, int], cell_counts: Dict[int, List[int]]):
+        self.cells = cells
+        self.counts = counts
+        self.cell_counts = cell_counts
+
+
+class FrontierAnalysis:
+    """Per-cell mine probabilities for the frontier plus the cells they prove safe or mined."""
+
+    def __init__(self, probabilities: Dict[Cell, float], safe: List[Cell], mines: List[Cell],
+                 interior_probability: Optional[float] = None, exact: bool = True, timed_out: bool = False):
+        self.probabilities = probabilities
+        self.safe = safe
+        self.mines = mines
+        self.interior_probability = interior_probability
+        self.exact = exact
+        self.timed_out = timed_out
+        # which solver stage produced it; the solver fills it in unless the backend already has
+        self.stage = None
+        # (low, high) confidence interval per cell, only for sampled estimates
+        self.intervals = None
+        self.interior_interval = None
+
+
+class LogBinomialTable:
+    """Log-factorials grown on demand, so binomials over big boards never become huge integers."""
+
+    def __init__(self, size: int = 1024):
+        self.log_factorial = np.zeros(1)
+        self._grow(size)
+
+    def _grow(self, n: int):
+        size = max(n + 1, 2 * len(self.log_factorial))
+        self.log_factorial = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, size, dtype=np.float64)))))
+
+    def log_comb(self, n: int, k: int) -> float:
+        if k < 0 or k > n:
+            return -math.inf
+        if n >= len(self.log_factorial):
+            self._grow(n)
+        table = self.log_factorial
+        return float(table[n] - table[k] - table[n - k])
+
+
+# shared by every solver in the process, so the table is built once and only grows
+LOG_BINOMIAL = LogBinomialTable()
+
+
+_SYMMETRIES = [
+    lambda r, c: (r, c), lambda r, c: (r, -c), lambda r, c: (-r, c), lambda r, c: (-r, -c),
+    lambda r, c: (c, r), lambda r, c: (c, -r), lambda r, c: (-c, r), lambda r, c: (-c, -r),
+]
+
+
+def canonical_component(cells: List[Cell], constraints: List[Constraint]):
+    # smallest constraint listing over the 8 rotations/reflections, shifted to the origin; returns that key
+    # and where each cell lands, so solutions can be mapped back to the board
+    best = None
+    for transform in _SYMMETRIES:
+        moved = [transform(*cell) for cell in cells]
+        top = min(r for r, _ in moved)
+        left = min(c for _, c in moved)
+        placed = {cell: (r - top, c - left) for cell, (r, c) in zip(cells, moved)}
+        key = tuple(sorted((tuple(sorted(placed[cell] for cell in group)), value) for group, value in constraints))
+        if best is None or key < best[0]:
+            best = (key, placed)
+    return best
+
+
+class ComponentCache:
+    """LRU map from canonical frontier components to their solution counts, bounded by an estimated size."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @staticmethod
+    def _size(key, entry) -> int:
+        # rough: a few words per key cell and per stored count
+        canonical_cells, counts, cell_counts = entry
+        stored = sum(len(group) for group, _ in key) + len(counts) + len(cell_counts) * len(canonical_cells)
+        return 64 * (stored + len(canonical_cells)) + 256
+
+    def get(self, cells: List[Cell], constraints: List[Constraint]) -> Optional[ComponentSolution]:
+        key, placed = canonical_component(cells, constraints)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        back = {spot: cell for cell, spot in placed.items()}
+        canonical_cells, counts, cell_counts = entry
+        return ComponentSolution([back[spot] for spot in canonical_cells], counts, cell_counts)
+
+    def put(self, constraints: List[Constraint], solution: ComponentSolution):
+        key, placed = canonical_component(solution.cells, constraints)
+        if key in self.entries:
+            return
+        entry = ([placed[cell] for cell in solution.cells], solution.counts, solution.cell_counts)
+        size = self._size(key, entry)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = entry
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            old_key, old_entry = self.entries.popitem(last=False)
+            self.bytes -= self._size(old_key, old_entry)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def save(self, path: Optional[str] = None):
+        # plain JSON, so loading a cache file never runs code; json keys must be strings, so the count
+        # dicts go out as [mines, value] pairs
+        path = path or self.path
+        items = [[key, canonical_cells, [[k, int(n)] for k, n in counts.items()],
+                  [[k, [int(n) for n in per_cell]] for k, per_cell in cell_counts.items()]]
+                 for key, (canonical_cells, counts, cell_counts) in self.entries.items()]
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(items, f)
+        os.replace(tmp, path)
+
+    def load(self, path: Optional[str] = None):
+        with open(path or self.path) as f:
+            items = json.load(f)
+        for key, canonical_cells, counts, cell_counts in items:
+            key = tuple((tuple(tuple(cell) for cell in group), value) for group, value in key)
+            entry = ([tuple(cell) for cell in canonical_cells], {k: n for k, n in counts},
+                     {k: per_cell for k, per_cell in cell_counts})
+            if key not in self.entries:
+                self.entries[key] = entry
+                self.bytes += self._size(key, entry)
+        while self.bytes > self.max_bytes:
+            old_key, old_entry = self.entries.popitem(last=False)
+            self.bytes -= self._size(old_key, old_entry)
+
+
+# shared across solvers, so shapes seen in one game are free in the next
+COMPONENT_CACHE = ComponentCache()
+
+
+def split_components(constraints: List[Constraint]) -> List[Tuple[List[Cell], List[Constraint]]]:
+    # constraints that share an unknown cell end up in the same component
+    parent = {}
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for cells, _ in constraints:
+        for cell in cells:
+            parent.setdefault(cell, cell)
+        root = find(cells[0])
+        for cell in cells[1:]:
+            other = find(cell)
+            if other != root:
+                parent[other] = root
+
+    grouped = defaultdict(list)
+    for constraint in constraints:
+        grouped[find(constraint[0][0])].append(constraint)
+
+    components = []
+    for group in grouped.values():
+        cells = sorted({cell for cells, _ in group for cell in cells})
+        components.append((cells, group))
+    return components
+
+
+def subset_deductions(constraints: List[Constraint], deadline: Optional[float] = None) -> Tuple[set, set]:
+    # for two overlapping constraints A and B, the shared cells can hold at most min(a, |A & B|) and at
+    # least a - |A - B| mines, which bounds what is left for the cells only B sees (the 1-2 patterns)
+    safe = set()
+    mines = set()
+    sets = []
+    by_cell = defaultdict(list)
+    for i, (cells, value) in enumerate(constraints):
+        if deadline is not None and time.perf_counter() > deadline:
+            return safe, mines
+        sets.append((frozenset(cells), value))
+        for cell in cells:
+            by_cell[cell].append(i)
+
+    for i, (a_cells, a_value) in enumerate(sets):
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+        for j in {j for cell in a_cells for j in by_cell[cell] if j != i}:
+            b_cells, b_value = sets[j]
+            shared = len(a_cells & b_cells)
+            only_b = b_cells - a_cells
+            if not only_b:
+                continue
+            if b_value - min(a_value, shared) == len(only_b):
+                mines |= only_b
+            elif b_value - max(0, a_value - len(a_cells) + shared) == 0:
+                safe |= only_b
+    return safe, mines
+
+
+def _eliminate(rows: List[Tuple[Dict[int, int], int]], deadline: Optional[float] = None) -> List[Tuple[Dict[int, int], int]]:
+    # fraction-free gaussian elimination on sparse integer rows {column: coefficient}, rhs
+    # rows are only ever read, each step builds new ones
+    rows = [(row, rhs) for row, rhs in rows if row]
+    reduced = []
+    while rows:
+        if deadline is not None and time.perf_counter() > deadline:
+            raise DeadlineExceeded()
+        row, rhs = rows.pop()
+        if not row:
+            continue
+        col = min(row)
+        pivot = row[col]
+        remaining = []
+        for other, other_rhs in rows + reduced:
+            factor = other.get(col)
+            if not factor:
+                remaining.append((other, other_rhs))
+                continue
+            combined = {k: v * pivot for k, v in other.items()}
+            for k, v in row.items():
+                combined[k] = combined.get(k, 0) - v * factor
+            combined = {k: v for k, v in combined.items() if v}
+            combined_rhs = other_rhs * pivot - rhs * factor
+            divisor = math.gcd(combined_rhs, *combined.values()) if combined else abs(combined_rhs) or 1
+            remaining.append(({k: v // divisor for k, v in combined.items()}, combined_rhs // divisor))
+        split = len(rows)
+        rows = [entry for entry in remaining[:split] if entry[0]]
+        reduced = [entry for entry in remaining[split:] if entry[0]]
+        reduced.append((row, rhs))
+    return reduced
+
+
+def linear_deductions(constraints: List[Constraint], deadline: Optional[float] = None) -> Tuple[set, set]:
+    # reduce the frontier's constraint matrix, then bound-check each row: with 0/1 unknowns a row whose
+    # right-hand side equals its smallest or largest possible sum fixes every cell in it
+    def expired():
+        return deadline is not None and time.perf_counter() > deadline
+
+    seen = set()
+    for group, _ in constraints:
+        if expired():
+            return set(), set()
+        seen.update(group)
+    cells = sorted(seen)
+    if expired():
+        return set(), set()
+    index = {cell: i for i, cell in enumerate(cells)}
+    rows = []
+    for group, value in constraints:
+        if expired():
+            return set(), set()
+        rows.append(({index[cell]: 1 for cell in group}, value))
+    known = {}
+
+    progress = True
+    while progress and rows:
+        progress = False
+        try:
+            reduced = _eliminate(rows, deadline)
+        except DeadlineExceeded:
+            break
+        for row, rhs in reduced:
+            low = sum(v for v in row.values() if v < 0)
+            high = sum(v for v in row.values() if v > 0)
+            if rhs == low:
+                fixed = {k: int(v < 0) for k, v in row.items()}
+            elif rhs == high:
+                fixed = {k: int(v > 0) for k, v in row.items()}
+            else:
+                continue
+            known.update(fixed)
+            progress = True
+        if progress:
+            # substitute what was fixed and go again
+            substituted = []
+            for row, rhs in rows:
+                rhs -= sum(v * known[k] for k, v in row.items() if k in known)
+                row = {k: v for k, v in row.items() if k not in known}
+                if row:
+                    substituted.append((row, rhs))
+            rows = substituted
+
+    safe = {cells[k] for k, value in known.items() if value == 0}
+    mines = {cells[k] for k, value in known.items() if value == 1}
+    return safe, mines
+
+
+def reduce_frontier(constraints: List[Constraint], deadline: Optional[float] = None) -> Tuple[List[Cell], List[Cell]]:
+    safe, mines = subset_deductions(constraints, deadline)
+    if not safe and not mines and (deadline is None or time.perf_counter() <= deadline):
+        safe, mines = linear_deductions(constraints, deadline)
+    return sorted(safe), sorted(mines)
+
+
+def enumerate_component(cells: List[Cell], constraints: List[Constraint], max_nodes: Optional[int] = None,
+                        deadline: Optional[float] = None) -> ComponentSolution:
+    index = {cell: i for i, cell in enumerate(cells)}
+    cons_vars = [[index[cell] for cell in group] for group, _ in constraints]
+    cons_value = [value for _, value in constraints]
+    var_cons = [[] for _ in cells]
+    for c, variables in enumerate(cons_vars):
+        for v in variables:
+            var_cons[v].append(c)
+
+    # breadth-first over the constraint graph, so constraints close (and prune) as early as possible
+    order = []
+    seen = [False] * len(cells)
+    for start in range(len(cells)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        queue = [start]
+        while queue:
+            v = queue.pop(0)
+            order.append(v)
+            for c in var_cons[v]:
+                for other in cons_vars[c]:
+                    if not seen[other]:
+                        seen[other] = True
+                        queue.append(other)
+
+    cons_sum = [0] * len(constraints)
+    cons_left = [len(variables) for variables in cons_vars]
+    counts = defaultdict(int)
+    cell_counts = {}
+    mine_stack = []
+    nodes = 0
+
+    def fits(v: int) -> bool:
+        for c in var_cons[v]:
+            if cons_sum[c] > cons_value[c] or cons_sum[c] + cons_left[c] < cons_value[c]:
+                return False
+        return True
+
+    # depth-first with an explicit stack, components can be far deeper than the recursion limit. phase[d] is
+    # what's left to do at depth d: 0 try the cell clear, 1 try it as a mine, 2 undo it and back up
+    phase = [0] * (len(order) + 1)
+    depth = 0
+    while depth >= 0:
+        if depth == len(order):
+            k = len(mine_stack)
+            counts[k] += 1
+            per_cell = cell_counts.get(k)
+            if per_cell is None:
+                per_cell = cell_counts[k] = [0] * len(cells)
+            for v in mine_stack:
+                per_cell[v] += 1
+            depth -= 1
+            continue
+
+        v = order[depth]
+        if phase[depth] == 0:
+            nodes += 1
+            if max_nodes is not None and nodes > max_nodes:
+                raise EnumerationLimitExceeded()
+            if deadline is not None and not nodes & 1023 and time.perf_counter() > deadline:
+                raise DeadlineExceeded()
+            for c in var_cons[v]:
+                cons_left[c] -= 1
+            phase[depth] = 1
+            if fits(v):
+                depth += 1
+                phase[depth] = 0
+        elif phase[depth] == 1:
+            for c in var_cons[v]:
+                cons_sum[c] += 1
+            mine_stack.append(v)
+            phase[depth] = 2
+            if fits(v):
+                depth += 1
+                phase[depth] = 0
+        else:
+            mine_stack.pop()
+            for c in var_cons[v]:
+                cons_sum[c] -= 1
+                cons_left[c] += 1
+            depth -= 1
+
+    return ComponentSolution(cells, dict(counts), cell_counts)
+
+
+def _convolve(left: Dict[int, int], right: Dict[int, int]) -> Dict[int, int]:
+    result = defaultdict(int)
+    for a, x in left.items():
+        for b, y in right.items():
+            result[a + b] += x * y
+    return dict(result)
+
+
+def combine_components(solutions: List[ComponentSolution], interior_cells: int, mines_left: Optional[int],
+                       table: Optional[LogBinomialTable] = None) -> FrontierAnalysis:
+    table = LOG_BINOMIAL if table is None else table
+
+    # scale each component by its largest count; the scale cancels out of every ratio below
+    peaks = [max(solution.counts.values()) for solution in solutions]
+    scaled = [{k: count / peak for k, count in solution.counts.items()} for solution, peak in zip(solutions, peaks)]
+
+    prefix = [{0: 1.0}]
+    for counts in scaled:
+        prefix.append(_convolve(prefix[-1], counts))
+    suffix = [{0: 1.0}]
+    for counts in reversed(scaled):
+        suffix.append(_convolve(suffix[-1], counts))
+    suffix.reverse()
+    full = prefix[-1]
+
+    # an assignment using k frontier mines leaves C(interior, mines_left - k) ways to fill the interior
+    log_weight = {}
+    if mines_left is not None:
+        log_weight = {k: table.log_comb(interior_cells, mines_left - k) for k in full
+                      if 0 <= mines_left - k <= interior_cells}
+    use_global = bool(log_weight)
+    if use_global:
+        top = max(log_weight.values())
+        weight = {k: math.exp(value - top) for k, value in log_weight.items()}
+    else:
+        # the mine count can't be met (unknown total, or a board that isn't a real game): fall back to
+        # treating every consistent frontier assignment as equally likely
+        weight = dict.fromkeys(full, 1.0)
+    total = sum(count * weight.get(k, 0.0) for k, count in full.items())
+
+    probabilities = {}
+    safe = []
+    mines = []
+    for j, (solution, peak) in enumerate(zip(solutions, peaks)):
+        dist = _convolve(prefix[j], suffix[j + 1])
+        mine_weight = [0.0] * len(solution.cells)
+        can_be_mine = [False] * len(solution.cells)
+        can_be_clear = [False] * len(solution.cells)
+        for k, per_cell in solution.cell_counts.items():
+            feasible = [rest for rest in dist if k + rest in weight]
+            if not feasible:
+                continue
+            factor = sum(dist[rest] * weight[k + rest] for rest in feasible) / peak
+            count_k = solution.counts[k]
+            for i, count in enumerate(per_cell):
+                mine_weight[i] += count * factor
+                # certainty is decided on which counts are non-zero, never on the rounded ratio
+                if count:
+                    can_be_mine[i] = True
+                if count < count_k:
+                    can_be_clear[i] = True
+        for i, cell in enumerate(solution.cells):
+            if not can_be_mine[i]:
+                probabilities[cell] = 0.0
+                safe.append(cell)
+            elif not can_be_clear[i]:
+                probabilities[cell] = 1.0
+                mines.append(cell)
+            else:
+                probabilities[cell] = mine_weight[i] / total
+
+    interior_probability = None
+    if use_global and interior_cells:
+        left = [mines_left - k for k in weight]
+        if max(left) == 0:
+            interior_probability = 0.0
+        elif min(left) == interior_cells:
+            interior_probability = 1.0
+        else:
+            expected = sum(full[k] * w * (mines_left - k) for k, w in weight.items())
+            interior_probability = expected / (total * interior_cells)
+    return FrontierAnalysis(probabilities, safe, mines, interior_probability)
+
+
+# components at least this big go to the process pool, when there are two or more of them to overlap
+PARALLEL_THRESHOLD = 40
+
+_pools = {}
+
+
+def frontier_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    # one long-lived pool per worker count, shared by every solver in the process
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
+
+
+def compact_component(cells: List[Cell], constraints: List[Constraint]):
+    # cells become local indices, constraints three flat arrays; the board coordinates never leave
+    index = {cell: i for i, cell in enumerate(cells)}
+    members = np.array([index[cell] for group, _ in constraints for cell in group], dtype=np.int32)
+    sizes = np.array([len(group) for group, _ in constraints], dtype=np.uint8)
+    values = np.array([value for _, value in constraints], dtype=np.int8)
+    return len(cells), members, sizes, values
+
+
+def _enumerate_compact(component, max_nodes: Optional[int], budget: Optional[float] = None):
+    # the budget is seconds from when the worker starts, clocks aren't shared between processes
+    count, members, sizes, values = component
+    groups = np.split(members, np.cumsum(sizes)[:-1])
+    constraints = [(tuple(group.tolist()), int(value)) for group, value in zip(groups, values)]
+    deadline = None if budget is None else time.perf_counter() + budget
+    solution = enumerate_component(list(range(count)), constraints, max_nodes, deadline)
+    return solution.counts, solution.cell_counts
+
+
+def analyze_frontier(constraints: List[Constraint], interior_cells: int, mines_left: int,
+                     max_nodes: Optional[int] = 200000, fallback=None,
+                     cache: Optional[ComponentCache] = None, executor: Optional[Executor] = None,
+                     parallel_threshold: int = PARALLEL_THRESHOLD, deadline: Optional[float] = None) -> FrontierAnalysis:
+    # past the deadline (time.perf_counter() seconds) unfinished components take the fallback too
+    components = split_components(constraints)
+    found = {}
+    for i, (cells, group) in enumerate(components):
+        if deadline is not None and time.perf_counter() > deadline:
+            # the rest go to enumerate_here, which hands them straight to the fallback
+            break
+        solution = cache.get(cells, group) if cache is not None else None
+        if solution is not None:
+            found[i] = solution
+
+    futures = {}
+    if executor is not None:
+        large = [i for i, (cells, _) in enumerate(components) if i not in found and len(cells) >= parallel_threshold]
+        # even a single large one goes out, so the small ones run here meanwhile and the deadline is
+        # enforced on the future rather than left to the enumeration
+        for i in large:
+            budget = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            futures[i] = executor.submit(_enumerate_compact, compact_component(*components[i]), max_nodes, budget)
+
+    timed_out = False
+
+    def settle(i, enumerate_now):
+        nonlocal timed_out
+        cells, group = components[i]
+        try:
+            found[i] = enumerate_now()
+        except EnumerationLimitExceeded as exc:
+            if fallback is None:
+                raise
+            timed_out = timed_out or isinstance(exc, DeadlineExceeded)
+            found[i] = None
+            return
+        if cache is not None:
+            cache.put(group, found[i])
+
+    def enumerate_here(cells, group):
+        if deadline is not None and time.perf_counter() > deadline:
+            raise DeadlineExceeded()
+        return enumerate_component(cells, group, max_nodes, deadline)
+
+    def collect(i, future):
+        timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        try:
+            return ComponentSolution(components[i][0], *future.result(timeout=timeout))
+        except FutureTimeout:
+            future.cancel()
+            raise DeadlineExceeded()
+
+    # small components run here while the pool works on the large ones
+    for i, (cells, group) in enumerate(components):
+        if i not in found and i not in futures:
+            settle(i, lambda: enumerate_here(cells, group))
+    for i, future in futures.items():
+        settle(i, lambda: collect(i, future))
+
+    solutions = []
+    approximate = {}
+    for i, (cells, group) in enumerate(components):
+        solution = found[i]
+        if solution is None:
+            approximate.update(fallback(group))
+        elif solution.counts:
+            solutions.append(solution)
+        elif fallback is not None:
+            # contradictory numbers (a wrong flag, say) leave nothing to enumerate
+            approximate.update(fallback(group))
+
+    if not approximate:
+        return combine_components(solutions, interior_cells, mines_left)
+
+    # components too big to enumerate still soak up their expected share of the mines, but that
+    # share is a guess, so only the local counts may prove a cell safe or mined
+    expected_elsewhere = round(sum(approximate.values()))
+    analysis = combine_components(solutions, interior_cells, mines_left - expected_elsewhere)
+    if deadline is None or time.perf_counter() <= deadline:
+        local = combine_components(solutions, interior_cells, None)
+        analysis.safe = local.safe
+        analysis.mines = local.mines
+    else:
+        # no time left to check what the local counts prove
+        analysis.safe = []
+        analysis.mines = []
+    analysis.exact = False
+    analysis.timed_out = timed_out
+    analysis.probabilities.update(approximate)
+    return analysis
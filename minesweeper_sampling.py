@@ -0,0 +1,282 @@
+import math
+import time
+
+import numpy as np
+
+from collections import defaultdict
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+from minesweeper_probability import LOG_BINOMIAL, Cell, Constraint, FrontierAnalysis, split_components
+
+# chains advanced in lockstep, one column of every array each; big frontiers get fewer, down to
+# MIN_CHAINS, so a sweep stays around CHAIN_CELLS cell updates
+DEFAULT_CHAINS = 1024
+MIN_CHAINS = 64
+CHAIN_CELLS = 1 << 16
+# log-weight lost per mine beyond what the interior can make up
+INFEASIBLE_SLOPE = 10.0
+
+
+def local_density(constraints: List[Constraint]) -> Dict[Cell, float]:
+    # each cell at the average mine density of the numbers around it
+    totals = defaultdict(float)
+    seen = defaultdict(int)
+    for group, value in constraints:
+        for cell in group:
+            totals[cell] += value / len(group)
+            seen[cell] += 1
+    return {cell: min(1.0, max(0.0, total / seen[cell])) for cell, total in totals.items()}
+
+
+class FrontierSampler:
+    """Metropolis chains over frontier mine assignments, all advanced together in numpy arrays.
+
+    Each broken number costs a factor exp(-penalty), which lets chains cross between consistent
+    assignments; only assignments meeting every number of a component are counted for its cells, so the
+    penalty changes how fast the chains mix, not what they estimate. Assignments are weighted by the
+    ways the interior can hold the mines they leave over. With several components, each one's count is
+    judged against the others' unchecked assignments, a slight bias; ExactBackend samples one at a time."""
+
+    def __init__(self, constraints: List[Constraint], interior_cells: int, mines_left: Optional[int],
+                 chains: int = DEFAULT_CHAINS, seed=None):
+        self.interior_cells = interior_cells
+        self.mines_left = mines_left
+        self.chains = chains
+        self.rng = np.random.default_rng(seed)
+
+        # constraints ordered by component, so the per-component check is one reduceat
+        self.components = split_components(constraints)
+        constraints = [constraint for _, group in self.components for constraint in group]
+        self.cells = [cell for cells, _ in self.components for cell in cells]
+        index = {cell: i for i, cell in enumerate(self.cells)}
+        count = len(self.cells)
+        self.cell_component = np.repeat(np.arange(len(self.components)), [len(cells) for cells, _ in self.components])
+        self.component_starts = np.cumsum([0] + [len(group) for _, group in self.components[:-1]])
+
+        # numbers each cell is in, padded with a dummy number nothing is ever checked against
+        groups = [[index[cell] for cell in group] for group, _ in constraints]
+        self.values = np.array([value for _, value in constraints] + [0], dtype=np.int32)
+        self.dummy = len(constraints)
+        members = [[] for _ in range(count)]
+        for c, group in enumerate(groups):
+            for i in group:
+                members[i].append(c)
+        self.membership = np.full((count, max(map(len, members))), self.dummy, dtype=np.int64)
+        for i, m in enumerate(members):
+            self.membership[i, :len(m)] = m
+
+        # colour classes: cells of one class share no number, so their flips touch disjoint sums. Likewise
+        # for the neighbouring pairs a mine can swap between
+        self.classes = [np.array(cells, dtype=np.int64) for cells in _colour_classes([set(m) for m in members])]
+        pairs = sorted({(i, j) for group in groups for i in group for j in group if i < j})
+        self.pair_classes = [np.array(chosen, dtype=np.int64).reshape(-1, 2) for chosen in
+                             _colour_classes([set(members[i]) | set(members[j]) for i, j in pairs], pairs)]
+
+        # log ways to fill the interior once the frontier holds k mines. Counts the interior can't make up
+        # are never recorded and slope steeply back to the ones it can; flat when nothing fits
+        log_weight = np.array([LOG_BINOMIAL.log_comb(interior_cells, mines_left - k) if mines_left is not None
+                               else -math.inf for k in range(count + 1)])
+        self.feasible = np.isfinite(log_weight)
+        if not self.feasible.any():
+            self.feasible[:] = True
+            log_weight[:] = 0.0
+        fits = np.nonzero(self.feasible)[0]
+        floor = log_weight[self.feasible].min()
+        log_weight[:fits[0]] = floor - INFEASIBLE_SLOPE * (fits[0] - np.arange(fits[0]))
+        log_weight[fits[-1] + 1:] = floor - INFEASIBLE_SLOPE * (np.arange(fits[-1] + 1, count + 1) - fits[-1])
+        self.log_weight = log_weight
+
+        # every chain starts from independent draws at each cell's average local density
+        density = local_density(constraints)
+        self.start_density = np.array([density[cell] for cell in self.cells])
+        self.state = self.rng.random((count, chains)) < self.start_density[:, None]
+        self.mines = self.state.sum(axis=0)
+        self.sums = np.zeros((len(self.values), chains), dtype=np.int32)
+        starts = np.cumsum([0] + [len(group) for group in groups[:-1]])
+        self.sums[:-1] = np.add.reduceat(self.state[np.concatenate(groups)], starts, axis=0)
+
+        # per-mine log-odds of the interior weight around the expected frontier count
+        k = int(np.clip(round(self.start_density.sum()), fits[0], max(fits[0], fits[-1] - 1)))
+        self.log_odds = float(self.log_weight[k + 1] - self.log_weight[k]) if k < count else 0.0
+
+        self.mine_counts = np.zeros((count, chains), dtype=np.int64)
+        self.samples = np.zeros((len(self.components), chains), dtype=np.int64)
+
+    def _broken(self, constraints: np.ndarray, current: np.ndarray, moved: np.ndarray) -> np.ndarray:
+        # how much further each chain's sums are from the numbers after the move, per cell
+        target = self.values[constraints][:, :, None]
+        change = np.abs(moved - target) - np.abs(current - target)
+        return np.where((constraints < self.dummy)[:, :, None], change, 0).sum(axis=1)
+
+    def step(self, cells: np.ndarray, penalty: float):
+        # every chain proposes flipping each cell of one colour class. Per cell that is a local Metropolis
+        # test under a fixed per-mine log-odds; the whole move is then accepted on how far the true interior
+        # weight strays from those odds, which keeps the chains on the exact target
+        constraints = self.membership[cells]
+        current = self.sums[constraints]
+        change = np.where(self.state[cells], -1, 1)
+        moved = current + change[:, None, :]
+        energy = self._broken(constraints, current, moved)
+        flip = -self.rng.standard_exponential(change.shape) < self.log_odds * change - penalty * energy
+
+        mines = self.mines + (change * flip).sum(axis=0)
+        correction = self.log_weight[mines] - self.log_weight[self.mines] - self.log_odds * (mines - self.mines)
+        flip &= -self.rng.standard_exponential(self.chains) < correction
+
+        self.sums[constraints] = np.where(flip[:, None, :], moved, current)
+        self.state[cells] ^= flip
+        self.mines += (change * flip).sum(axis=0)
+
+    def swap(self, pairs: np.ndarray, penalty: float):
+        # a mine moves to a neighbour sharing a number with it; the frontier count stays put, so the test is
+        # local only. The second cell's sums already include the first one's change where they share numbers
+        first, second = pairs[:, 0], pairs[:, 1]
+        first_constraints = self.membership[first]
+        second_constraints = self.membership[second]
+        change = np.where(self.state[first], -1, 1) * (self.state[first] != self.state[second])
+        shared = (second_constraints[:, :, None] == first_constraints[:, None, :]).sum(axis=2)
+
+        current = self.sums[first_constraints]
+        moved = current + change[:, None, :]
+        energy = self._broken(first_constraints, current, moved)
+        current = self.sums[second_constraints] + shared[:, :, None] * change[:, None, :]
+        energy += self._broken(second_constraints, current, current - change[:, None, :])
+        # each chain offers each swap only half the time: the moves that break nothing would otherwise be
+        # taken by every chain at once, and chains moving in step understate the intervals
+        offered = (change != 0) & (self.rng.random(change.shape) < 0.5)
+        accept = offered & (-self.rng.standard_exponential(change.shape) < -penalty * energy)
+
+        step = change * accept
+        self.sums[first_constraints] += step[:, None, :]
+        self.sums[second_constraints] -= step[:, None, :]
+        self.state[first] ^= accept
+        self.state[second] ^= accept
+
+    def sweep(self, penalty: float):
+        for cells in self.classes:
+            self.step(cells, penalty)
+        # about one swap offer per cell, counting the half each chain passes up
+        offered = 0
+        for colour in self.rng.permutation(len(self.pair_classes)):
+            if offered >= 2 * len(self.cells):
+                break
+            self.swap(self.pair_classes[colour], penalty)
+            offered += len(self.pair_classes[colour])
+
+    def record(self):
+        broken = np.add.reduceat(self.sums[:-1] != self.values[:-1, None], self.component_starts, axis=0)
+        valid = (broken == 0) & self.feasible[self.mines]
+        self.samples += valid
+        self.mine_counts += self.state & valid[self.cell_component]
+
+    def estimates(self, confidence: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+        # pooled estimate per cell, and a confidence half-width from how the chains' own means spread;
+        # cells of a component no chain has met yet keep their starting density and a half-width of 1
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        samples = self.samples[self.cell_component]
+        used = samples > 0
+        chains = used.sum(axis=1)
+        total = samples.sum(axis=1)
+        probabilities = np.where(total > 0, self.mine_counts.sum(axis=1) / np.maximum(total, 1), self.start_density)
+        means = self.mine_counts / np.maximum(samples, 1)
+        spread = np.where(used, (means - probabilities[:, None]) ** 2, 0.0).sum(axis=1) / np.maximum(chains - 1, 1)
+        half_width = np.where(chains > 1, z * np.sqrt(spread / np.maximum(chains, 1)), 1.0)
+        return probabilities, half_width
+
+    def interior_estimate(self, probabilities: np.ndarray, confidence: float = 0.95) -> Tuple[Optional[float], float]:
+        # whatever the frontier doesn't hold is spread evenly over the interior
+        if not self.interior_cells or self.mines_left is None:
+            return None, 0.0
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        expected = float(np.clip((self.mines_left - probabilities.sum()) / self.interior_cells, 0.0, 1.0))
+        complete = (self.samples > 0).all(axis=0)
+        if complete.sum() < 2:
+            return expected, 1.0
+        frontier = (self.mine_counts[:, complete] / self.samples[self.cell_component][:, complete]).sum(axis=0)
+        return expected, float(z * frontier.std(ddof=1) / math.sqrt(complete.sum()) / self.interior_cells)
+
+
+def _colour_classes(touched: List[set], items: Optional[list] = None) -> List[list]:
+    # greedy colouring: each item takes the first colour none of the numbers it touches has seen yet
+    items = range(len(touched)) if items is None else items
+    seen = defaultdict(set)
+    classes = []
+    for item, numbers in zip(items, touched):
+        taken = set().union(*(seen[c] for c in numbers))
+        colour = 0
+        while colour in taken:
+            colour += 1
+        if colour == len(classes):
+            classes.append([])
+        classes[colour].append(item)
+        for c in numbers:
+            seen[c].add(colour)
+    return classes
+
+
+def _separated(probabilities: np.ndarray, half_width: np.ndarray, tolerance: float) -> bool:
+    # the safest candidate's interval clears every other, or whatever still overlaps it is a tie within tolerance
+    best = probabilities.argmin()
+    rivals = probabilities - half_width <= probabilities[best] + half_width[best]
+    rivals[best] = False
+    return not rivals.any() or bool(half_width[rivals].max() < tolerance and half_width[best] < tolerance)
+
+
+def sample_frontier(constraints: List[Constraint], interior_cells: int, mines_left: Optional[int],
+                    chains: Optional[int] = None, confidence: float = 0.95, tolerance: float = 0.02,
+                    penalty: float = 3.0, burn_in: int = 20, max_sweeps: int = 200, check_every: int = 5,
+                    seed=None, deadline: Optional[float] = None) -> FrontierAnalysis:
+    # sampled probabilities, with analysis.intervals per cell, analysis.interior_interval and how many sweeps
+    # ran in analysis.sweeps. Sampling stops
+    # once the best guess stands apart from the rest at the given confidence, after max_sweeps, or at the
+    # deadline; past the deadline before it starts, every cell keeps its local density and a (0, 1) interval
+    out_of_time = deadline is not None and time.perf_counter() > deadline
+    if not constraints or out_of_time:
+        probabilities = local_density(constraints)
+        interior = None
+        if interior_cells and mines_left is not None:
+            interior = min(1.0, max(0.0, (mines_left - sum(probabilities.values())) / interior_cells))
+        analysis = FrontierAnalysis(probabilities, [], [], interior, exact=False, timed_out=out_of_time)
+        analysis.sweeps = 0
+        analysis.intervals = dict.fromkeys(probabilities, (0.0, 1.0))
+        if interior is not None:
+            analysis.interior_interval = (0.0, 1.0) if probabilities else (interior, interior)
+        return analysis
+
+    if chains is None:
+        cells = len({cell for group, _ in constraints for cell in group})
+        chains = min(DEFAULT_CHAINS, max(MIN_CHAINS, CHAIN_CELLS // cells))
+    sampler = FrontierSampler(constraints, interior_cells, mines_left, chains, seed)
+    timed_out = False
+    sweeps = 0
+    for sweep in range(max_sweeps):
+        if deadline is not None and time.perf_counter() > deadline:
+            timed_out = True
+            break
+        # the penalty ramps up over the burn-in, so chains settle before they are held to every number
+        sampler.sweep(penalty * min(1.0, (sweep + 1) / burn_in))
+        sweeps += 1
+        if sweep < burn_in:
+            continue
+        sampler.record()
+        if (sweep - burn_in) % check_every == check_every - 1:
+            probabilities, half_width = sampler.estimates(confidence)
+            interior, interior_half_width = sampler.interior_estimate(probabilities, confidence)
+            if interior is not None:
+                probabilities = np.append(probabilities, interior)
+                half_width = np.append(half_width, interior_half_width)
+            if _separated(probabilities, half_width, tolerance):
+                break
+
+    probabilities, half_width = sampler.estimates(confidence)
+    interior, interior_half_width = sampler.interior_estimate(probabilities, confidence)
+    analysis = FrontierAnalysis(dict(zip(sampler.cells, probabilities.tolist())), [], [], interior, exact=False,
+                                timed_out=timed_out)
+    analysis.sweeps = sweeps
+    low = np.clip(probabilities - half_width, 0.0, 1.0).tolist()
+    high = np.clip(probabilities + half_width, 0.0, 1.0).tolist()
+    analysis.intervals = dict(zip(sampler.cells, zip(low, high)))
+    if interior is not None:
+        analysis.interior_interval = (max(0.0, interior - interior_half_width), min(1.0, interior + interior_half_width))
+    return analysis
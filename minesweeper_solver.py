@@ -4,16 +4,97 @@ import time
 import numpy as np
 
 from collections import defaultdict
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+from minesweeper_backends import FrontierBackend, HeuristicBackend, default_backends
+from minesweeper_env import neighbour_sum
+from minesweeper_patterns import PatternTable, default_pattern_table
+from minesweeper_probability import COMPONENT_CACHE, ComponentCache, FrontierAnalysis, frontier_pool, reduce_frontier
+
+# pattern windows looked up per call, so a deadline can cut in between
+PATTERN_CHUNK = 2048
+
+def split_seed(seed) -> Tuple[np.random.SeedSequence, int]:
+    # one seed drives a game: a seed sequence for the env and an int for the solver's random.Random
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    env_seed = np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (0,))
+    solver_seed = np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (1,))
+    return env_seed, int(solver_seed.generate_state(1)[0])
+
+
+def basic_deduction_masks(board: np.ndarray, flagged: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # the single-number rules for the whole board at once: count unknown and flagged neighbours of every
+    # number, pick the numbers that are satisfied (or need all their unknowns), then spread back out
+    flags = (board == 9) | flagged
+    unknown = (board == -1) & ~flags
+    numbers = (board >= 0) & (board <= 8)
+    unknown_around = neighbour_sum(unknown)
+    remaining = np.where(numbers, board, 0) - neighbour_sum(flags)
+
+    satisfied = numbers & (remaining == 0) & (unknown_around > 0)
+    saturated = numbers & (remaining > 0) & (unknown_around == remaining)
+    safe = unknown & (neighbour_sum(satisfied) > 0)
+    mines = unknown & (neighbour_sum(saturated) > 0)
+    return safe, mines
+
+
+def heuristic_probability_grid(board: np.ndarray, flagged: np.ndarray, mines_left: int) -> np.ndarray:
+    # heuristic_probabilities for the whole board at once: each number spreads its remaining mines over its
+    # unknown neighbours, a frontier cell averages what it's told and the interior shares what is left.
+    # cells that aren't a candidate are inf
+    flags = (board == 9) | flagged
+    unknown = (board == -1) & ~flags
+    numbers = (board >= 0) & (board <= 8)
+    unknown_around = neighbour_sum(unknown)
+    remaining = np.where(numbers, board, 0) - neighbour_sum(flags)
+
+    told = numbers & (remaining > 0) & (unknown_around > 0)
+    mine_sum = neighbour_sum(np.where(told, remaining, 0))
+    cell_sum = neighbour_sum(np.where(told, unknown_around, 0))
+    frontier = unknown & (cell_sum > 0)
+    interior = unknown & (neighbour_sum(numbers) == 0)
+
+    grid = np.full(board.shape, np.inf)
+    grid[frontier] = mine_sum[frontier] / cell_sum[frontier]
+    if interior.any():
+        left = mines_left - grid[frontier].sum()
+        grid[interior] = min(1.0, max(0.0, left / np.count_nonzero(interior)))
+    return grid
+
 
 class MinesweeperSolver:
 
-    def __init__(self, rows: int, cols: int, mines: int):
+    def __init__(self, rows: int, cols: int, mines: int, seed=None, max_enumeration_nodes: int = 200000,
+                 component_cache: Optional[ComponentCache] = None, pattern_table: Optional[PatternTable] = None,
+                 backends: Optional[List[Tuple[Optional[int], FrontierBackend]]] = None, workers: int = 0):
         self.rows = rows
         self.cols = cols
         self.mines = mines
+        self.rng = random.Random(seed)
+        self.max_enumeration_nodes = max_enumeration_nodes
+        self.component_cache = COMPONENT_CACHE if component_cache is None else component_cache
+        self.pattern_table = default_pattern_table() if pattern_table is None else pattern_table
+        # (largest frontier it takes, backend), tried in order; None takes anything
+        if backends is None:
+            # large components go to a process pool shared by every solver asking for that many workers
+            executor = frontier_pool(workers) if workers else None
+            backends = default_backends(max_enumeration_nodes, self.component_cache, executor, seed)
+        self.backends = backends
         self.flagged = set()
+        # the same flags as a board mask, kept in step by update_flag for the vectorized stages
+        self._flags = np.zeros((rows, cols), dtype=np.bool_)
+        self.stats = defaultdict(int)
         self._neighbor_cache = {}
+        self._board = None
+        # flags toggled since the last observe, so it only refreshes around those
+        self._flag_changes = set()
+        # cells whose constraint still needs refreshing, left over when observe ran out of time
+        self._dirty = set()
+        self._constraints = {}
+        self._frontier_refs = defaultdict(int)
+        self._pattern_centers = set()
+        self._pattern_changes = set()
+        self.last_stage = None
 
     def get_neighbours(self, row: int, col: int):
         cache_key = (row, col)
@@ -33,32 +114,98 @@ class MinesweeperSolver:
         self._neighbor_cache[cache_key] = neighbours
         return neighbours
 
+    def observe(self, board: np.ndarray, changes=None, deadline: Optional[float] = None):
+        # keep one constraint per revealed number, refreshed only around cells that changed since the last
+        # board; changes are (row, col, value) triples as the env reports them, otherwise the board is diffed.
+        # past the deadline the remaining refreshes wait in _dirty for the next call
+        if self._board is None or self._board.shape != board.shape:
+            self._board = np.array(board, dtype=np.int16)
+            self._constraints = {}
+            self._frontier_refs = defaultdict(int)
+            rows, cols = np.nonzero((board >= 0) & (board <= 8))
+            dirty = set(zip(rows.tolist(), cols.tolist()))
+            self._dirty = set()
+            self._pattern_centers = set(dirty)
+            self._pattern_changes = set()
+            self._flags = np.zeros(board.shape, dtype=np.bool_)
+            for cell in self.flagged:
+                self._flags[cell] = True
+        else:
+            dirty = set()
+            if changes is not None:
+                changed = [(row, col) for row, col, value in changes]
+                for row, col, value in changes:
+                    self._board[row, col] = value
+            else:
+                changed = [(int(r), int(c)) for r, c in np.argwhere(self._board != board)]
+                for row, col in changed:
+                    self._board[row, col] = board[row, col]
+            changed.extend(self._flag_changes)
+            for row, col in changed:
+                dirty.add((row, col))
+                dirty.update(self.get_neighbours(row, col))
+            self._pattern_changes.update(changed)
+        self._flag_changes = set()
+
+        self._dirty.update(dirty)
+        while self._dirty:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            self._update_constraint(self._dirty.pop())
+
+    def _update_constraint(self, cell: Tuple[int, int]):
+        old = self._constraints.pop(cell, None)
+        if old is not None:
+            for other in old[0]:
+                self._frontier_refs[other] -= 1
+                if not self._frontier_refs[other]:
+                    del self._frontier_refs[other]
+
+        board = self._board
+        cell_value = board[cell]
+        if not 0 <= cell_value <= 8:
+            return
+
+        self.stats["constraint_updates"] += 1
+        unrevealed_neighbours = []
+        flagged_count = 0
+        for neighbour in self.get_neighbours(*cell):
+            if neighbour in self.flagged or board[neighbour] == 9:
+                flagged_count += 1
+            elif board[neighbour] == -1:
+                unrevealed_neighbours.append(neighbour)
+
+        if unrevealed_neighbours:
+            self._constraints[cell] = (tuple(unrevealed_neighbours), int(cell_value) - flagged_count)
+            for other in unrevealed_neighbours:
+                self._frontier_refs[other] += 1
+
+    def _pattern_deductions(self, board: np.ndarray, deadline: Optional[float] = None):
+        # a change anywhere in a 5x5 window can change what that window's pattern forces
+        if self._pattern_changes:
+            touched = np.zeros(board.shape, dtype=bool)
+            touched[tuple(np.array(list(self._pattern_changes)).T)] = True
+            near = neighbour_sum(neighbour_sum(touched)) > 0
+            self._pattern_centers.update(cell for cell in self._constraints if near[cell])
+            self._pattern_changes = set()
+        centers = [cell for cell in self._pattern_centers if cell in self._constraints]
+        for start in range(0, len(centers), PATTERN_CHUNK):
+            if deadline is not None and time.perf_counter() > deadline:
+                # the windows not looked at yet stay queued for the next move
+                return [], []
+            chunk = centers[start:start + PATTERN_CHUNK]
+            safe, mines = self.pattern_table.lookup(board, self._flags, chunk)
+            if safe or mines:
+                return sorted(safe), sorted(mines)
+            # nothing here forces anything until one of these windows changes again
+            self._pattern_centers.difference_update(chunk)
+        self._pattern_centers = set()
+        return [], []
+
     def _analyze_constraints(self, board: np.ndarray):
-        safe_cells = []
-        mine_cells = []
-        
-        revealed_mask = (board >= 0) & (board <= 8)
-        revealed_positions = np.argwhere(revealed_mask)
-        
-        for row, col in revealed_positions:
-            cell_value = board[row, col]
-            neighbours = self.get_neighbours(row, col)
-            unrevealed_neighbours = []
-            flagged_count = 0
-
-            for neighbour_row, neighbour_col in neighbours:
-                if (neighbour_row, neighbour_col) in self.flagged or board[neighbour_row, neighbour_col] == 9:
-                    flagged_count += 1
-                elif board[neighbour_row, neighbour_col] == -1:
-                    unrevealed_neighbours.append((neighbour_row, neighbour_col))
-
-            remaining_mines = cell_value - flagged_count
-            
-            if flagged_count == cell_value and unrevealed_neighbours:
-                safe_cells.extend(unrevealed_neighbours)
-            elif remaining_mines > 0 and len(unrevealed_neighbours) == remaining_mines:
-                mine_cells.extend(unrevealed_neighbours)
-        
+        safe, mines = basic_deduction_masks(board, self._flags)
+        safe_cells = [(int(r), int(c)) for r, c in np.argwhere(safe)]
+        mine_cells = [(int(r), int(c)) for r, c in np.argwhere(mines)]
         return safe_cells, mine_cells
 
     def find_guaranteed_safe_cells(self, board: np.ndarray):
@@ -69,39 +216,51 @@ class MinesweeperSolver:
         _, mine_cells = self._analyze_constraints(board)
         return mine_cells
 
-    def calculate_probabilities(self, board: np.ndarray):
-        probabilities = defaultdict(lambda: [0, 0])
-        revealed_mask = (board >= 0) & (board <= 8)
-        revealed_positions = np.argwhere(revealed_mask)
-
-        for row, col in revealed_positions:
-            cell_value = board[row, col]
-            neighbours = self.get_neighbours(row, col)
-            unrevealed_neighbours = []
-            flagged_count = 0
-
-            for neighbour_row, neighbour_col in neighbours:
-                if (neighbour_row, neighbour_col) in self.flagged or board[neighbour_row, neighbour_col] == 9:
-                    flagged_count += 1
-                elif board[neighbour_row, neighbour_col] == -1:
-                    unrevealed_neighbours.append((neighbour_row, neighbour_col))
-
-            remaining_mines = cell_value - flagged_count
-            if remaining_mines > 0 and unrevealed_neighbours:
-                for neighbour_row, neighbour_col in unrevealed_neighbours:
-                    key = (neighbour_row, neighbour_col)
-                    current = probabilities[key]
-                    current[0] += remaining_mines # type: ignore
-                    current[1] += len(unrevealed_neighbours)
-
-        prob_dict = {}
-        for cell, (mine_sum, constraint_sum) in probabilities.items():
-            if constraint_sum > 0:
-                prob_dict[cell] = mine_sum / constraint_sum
+    def _frontier_constraints(self):
+        return [self._constraints[cell] for cell in sorted(self._constraints)]
+
+    def _mines_left(self, board: np.ndarray) -> int:
+        return self.mines - int(np.count_nonzero((board == 9) | self._flags))
+
+    def _interior_mask(self, board: np.ndarray) -> np.ndarray:
+        interior = (board == -1) & ~self._flags
+        if self._frontier_refs:
+            interior[tuple(np.array(list(self._frontier_refs)).T)] = False
+        return interior
+
+    def analyze_frontier(self, board: np.ndarray) -> FrontierAnalysis:
+        self.observe(board)
+        return self._analyze(board)
+
+    def select_backend(self, frontier_size: int) -> FrontierBackend:
+        for limit, backend in self.backends:
+            if limit is None or frontier_size <= limit:
+                return backend
+        return self.backends[-1][1]
+
+    def _analyze(self, board: np.ndarray, deadline: Optional[float] = None) -> FrontierAnalysis:
+        interior = self._interior_mask(board)
+        backend = self.select_backend(len(self._frontier_refs))
+        if deadline is not None and time.perf_counter() > deadline:
+            # out of time before inference even starts: answer from the heuristic
+            backend = HeuristicBackend()
+        self.stats[f"backend_{backend.name}"] += 1
+        analysis = backend.analyze(self._frontier_constraints(), int(np.count_nonzero(interior)), self._mines_left(board),
+                                   deadline=deadline)
+        if analysis.timed_out:
+            analysis.stage = "partial"
+        elif analysis.stage is None:
+            analysis.stage = backend.name
+        if analysis.exact and analysis.interior_probability in (0.0, 1.0):
+            cells = [(int(r), int(c)) for r, c in np.argwhere(interior)]
+            if analysis.interior_probability == 0.0:
+                analysis.safe.extend(cells)
             else:
-                prob_dict[cell] = 0.5
+                analysis.mines.extend(cells)
+        return analysis
 
-        return prob_dict
+    def calculate_probabilities(self, board: np.ndarray):
+        return self.analyze_frontier(board).probabilities
 
     def _is_early_game(self, board: np.ndarray) -> bool:
         revealed_mask = (board >= 0) & (board <= 8)
@@ -114,7 +273,7 @@ class MinesweeperSolver:
         revealed_positions = np.argwhere(revealed_mask)
 
         if len(revealed_positions) == 0:
-            return random.choice(unknown_cells)
+            return self.rng.choice(unknown_cells)
 
         best_cell = None
         max_distance = -1
@@ -127,46 +286,91 @@ class MinesweeperSolver:
                 max_distance = min_dist_to_revealed
                 best_cell = cell
 
-        return best_cell if best_cell else random.choice(unknown_cells)
+        return best_cell if best_cell else self.rng.choice(unknown_cells)
+
+    def _certain_action(self, stage: str, board: np.ndarray, safe, mines):
+        self.last_stage = stage
+        self.stats[f"stage_{stage}"] += 1
+        if safe:
+            # Return all safe cells to be clicked at once
+            return ("click_all", self._sort_cells_by_informativeness(board, safe))
+        return ("flag_all", mines)
+
+    def _deadline_guess(self, board: np.ndarray):
+        # out of time: the averaging heuristic over the whole board, without building the constraint lists
+        self.last_stage = "heuristic"
+        self.stats["stage_heuristic"] += 1
+        grid = heuristic_probability_grid(board, self._flags, self._mines_left(board))
+        # lowest probability wins, ties go to the first cell in row-major order
+        best = np.unravel_index(np.argmin(grid), grid.shape)
+        if not np.isfinite(grid[best]):
+            return None
+        return ("click", (int(best[0]), int(best[1])))
 
-    def get_action(self, board, game_state):
+    def get_action(self, board, game_state, changes=None, deadline_ms: Optional[float] = None):
+        # stages run cheapest first; with a deadline it is checked between stages and inside the long ones,
+        # and once it passes the heuristic guess is returned. last_stage names the stage that produced the action
+        self.last_stage = None
         if game_state != "playing":
             return None
+        deadline = None if deadline_ms is None else time.perf_counter() + deadline_ms / 1000
+
+        def expired():
+            return deadline is not None and time.perf_counter() > deadline
 
+        self.observe(board, changes, deadline)
+        # the rules only read the board, so they still run if observe used up the time
         safe, mines = self._analyze_constraints(board)
-        
-        if safe:
-            # Return all safe cells to be clicked at once
-            sorted_safe = self._sort_cells_by_informativeness(board, safe)
-            return ("click_all", sorted_safe)
+        if safe or mines:
+            return self._certain_action("rules", board, safe, mines)
+        if expired():
+            return self._deadline_guess(board)
+
+        safe, mines = self._pattern_deductions(board, deadline)
+        if safe or mines:
+            self.stats["pattern_hits"] += 1
+            return self._certain_action("patterns", board, safe, mines)
+        if expired():
+            return self._deadline_guess(board)
+
+        # overlapping constraints settle most of what the single-number rules leave, without enumerating
+        safe, mines = reduce_frontier(self._frontier_constraints(), deadline)
+        if safe or mines:
+            self.stats["guesses_avoided"] += 1
+            return self._certain_action("subset", board, safe, mines)
+        if expired():
+            return self._deadline_guess(board)
+
+        analysis = self._analyze(board, deadline)
+        interior = self._interior_mask(board)
+        if not analysis.probabilities and not interior.any():
+            return None
 
-        if mines:
-            return ("flag_all", mines)
+        if analysis.safe or analysis.mines:
+            return self._certain_action(analysis.stage, board, analysis.safe, analysis.mines)
 
-        unknown_cells = self._get_unknown_cells(board)
-        if not unknown_cells:
-            return None
+        self.last_stage = analysis.stage
+        self.stats[f"stage_{analysis.stage}"] += 1
 
         if self._is_early_game(board):
-            far_cell = self._get_cell_far_from_revealed(board, unknown_cells)
+            far_cell = self._get_cell_far_from_revealed(board, self._get_unknown_cells(board))
             return ("click", far_cell)
 
-        probabilities = self.calculate_probabilities(board)
+        interior_probability = analysis.interior_probability
+        if interior_probability is None:
+            interior_probability = 0.5
 
-        best_cell = None
-        best_prob = 1.0
+        # lowest probability wins, ties go to the first cell in row-major order
+        candidates = [(prob, cell) for cell, prob in analysis.probabilities.items()]
+        if interior.any():
+            first = np.unravel_index(np.argmax(interior), interior.shape)
+            candidates.append((interior_probability, (int(first[0]), int(first[1]))))
+        best_prob, best_cell = min(candidates)
 
-        for cell in unknown_cells:
-            prob = probabilities.get(cell, 0.5)
-            if prob < best_prob:
-                best_prob = prob
-                best_cell = cell
-
-        if best_cell:
+        if best_prob < 1.0:
             return ("click", (best_cell[0], best_cell[1]))
 
-        return ("click", random.choice(unknown_cells))
-
+        return ("click", self.rng.choice(self._get_unknown_cells(board)))
 
     def _get_unknown_cells(self, board: np.ndarray):
         unknown_mask = (board == -1)
@@ -214,18 +418,31 @@ class MinesweeperSolver:
         return [cell for score, cell in cell_scores]
 
     def update_flag(self, row: int, col: int, is_flag: bool):
+        if is_flag == ((row, col) in self.flagged):
+            return
         if is_flag:
             self.flagged.add((row, col))
         else:
             self.flagged.discard((row, col))
+        self._flags[row, col] = is_flag
+        self._flag_changes.add((row, col))
+
+    def close(self):
+        # the component cache outlives the solver; write it back if it was opened from a file
+        if self.component_cache.path is not None:
+            self.component_cache.save()
 
     def reset(self):
         self.flagged = set()
+        self._flags = np.zeros((self.rows, self.cols), dtype=np.bool_)
+        self._flag_changes = set()
+        self._dirty = set()
+        self._board = None
 
 
-def solve_game_browser(board_getter, click_func, flag_func, game_state_func, rows: int, cols: int, mines: int, max_moves: int = 1000):
+def solve_game_browser(board_getter, click_func, flag_func, game_state_func, rows: int, cols: int, mines: int, max_moves: int = 1000, seed=None, deadline_ms: Optional[float] = None):
 
-    solver = MinesweeperSolver(rows, cols, mines)
+    solver = MinesweeperSolver(rows, cols, mines, seed=seed)
 
     first_row = rows // 2
     first_col = cols // 2
@@ -242,7 +459,7 @@ def solve_game_browser(board_getter, click_func, flag_func, game_state_func, row
         if game_state_str != "playing":
             break
 
-        action = solver.get_action(board, game_state_str)
+        action = solver.get_action(board, game_state_str, deadline_ms=deadline_ms)
 
         if action is None:
             break
@@ -252,13 +469,13 @@ def solve_game_browser(board_getter, click_func, flag_func, game_state_func, row
         if action_type == "click":
             row, col = action_data
             click_func(row, col)
-            time.sleep(random.uniform(0.05, 0.15))
+            time.sleep(solver.rng.uniform(0.05, 0.15))
             board = board_getter()
             moves += 1
         elif action_type == "click_all":
             for row, col in action_data:
                 click_func(row, col)
-                time.sleep(random.uniform(0.05, 0.1))
+                time.sleep(solver.rng.uniform(0.05, 0.1))
                 moves += 1
             board = board_getter()
         elif action_type == "flag_all":
@@ -268,7 +485,7 @@ def solve_game_browser(board_getter, click_func, flag_func, game_state_func, row
                 flag_func(row, col)
                 solver.update_flag(row, col, True)
                 board[row, col] = 9
-                time.sleep(random.uniform(0.05, 0.1))
+                time.sleep(solver.rng.uniform(0.05, 0.1))
             moves += len(action_data)
 
         if game_state_func(board) != "playing":
@@ -298,10 +515,17 @@ def print_board(board: np.ndarray):
         print(row_str)
     print()
 
-def solve_game_simulator(rows: int, cols: int, mines: int, max_moves: int = 1000, show_board: bool = False):
+def solve_game_simulator(rows: int, cols: int, mines: int, max_moves: int = 1000, show_board: bool = False, seed=None, deadline_ms: Optional[float] = None,
+                         cache_path: Optional[str] = None):
     from minesweeper_env import MinesweeperEnv
-    env = MinesweeperEnv(rows, cols, mines)
-    solver = MinesweeperSolver(rows, cols, mines)
+    env_seed, solver_seed = split_seed(seed)
+    env = MinesweeperEnv(rows, cols, mines, readonly_views=True, seed=env_seed)
+    # with a cache path the component cache is loaded from it and saved back once the game ends
+    cache = ComponentCache(path=cache_path) if cache_path is not None else None
+    solver = MinesweeperSolver(rows, cols, mines, seed=solver_seed, component_cache=cache)
+    # the solver only re-reads the cells the env reports as changed
+    pending = []
+    env.subscribe(pending.extend)
     
     first_row = rows // 2
     first_col = cols // 2
@@ -320,7 +544,8 @@ def solve_game_simulator(rows: int, cols: int, mines: int, max_moves: int = 1000
         if game_state_str != "playing":
             break
         
-        action = solver.get_action(board, game_state_str)
+        action = solver.get_action(board, game_state_str, changes=pending, deadline_ms=deadline_ms)
+        pending.clear()
         
         if action is None:
             break
@@ -361,4 +586,5 @@ def solve_game_simulator(rows: int, cols: int, mines: int, max_moves: int = 1000
                 print(f"Game {'WON' if env.won else 'LOST'}!")
             break
     
+    solver.close()
     return env.game_state() == "won"
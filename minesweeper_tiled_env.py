@@ -0,0 +1,210 @@
+import numpy as np
+from collections import deque
+from typing import Optional, Tuple
+
+from minesweeper_env import neighbour_sum
+
+
+class _Tile:
+    def __init__(self, counts: np.ndarray):
+        self.counts = counts
+        self.board = np.full(counts.shape, -1, dtype=np.int8)
+        self.revealed = np.zeros(counts.shape, dtype=bool)
+        self.flagged = np.zeros(counts.shape, dtype=bool)
+
+
+class TiledMinesweeperEnv:
+    """Giant board generated lazily, one tile at a time, from a seeded hash of the tile coordinates.
+
+    Mines are drawn independently per cell at density mines / (rows * cols), so the total is only
+    approximately `mines`. Only tiles that have been touched (plus the mine masks of their neighbours)
+    are kept, so memory follows the explored area rather than the board size. There is no dense
+    board to hand back: click_cell returns (won, done) and board_window reads a region.
+    """
+
+    def __init__(self, rows: int, cols: int, mines: int, seed: Optional[int] = None, tile_size: int = 64):
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.tile_size = tile_size
+        self.density = mines / (rows * cols)
+        self.seed = int(np.random.SeedSequence(seed).entropy)
+        self.tile_rows = -(-rows // tile_size)
+        self.tile_cols = -(-cols // tile_size)
+        self.reset()
+
+    def reset(self):
+        self.tiles = {}
+        self._mine_tiles = {}
+        self.first_click = None
+        self.revealed_count = 0
+        self.flagged_count = 0
+        self.game_over = False
+        self.won = False
+        self.exploded_mine = None
+
+    def _tile_shape(self, tile_row: int, tile_col: int) -> Tuple[int, int]:
+        return (min(self.tile_size, self.rows - tile_row * self.tile_size),
+                min(self.tile_size, self.cols - tile_col * self.tile_size))
+
+    def _tile_mines(self, tile_row: int, tile_col: int) -> np.ndarray:
+        key = (tile_row, tile_col)
+        if key not in self._mine_tiles:
+            rng = np.random.default_rng([self.seed, tile_row, tile_col])
+            mines = rng.random(self._tile_shape(tile_row, tile_col)) < self.density
+
+            # keep the 3x3 block around the first click clear, wherever it falls
+            first_row, first_col = self.first_click
+            top, left = tile_row * self.tile_size, tile_col * self.tile_size
+            r0, r1 = max(first_row - 1 - top, 0), max(first_row + 2 - top, 0)
+            c0, c1 = max(first_col - 1 - left, 0), max(first_col + 2 - left, 0)
+            mines[r0:r1, c0:c1] = False
+
+            self._mine_tiles[key] = mines
+        return self._mine_tiles[key]
+
+    def _tile(self, tile_row: int, tile_col: int) -> _Tile:
+        key = (tile_row, tile_col)
+        if key not in self.tiles:
+            height, width = self._tile_shape(tile_row, tile_col)
+            padded = np.zeros((height + 2, width + 2), dtype=bool)
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    r, c = tile_row + dr, tile_col + dc
+                    if not (0 <= r < self.tile_rows and 0 <= c < self.tile_cols):
+                        continue
+                    mines = self._tile_mines(r, c)
+                    # each neighbour contributes only the edge (or corner) that touches this tile
+                    src_r = slice(None) if dr == 0 else (slice(-1, None) if dr < 0 else slice(0, 1))
+                    src_c = slice(None) if dc == 0 else (slice(-1, None) if dc < 0 else slice(0, 1))
+                    dst_r = slice(1, -1) if dr == 0 else (slice(0, 1) if dr < 0 else slice(-1, None))
+                    dst_c = slice(1, -1) if dc == 0 else (slice(0, 1) if dc < 0 else slice(-1, None))
+                    padded[dst_r, dst_c] = mines[src_r, src_c]
+            self.tiles[key] = _Tile(neighbour_sum(padded)[1:-1, 1:-1].astype(np.int8))
+        return self.tiles[key]
+
+    def _locate(self, row: int, col: int) -> Tuple[int, int, int, int]:
+        return row // self.tile_size, col // self.tile_size, row % self.tile_size, col % self.tile_size
+
+    def _open(self, tile_row: int, tile_col: int, seed: np.ndarray):
+        # flood fill tile by tile: grow inside a tile with array ops, then hand whatever spills over
+        # its edges to the neighbouring tiles as their seeds
+        pending = {(tile_row, tile_col): seed}
+        queue = deque([(tile_row, tile_col)])
+        while queue:
+            key = queue.popleft()
+            tile = self._tile(*key)
+            frontier = pending.pop(key) & ~tile.revealed & ~tile.flagged
+            opened = np.zeros(tile.counts.shape, dtype=bool)
+            while frontier.any():
+                tile.revealed |= frontier
+                opened |= frontier
+                frontier = (neighbour_sum(frontier & (tile.counts == 0)) > 0) & ~tile.revealed & ~tile.flagged
+
+            if not opened.any():
+                continue
+            tile.board[opened] = tile.counts[opened]
+            self.revealed_count += int(np.count_nonzero(opened))
+
+            height, width = opened.shape
+            padded = np.zeros((height + 2, width + 2), dtype=bool)
+            padded[1:-1, 1:-1] = opened & (tile.counts == 0)
+            spill = neighbour_sum(padded) > 0
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    if dr == 0 and dc == 0:
+                        continue
+                    r, c = key[0] + dr, key[1] + dc
+                    if not (0 <= r < self.tile_rows and 0 <= c < self.tile_cols):
+                        continue
+                    src_r = slice(1, -1) if dr == 0 else (slice(0, 1) if dr < 0 else slice(-1, None))
+                    src_c = slice(1, -1) if dc == 0 else (slice(0, 1) if dc < 0 else slice(-1, None))
+                    edge = spill[src_r, src_c]
+                    if not edge.any():
+                        continue
+                    neighbour_shape = self._tile_shape(r, c)
+                    neighbour_seed = pending.get((r, c))
+                    if neighbour_seed is None:
+                        neighbour_seed = np.zeros(neighbour_shape, dtype=bool)
+                        pending[(r, c)] = neighbour_seed
+                        queue.append((r, c))
+                    dst_r = slice(None) if dr == 0 else (slice(-1, None) if dr < 0 else slice(0, 1))
+                    dst_c = slice(None) if dc == 0 else (slice(-1, None) if dc < 0 else slice(0, 1))
+                    neighbour_seed[dst_r, dst_c] |= edge
+
+    def _check_won(self):
+        # the exact mine total is only known once every tile exists, which only happens on boards
+        # small enough to be fully generated
+        if len(self._mine_tiles) == self.tile_rows * self.tile_cols:
+            total_mines = sum(int(np.count_nonzero(m)) for m in self._mine_tiles.values())
+            if self.revealed_count == self.rows * self.cols - total_mines:
+                self.game_over = True
+                self.won = True
+
+    def click_cell(self, row: int, col: int) -> Tuple[bool, bool]:
+        if self.game_over:
+            return False, True
+
+        if self.first_click is None:
+            self.first_click = (row, col)
+
+        tile_row, tile_col, r, c = self._locate(row, col)
+        tile = self._tile(tile_row, tile_col)
+        if tile.revealed[r, c] or tile.flagged[r, c]:
+            return self.won, self.game_over
+
+        if self._tile_mines(tile_row, tile_col)[r, c]:
+            tile.revealed[r, c] = True
+            tile.board[r, c] = 11
+            self.revealed_count += 1
+            self.exploded_mine = (row, col)
+            self.game_over = True
+            return False, True
+
+        seed = np.zeros(tile.counts.shape, dtype=bool)
+        seed[r, c] = True
+        self._open(tile_row, tile_col, seed)
+        self._check_won()
+        return self.won, self.game_over
+
+    def flag_cell(self, row: int, col: int):
+        if self.game_over or self.first_click is None:
+            return
+
+        tile_row, tile_col, r, c = self._locate(row, col)
+        tile = self._tile(tile_row, tile_col)
+        if tile.revealed[r, c]:
+            return
+
+        tile.flagged[r, c] = not tile.flagged[r, c]
+        if tile.flagged[r, c]:
+            self.flagged_count += 1
+            tile.board[r, c] = 9
+        else:
+            self.flagged_count -= 1
+            tile.board[r, c] = -1
+
+    def cell_value(self, row: int, col: int) -> int:
+        tile_row, tile_col, r, c = self._locate(row, col)
+        tile = self.tiles.get((tile_row, tile_col))
+        return -1 if tile is None else int(tile.board[r, c])
+
+    def board_window(self, row: int, col: int, height: int, width: int) -> np.ndarray:
+        # untouched tiles read as unrevealed without being created
+        window = np.full((height, width), -1, dtype=np.int8)
+        row_end, col_end = min(self.rows, row + height), min(self.cols, col + width)
+        for tile_row in range(row // self.tile_size, -(-row_end // self.tile_size)):
+            for tile_col in range(col // self.tile_size, -(-col_end // self.tile_size)):
+                tile = self.tiles.get((tile_row, tile_col))
+                if tile is None:
+                    continue
+                top, left = tile_row * self.tile_size, tile_col * self.tile_size
+                r0, r1 = max(row, top), min(row_end, top + tile.board.shape[0])
+                c0, c1 = max(col, left), min(col_end, left + tile.board.shape[1])
+                window[r0 - row:r1 - row, c0 - col:c1 - col] = tile.board[r0 - top:r1 - top, c0 - left:c1 - left]
+        return window
+
+    def game_state(self) -> str:
+        if self.game_over:
+            return "won" if self.won else "lost"
+        return "playing"
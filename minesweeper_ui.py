@@ -1,5 +1,4 @@
 import pygame
-import numpy as np
 from minesweeper_env import MinesweeperEnv
 from minesweeper_solver import MinesweeperSolver
 import time
@@ -11,7 +10,7 @@ class MinesweeperGUI:
         self.rows = rows
         self.cols = cols
         self.mines = mines
-        self.env = MinesweeperEnv(rows, cols, mines)
+        self.env = MinesweeperEnv(rows, cols, mines, readonly_views=True)
         self.solver = MinesweeperSolver(rows, cols, mines)
 
         self.cell_size = 32
@@ -143,9 +142,9 @@ class MinesweeperGUI:
                 if is_last_clicked and val == -1:
                     pygame.draw.rect(self.screen, (0, 200, 0), rect, 3)
 
-        revealed = np.sum(self.env.revealed)
+        revealed = self.env.revealed_count
         total = self.rows * self.cols
-        flagged_count = np.sum(self.env.flagged)
+        flagged_count = self.env.flagged_count
         remaining_mines = self.mines - flagged_count
 
         if game_state == "won":
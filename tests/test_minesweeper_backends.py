@@ -0,0 +1,157 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from minesweeper_backends import (
+    ExactBackend,
+    HeuristicBackend,
+    SamplingBackend,
+    SatBackend,
+    _forced_cells,
+    default_backends,
+    heuristic_probabilities,
+)
+from minesweeper_env import MinesweeperEnv
+from minesweeper_solver import MinesweeperSolver
+
+
+def brute_force_solver(cells, constraints):
+    def solve(assumptions):
+        for bits in itertools.product([False, True], repeat=len(cells)):
+            model = dict(zip(cells, bits))
+            if any(model[cell] != value for cell, value in assumptions.items()):
+                continue
+            if all(sum(model[c] for c in group) == value for group, value in constraints):
+                return model
+        return None
+    return solve
+
+
+def played_board(rows, cols, mines, seed, clicks=0):
+    env = MinesweeperEnv(rows, cols, mines, seed=seed)
+    env.click_cell(rows // 2, cols // 2)
+    rng = np.random.default_rng(seed)
+    for row, col in rng.integers(0, (rows, cols), size=(clicks, 2)):
+        if (int(row), int(col)) not in env.mine_positions:
+            env.click_cell(int(row), int(col))
+    return env
+
+
+def quick_sampler():
+    # the sat tests only look at proven cells
+    return SamplingBackend(budget=0.01, seed=0)
+
+
+class TestForcedCells:
+    def test_one_two_one(self):
+        cells = [(0, 0), (0, 1), (0, 2)]
+        constraints = [(((0, 0), (0, 1)), 1), (((0, 0), (0, 1), (0, 2)), 2), (((0, 1), (0, 2)), 1)]
+        assert _forced_cells(cells, brute_force_solver(cells, constraints)) == {(0, 0): True, (0, 1): False,
+                                                                                (0, 2): True}
+
+    def test_contradiction(self):
+        cells = [(0, 0)]
+        assert _forced_cells(cells, brute_force_solver(cells, [(((0, 0),), 2)])) is None
+
+
+class TestBackends:
+    def test_heuristic_proves_nothing(self):
+        analysis = HeuristicBackend().analyze([(((0, 0), (0, 1)), 1)], 8, 3)
+        assert analysis.probabilities == {(0, 0): 0.5, (0, 1): 0.5}
+        assert not analysis.safe and not analysis.mines and not analysis.exact
+        assert analysis.interior_probability == pytest.approx(2 / 8)
+
+    def test_solver_picks_backend_by_frontier_size(self):
+        small, large = HeuristicBackend(), ExactBackend()
+        solver = MinesweeperSolver(9, 9, 10, backends=[(2, small), (None, large)])
+        assert solver.select_backend(2) is small
+        assert solver.select_backend(3) is large
+
+        board = np.full((9, 9), -1)
+        board[4, 4] = 1
+        solver.analyze_frontier(board)
+        assert solver.stats["backend_exact"] == 1
+
+    def test_exact_samples_components_over_budget(self):
+        constraints = [(tuple((r, c) for r in (0, 1) for c in range(max(0, i - 1), min(12, i + 2))), 2)
+                       for i in range(12)]
+        analysis = ExactBackend(max_nodes=10, sampler=SamplingBackend(budget=0.5, seed=0)).analyze(constraints, 50, 20)
+        assert analysis.stage == "sampling"
+        assert not analysis.exact and not analysis.timed_out
+        for cell, p in analysis.probabilities.items():
+            low, high = analysis.intervals[cell]
+            assert 0.0 <= low <= p <= high <= 1.0
+
+    def test_sampling_deadline_is_partial(self):
+        import time
+        analysis = SamplingBackend().analyze([(((0, 0), (0, 1)), 1)], 8, 3, deadline=time.perf_counter() - 1)
+        assert analysis.timed_out
+        assert analysis.probabilities == {(0, 0): 0.5, (0, 1): 0.5}
+
+    def test_default_backends(self):
+        backends = default_backends()
+        assert backends[-1][0] is None
+        assert isinstance(backends[0][1], ExactBackend)
+        if SatBackend().available:
+            assert isinstance(backends[-1][1], SatBackend)
+
+
+class TestLargeFrontier:
+    def test_sat_chain_samples_unproven_cells(self, monkeypatch):
+        import minesweeper_backends
+
+        # a stand-in engine that finds a model for any assumptions, so it proves nothing
+        def agreeable_solver(cells, constraints):
+            return lambda assumptions: {cell: assumptions.get(cell, False) for cell in cells}
+
+        monkeypatch.setattr(minesweeper_backends, "cp_model", None)
+        monkeypatch.setattr(minesweeper_backends, "pycosat", object())
+        monkeypatch.setattr(minesweeper_backends, "_pycosat_solver", agreeable_solver)
+        backends = default_backends(seed=0)
+        sat = backends[-1][1]
+        assert isinstance(sat, SatBackend) and sat.available
+        sat.sampler.budget = 0.3
+
+        env = played_board(60, 60, 500, seed=1, clicks=300)
+        board = env.board_state()
+        solver = MinesweeperSolver(60, 60, 500, backends=backends)
+        solver.observe(board)
+        assert len(solver._frontier_refs) > minesweeper_backends.LARGE_FRONTIER
+        assert solver.select_backend(len(solver._frontier_refs)) is sat
+
+        analysis = solver.analyze_frontier(board)
+        assert not analysis.safe and not analysis.mines
+        assert analysis.intervals is not None and set(analysis.intervals) == set(analysis.probabilities)
+        assert analysis.interior_interval is not None
+        for cell, p in analysis.probabilities.items():
+            low, high = analysis.intervals[cell]
+            assert low <= p <= high
+        # sampled, not the averaging heuristic
+        assert analysis.probabilities != heuristic_probabilities(solver._frontier_constraints())
+
+
+@pytest.mark.skipif(not SatBackend().available, reason="needs pycosat or ortools")
+class TestSatBackend:
+    def test_agrees_with_exact_on_local_certainties(self):
+        for seed in range(10):
+            env = played_board(16, 30, 99, seed, clicks=10)
+            solver = MinesweeperSolver(16, 30, 99)
+            solver.observe(env.board_state())
+            constraints = solver._frontier_constraints()
+            if not constraints:
+                continue
+            sat = SatBackend(sampler=quick_sampler()).analyze(constraints, 0, 0)
+            exact = ExactBackend(max_nodes=None).analyze(constraints, 0, 0)
+            assert sorted(sat.safe) == sorted(exact.safe)
+            assert sorted(sat.mines) == sorted(exact.mines)
+
+    def test_dense_board_deductions_are_sound(self):
+        env = played_board(24, 24, 140, seed=3, clicks=200)
+        board = env.board_state()
+        solver = MinesweeperSolver(24, 24, 140)
+        solver.observe(board)
+        analysis = SatBackend(sampler=quick_sampler()).analyze(solver._frontier_constraints(), 0, 0)
+        assert analysis.safe or analysis.mines
+        assert not any((cell in env.mine_positions) for cell in analysis.safe)
+        assert all((cell in env.mine_positions) for cell in analysis.mines)
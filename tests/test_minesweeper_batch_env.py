@@ -0,0 +1,93 @@
+import pytest
+import numpy as np
+from minesweeper_batch_env import BatchMinesweeperEnv
+from minesweeper_env import MinesweeperEnv, MinePositions, neighbour_sum, label_zero_regions
+
+
+def env_from_mask(mine_mask):
+    rows, cols = mine_mask.shape
+    env = MinesweeperEnv(rows, cols, int(mine_mask.sum()))
+    env.mine_mask = mine_mask.copy()
+    env.adjacent_counts = neighbour_sum(mine_mask).astype(np.int8)
+    env.zero_labels, env.zero_regions = label_zero_regions((env.adjacent_counts == 0) & ~mine_mask)
+    env.mine_positions = MinePositions(env.mine_mask, env.mines)
+    env.mines_placed = True
+    return env
+
+
+class TestBatchMinesweeperEnv:
+    def test_initialization(self):
+        env = BatchMinesweeperEnv(8, 9, 9, 10, seed=0)
+        assert env.board.shape == (8, 9, 9)
+        assert np.all(env.board == -1)
+        assert not env.game_over.any()
+        assert list(env.game_states()) == ["playing"] * 8
+
+    def test_first_click_safe(self):
+        env = BatchMinesweeperEnv(64, 16, 30, 99, auto_reset=False, seed=1)
+        env.click_cells(np.arange(64), 8, 15)
+        assert np.all(env.mine_count == 99)
+        assert np.all(env.mine_mask.sum(axis=(1, 2)) == 99)
+        assert not env.mine_mask[:, 7:10, 14:17].any()
+        assert np.all(env.board[:, 8, 15] == 0)
+        assert not env.game_over.any()
+
+    def test_corner_first_click_exclusion(self):
+        env = BatchMinesweeperEnv(4, 3, 3, 8, auto_reset=False, seed=2)
+        env.click_cells(np.arange(4), 0, 0)
+        assert np.all(env.mine_count == 5)
+        assert not env.mine_mask[:, 0:2, 0:2].any()
+
+    def test_matches_single_env(self):
+        rng = np.random.default_rng(3)
+        env = BatchMinesweeperEnv(16, 12, 12, 20, auto_reset=False, seed=3)
+        env.click_cells(np.arange(16), rng.integers(12, size=16), rng.integers(12, size=16))
+        singles = [env_from_mask(env.mine_mask[g]) for g in range(16)]
+        for g, single in enumerate(singles):
+            single.revealed[:] = env.revealed[g]
+            single.board[:] = env.board[g]
+            single.revealed_count = int(env.revealed[g].sum())
+
+        for _ in range(10):
+            games = np.arange(16)
+            rows = rng.integers(12, size=16)
+            cols = rng.integers(12, size=16)
+            env.click_cells(games, rows, cols)
+            for g in range(16):
+                singles[g].click_cell(int(rows[g]), int(cols[g]))
+                assert np.array_equal(env.board[g], singles[g].board)
+                assert env.game_over[g] == singles[g].game_over
+                assert env.won[g] == singles[g].won
+                assert env.revealed_count[g] == singles[g].revealed_count
+
+    def test_click_mine_loses(self):
+        env = BatchMinesweeperEnv(2, 5, 5, 10, auto_reset=False, seed=4)
+        env.click_cells([0, 1], [0, 0], [0, 0])
+        r, c = np.argwhere(env.mine_mask[1])[0]
+        won, done = env.click_cells(1, r, c)
+        assert done[1] and not won[1]
+        assert not done[0]
+        assert env.board[1, r, c] == 11
+        assert list(env.game_states()) == ["playing", "lost"]
+
+    def test_win_auto_resets(self):
+        env = BatchMinesweeperEnv(3, 4, 4, 2, seed=5)
+        env.click_cells(np.arange(3), 0, 0)
+        safe = np.argwhere(~env.mine_mask[1])
+        won, done = env.click_cells(1, safe[:, 0], safe[:, 1])
+        assert won[1] and done[1]
+        assert env.games_won == 1 and env.games_finished == 1
+        assert np.all(env.board[1] == -1)
+        assert not env.mines_placed[1]
+        assert env.mines_placed[0] and env.mines_placed[2]
+
+    def test_flag_cells(self):
+        env = BatchMinesweeperEnv(2, 9, 9, 10, seed=6)
+        env.flag_cells([0, 1, 1], [0, 0, 0], [0, 0, 1])
+        assert env.board[0, 0, 0] == 9 and env.board[1, 0, 1] == 9
+        assert list(env.flagged_count) == [1, 2]
+        env.click_cells(0, 0, 0)
+        assert env.board[0, 0, 0] == 9
+        env.flag_cells(0, 0, 0)
+        assert env.board[0, 0, 0] == -1
+        assert env.flagged_count[0] == 0
@@ -0,0 +1,87 @@
+import pytest
+import numpy as np
+from minesweeper_corpus import BoardCorpus, CorpusWriter, read_corpus, write_corpus
+from minesweeper_env import MinesweeperEnv
+
+
+def random_boards(count, rows, cols, mines, seed=0):
+    rng = np.random.default_rng(seed)
+    masks = np.zeros((count, rows * cols), dtype=bool)
+    for i in range(count):
+        masks[i, rng.choice(rows * cols, mines, replace=False)] = True
+    first_clicks = rng.integers(0, [rows, cols], size=(count, 2))
+    return masks.reshape(count, rows, cols), first_clicks
+
+
+class TestBoardCorpus:
+    def test_write_and_memmap_read(self, tmp_path):
+        path = str(tmp_path / "suite.msc")
+        masks, first_clicks = random_boards(20, 16, 30, 99)
+        write_corpus(path, masks, first_clicks, 99)
+
+        corpus = BoardCorpus(path)
+        assert len(corpus) == 20
+        assert (corpus.rows, corpus.cols, corpus.mines) == (16, 30, 99)
+        assert isinstance(corpus.records, np.memmap)
+        for i in (0, 7, 19):
+            assert np.array_equal(corpus.mine_mask(i), masks[i])
+            assert corpus.first_click(i) == tuple(first_clicks[i])
+
+        read_masks, read_clicks, mines = read_corpus(path)
+        assert np.array_equal(read_masks, masks)
+        assert np.array_equal(read_clicks, first_clicks)
+
+    def test_streaming_writer_and_batches(self, tmp_path):
+        path = str(tmp_path / "stream.msc")
+        masks, first_clicks = random_boards(25, 9, 9, 10, seed=1)
+        with CorpusWriter(path, 9, 9, 10) as writer:
+            for start in range(0, 25, 10):
+                writer.append(masks[start:start + 10], first_clicks[start:start + 10])
+
+        corpus = BoardCorpus(path)
+        assert len(corpus) == 25
+        batches = list(corpus.iter_batches(batch_size=8))
+        assert [len(b[0]) for b in batches] == [8, 8, 8, 1]
+        assert np.array_equal(np.concatenate([b[0] for b in batches]), masks)
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "not_a_corpus.bin"
+        path.write_bytes(b"\0" * 64)
+        with pytest.raises(ValueError):
+            BoardCorpus(str(path))
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_env_from_corpus(self, tmp_path, compact):
+        path = str(tmp_path / "suite.msc")
+        masks, first_clicks = random_boards(3, 16, 16, 40, seed=2)
+        write_corpus(path, masks, first_clicks, 40)
+
+        env = MinesweeperEnv.from_corpus(path, 1, compact=compact)
+        assert env.first_click == tuple(first_clicks[1])
+        assert env.mines_placed
+        assert set(env.mine_positions) == set(map(tuple, np.argwhere(masks[1]).tolist()))
+
+        safe = np.argwhere(~masks[1])
+        for r, c in safe:
+            env.click_cell(int(r), int(c))
+        assert env.game_state() == "won"
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_reset_replays_corpus_layout(self, tmp_path, compact):
+        path = str(tmp_path / "suite.msc")
+        masks, first_clicks = random_boards(3, 16, 16, 40, seed=2)
+        write_corpus(path, masks, first_clicks, 40)
+
+        env = MinesweeperEnv.from_corpus(path, 1, compact=compact)
+        mine = tuple(int(v) for v in np.argwhere(masks[1])[0])
+        env.click_cell(*mine)
+        assert env.game_state() == "lost"
+
+        env.reset()
+        assert env.game_state() == "playing"
+        assert env.first_click == tuple(first_clicks[1])
+        assert env.mines_placed and env.revealed_count == 0
+        assert set(env.mine_positions) == set(map(tuple, np.argwhere(masks[1]).tolist()))
+        for r, c in np.argwhere(~masks[1]):
+            env.click_cell(int(r), int(c))
+        assert env.game_state() == "won"
@@ -1,6 +1,6 @@
 import pytest
 import numpy as np
-from minesweeper_env import MinesweeperEnv
+from minesweeper_env import MinesweeperEnv, GameStream
 
 
 class TestMinesweeperEnv:
@@ -179,3 +179,298 @@ class TestMinesweeperEnv:
         board, won, done = env.click_cell(0, 0)
         assert done
         assert not won
+
+    def test_adjacent_counts_match_mine_positions(self):
+        env = MinesweeperEnv(16, 30, 99)
+        env._place_mines(8, 15)
+        assert len(env.mine_positions) == 99
+        assert np.sum(env.mine_mask) == 99
+        for r in range(16):
+            for c in range(30):
+                count = 0
+                for nr in range(max(0, r-1), min(16, r+2)):
+                    for nc in range(max(0, c-1), min(30, c+2)):
+                        if (nr, nc) in env.mine_positions:
+                            count += 1
+                assert env.adjacent_counts[r, c] == count
+
+    def test_zero_region_reveal_matches_recursive(self):
+        def recursive_reveal(env, board, revealed, row, col):
+            if revealed[row, col] or env.flagged[row, col]:
+                return
+            revealed[row, col] = True
+            if (row, col) in env.mine_positions:
+                board[row, col] = 11
+                return
+            count = 0
+            for r in range(max(0, row - 1), min(env.rows, row + 2)):
+                for c in range(max(0, col - 1), min(env.cols, col + 2)):
+                    if (r, c) in env.mine_positions:
+                        count += 1
+            board[row, col] = count
+            if count == 0:
+                for r in range(max(0, row - 1), min(env.rows, row + 2)):
+                    for c in range(max(0, col - 1), min(env.cols, col + 2)):
+                        recursive_reveal(env, board, revealed, r, c)
+
+        rng = np.random.default_rng(7)
+        for _ in range(30):
+            rows, cols = rng.integers(3, 25, size=2)
+            mines = int(rng.integers(0, rows * cols // 5 + 1))
+            env = MinesweeperEnv(int(rows), int(cols), mines)
+            env._place_mines(int(rng.integers(rows)), int(rng.integers(cols)))
+            for r, c in rng.integers(0, [rows, cols], size=(int(rng.integers(0, 4)), 2)):
+                env.flag_cell(int(r), int(c))
+
+            for r, c in rng.integers(0, [rows, cols], size=(8, 2)):
+                if env.game_over:
+                    break
+                expected_board = env.board.copy()
+                expected_revealed = env.revealed.copy()
+                recursive_reveal(env, expected_board, expected_revealed, int(r), int(c))
+                env.click_cell(int(r), int(c))
+                assert np.array_equal(env.revealed, expected_revealed)
+                assert np.array_equal(env.board, expected_board)
+
+    def test_large_zero_region_reveal(self):
+        env = MinesweeperEnv(200, 200, 10)
+        board, won, done = env.click_cell(100, 100)
+        assert np.sum(env.revealed) > 1000
+        assert np.all(board[env.revealed] == env.adjacent_counts[env.revealed])
+
+    def test_running_counters(self):
+        env = MinesweeperEnv(16, 30, 99)
+        env.click_cell(8, 15)
+        env.flag_cell(0, 0)
+        env.flag_cell(0, 1)
+        env.flag_cell(0, 1)
+        assert env.revealed_count == np.sum(env.revealed)
+        assert env.flagged_count == np.sum(env.flagged)
+        assert env.safe_remaining == 16 * 30 - 99 - np.sum(env.revealed)
+
+    def test_readonly_board_views(self):
+        env = MinesweeperEnv(9, 9, 10, readonly_views=True)
+        version = env.version
+        board, _, _ = env.click_cell(4, 4)
+        assert env.version > version
+        assert not board.flags.writeable
+        assert np.shares_memory(board, env.board)
+        with pytest.raises(ValueError):
+            board[0, 0] = 99
+
+        view = env.board_state()
+        version = env.version
+        r, c = np.argwhere(env.board == -1)[0]
+        env.flag_cell(r, c)
+        assert env.version == version + 1
+        assert np.array_equal(view, env.board)
+
+    def test_version_unchanged_without_mutation(self):
+        env = MinesweeperEnv(9, 9, 10)
+        env.click_cell(4, 4)
+        version = env.version
+        env.board_state()
+        env.click_cell(4, 4)
+        assert env.version == version
+
+    def test_compact_mode_matches_dense(self):
+        dense = MinesweeperEnv(20, 24, 60)
+        compact = MinesweeperEnv(20, 24, 60, compact=True)
+        dense.rng = np.random.default_rng(11)
+        compact.rng = np.random.default_rng(11)
+        assert compact.board.dtype == np.int8
+
+        rng = np.random.default_rng(12)
+        for r, c in rng.integers(0, [20, 24], size=(40, 2)):
+            if rng.random() < 0.2:
+                dense.flag_cell(int(r), int(c))
+                compact.flag_cell(int(r), int(c))
+            else:
+                dense.click_cell(int(r), int(c))
+                compact.click_cell(int(r), int(c))
+            assert np.array_equal(dense.board, compact.board)
+            assert np.array_equal(dense.revealed, np.asarray(compact.revealed))
+            assert compact.revealed.count() == compact.revealed_count
+            assert compact.flagged.count() == compact.flagged_count
+            assert dense.game_state() == compact.game_state()
+            if dense.game_over:
+                break
+
+        assert set(dense.mine_positions) == set(compact.mine_positions)
+        assert len(compact.mine_positions) == 60
+
+    def test_compact_mode_large_board(self):
+        env = MinesweeperEnv(2000, 3000, 1500000, compact=True)
+        env.click_cell(1000, 1500)
+        assert env.mine_positions.count == 1500000
+        assert env.mine_mask.count() == 1500000
+        assert (1000, 1500) not in env.mine_positions
+        assert env.revealed.bits.nbytes == 2000 * 375
+        assert env.board[1000, 1500] == 0
+
+    def test_click_returns_changed_cells(self):
+        env = MinesweeperEnv(16, 30, 60)
+        before = env.board.copy()
+        board, won, done, changes = env.click_cell(8, 15, return_changes=True)
+        changed = np.argwhere(board != before)
+        assert sorted((r, c) for r, c, _ in changes) == sorted(map(tuple, changed.tolist()))
+        for r, c, value in changes:
+            assert board[r, c] == value
+
+        _, _, _, changes = env.click_cell(8, 15, return_changes=True)
+        assert changes == []
+
+    def test_subscribers_receive_changes(self):
+        env = MinesweeperEnv(9, 9, 10)
+        received = []
+        env.subscribe(received.append)
+        env.click_cell(4, 4)
+        assert len(received) == 1
+        assert (4, 4, int(env.board[4, 4])) in received[0]
+
+        r, c = np.argwhere(env.board == -1)[0]
+        assert env.flag_cell(r, c, return_changes=True) == [(r, c, 9)]
+        assert received[-1] == [(r, c, 9)]
+
+        env.unsubscribe(received.append)
+        env.flag_cell(r, c)
+        assert len(received) == 2
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_make_unmake_move_restores_state(self, compact):
+        env = MinesweeperEnv(12, 12, 25, compact=compact)
+        env.click_cell(6, 6)
+        rng = np.random.default_rng(21)
+
+        def state():
+            return (env.board.copy(), np.array(env.revealed), np.array(env.flagged), env.revealed_count,
+                    env.flagged_count, env.game_over, env.won, env.exploded_mine)
+
+        for _ in range(20):
+            before = state()
+            token = env.snapshot()
+            for r, c in rng.integers(0, 12, size=(5, 2)):
+                env.make_move(int(r), int(c), flag=bool(rng.random() < 0.3))
+            env.reveal_all_mines()
+            env.unmake_move(token)
+            after = state()
+            for expected, actual in zip(before, after):
+                assert np.array_equal(expected, actual)
+
+    def test_restore_before_first_click_clears_mines(self):
+        env = MinesweeperEnv(9, 9, 10)
+        token = env.make_move(4, 4)
+        assert env.mines_placed
+        env.unmake_move(token)
+        assert not env.mines_placed
+        assert len(env.mine_positions) == 0
+        assert np.all(env.board == -1)
+        assert env.game_state() == "playing"
+
+    def test_snapshot_journal_is_proportional_to_move(self):
+        env = MinesweeperEnv(30, 30, 150)
+        env.click_cell(15, 15)
+        token = env.snapshot()
+        r, c = np.argwhere(env.board == -1)[0]
+        env.flag_cell(r, c)
+        assert env._journal[-1][1] == [(r, c, 9)]
+        env.restore(token)
+        assert env.board[r, c] == -1
+        env.drop_snapshots()
+        assert env._journal is None
+
+    def test_restoring_outermost_snapshot_stops_journaling(self):
+        env = MinesweeperEnv(9, 9, 10)
+        env.click_cell(4, 4)
+        token = env.make_move(*np.argwhere(env.board == -1)[0], flag=True)
+        assert token == 0
+        env.unmake_move(token)
+        assert env._journal is None
+        env.flag_cell(*np.argwhere(env.board == -1)[0])
+        assert env._journal is None
+
+    def test_restore_publishes_reverted_cells(self):
+        env = MinesweeperEnv(12, 12, 25)
+        env.click_cell(6, 6)
+        before = env.board.copy()
+        mirror = env.board.copy()
+
+        def apply(changes):
+            for row, col, value in changes:
+                mirror[row, col] = value
+
+        env.subscribe(apply)
+        token = env.snapshot()
+        for r, c in np.argwhere(env.board == -1)[:4]:
+            env.make_move(int(r), int(c), flag=bool(r % 2))
+        assert np.array_equal(mirror, env.board) and not np.array_equal(mirror, before)
+        env.restore(token)
+        assert np.array_equal(mirror, before)
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_reveal_all_mines_is_idempotent(self, compact):
+        env = MinesweeperEnv(10, 10, 30, compact=compact)
+        env.click_cell(5, 5)
+        mines = list(env.mine_positions)
+        env.flag_cell(*mines[1])
+        env.click_cell(*mines[0])
+        env.reveal_all_mines()
+        assert env.board[mines[0]] == 11
+        assert all(env.board[m] == 10 for m in mines[1:])
+        assert np.sum(env.board == 10) == 29
+
+        version = env.version
+        env.reveal_all_mines()
+        assert env.version == version
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_reveal_remaining_mines_is_idempotent(self, compact):
+        env = MinesweeperEnv(6, 6, 4, compact=compact)
+        env.click_cell(0, 0)
+        env.flag_cell(*next(iter(env.mine_positions)))
+        for r, c in np.argwhere(env.board == -1):
+            if (r, c) not in env.mine_positions:
+                env.click_cell(r, c)
+        assert env.won
+
+        env.reveal_remaining_mines()
+        assert env.flagged_count == 4
+        assert all(env.board[m] == 9 for m in env.mine_positions)
+        version = env.version
+        env.reveal_remaining_mines()
+        assert env.version == version
+        assert env.flagged_count == 4
+
+    def test_seeded_envs_are_reproducible(self):
+        first = MinesweeperEnv(16, 30, 99, seed=42)
+        second = MinesweeperEnv(16, 30, 99, seed=42)
+        first.click_cell(8, 15)
+        second.click_cell(8, 15)
+        assert np.array_equal(first.mine_mask, second.mine_mask)
+
+        other = MinesweeperEnv(16, 30, 99, seed=43)
+        other.click_cell(8, 15)
+        assert not np.array_equal(first.mine_mask, other.mine_mask)
+
+
+class TestGameStream:
+    def test_stream_is_deterministic(self):
+        layouts = []
+        for _ in range(2):
+            stream = GameStream(7, (9, 9, 10))
+            envs = [env for env, _ in zip(stream, range(5))]
+            for env in envs:
+                env.click_cell(4, 4)
+            layouts.append([env.mine_mask.copy() for env in envs])
+
+        for first, second in zip(*layouts):
+            assert np.array_equal(first, second)
+        assert not np.array_equal(layouts[0][0], layouts[0][1])
+
+    def test_random_access_matches_iteration(self):
+        stream = GameStream(7, (9, 9, 10))
+        iterated = [env for env, _ in zip(stream, range(4))][3]
+        direct = stream.env(3)
+        iterated.click_cell(0, 0)
+        direct.click_cell(0, 0)
+        assert np.array_equal(iterated.mine_mask, direct.mine_mask)
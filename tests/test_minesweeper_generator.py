@@ -0,0 +1,44 @@
+import pytest
+import numpy as np
+from minesweeper_generator import GenerationFailed, NoGuessGenerator
+from minesweeper_corpus import read_corpus
+
+
+class TestNoGuessGenerator:
+    def test_boards_are_solvable_without_relocation(self):
+        generator = NoGuessGenerator(16, 16, 40, seed=1)
+        checker = NoGuessGenerator(16, 16, 40, max_relocations=0)
+        for _ in range(10):
+            mines = generator.generate((8, 8))
+            assert mines.sum() == 40
+            assert not mines[7:10, 7:10].any()
+            assert checker._make_solvable(mines.copy(), (8, 8)) is not None
+
+    def test_relocation_keeps_mine_count(self):
+        generator = NoGuessGenerator(16, 30, 99, seed=2)
+        masks, first_clicks = generator.generate_many(5)
+        assert masks.shape == (5, 16, 30)
+        assert np.all(masks.sum(axis=(1, 2)) == 99)
+        assert np.all(first_clicks == [8, 15])
+        assert generator.stats["boards"] == 5
+
+    def test_seeded_generation_is_reproducible(self):
+        first = NoGuessGenerator(9, 9, 10, seed=3).generate_many(5)[0]
+        second = NoGuessGenerator(9, 9, 10, seed=3).generate_many(5)[0]
+        assert np.array_equal(first, second)
+
+    def test_gives_up_after_max_restarts(self):
+        generator = NoGuessGenerator(8, 8, 40, seed=5, max_restarts=2)
+        with pytest.raises(GenerationFailed):
+            generator.generate((4, 4))
+        assert generator.stats["restarts"] == 3
+
+    def test_corpus_round_trip(self, tmp_path):
+        path = str(tmp_path / "boards.msc")
+        generator = NoGuessGenerator(9, 9, 10, seed=4)
+        generator.write_corpus(path, 8, first_click=(0, 0))
+        masks, first_clicks, mines = read_corpus(path)
+        assert masks.shape == (8, 9, 9)
+        assert mines == 10
+        assert np.all(first_clicks == [0, 0])
+        assert np.all(masks.sum(axis=(1, 2)) == 10)
@@ -0,0 +1,78 @@
+import pytest
+import numpy as np
+from minesweeper_gym import (MinesweeperGymEnv, MinesweeperVectorEnv, SubprocMinesweeperVectorEnv,
+                             NUM_PLANES, encode_planes)
+
+
+def random_actions(masks, rng):
+    return np.array([rng.choice(np.flatnonzero(mask)) for mask in masks])
+
+
+class TestMinesweeperGymEnv:
+    def test_reset_observation(self):
+        env = MinesweeperGymEnv(9, 9, 10, seed=0)
+        obs, info = env.reset()
+        assert obs.shape == (NUM_PLANES, 9, 9)
+        assert obs.dtype == np.int8
+        assert np.all(obs[9] == 1)
+        assert info["action_mask"].all()
+
+    def test_incremental_planes_match_full_encoding(self):
+        env = MinesweeperGymEnv(16, 30, 99, seed=1)
+        obs, info = env.reset()
+        rng = np.random.default_rng(1)
+        done = False
+        while not done:
+            obs, reward, done, truncated, info = env.step(random_actions([info["action_mask"]], rng)[0])
+            assert np.array_equal(obs, encode_planes(env.env.board))
+            assert np.array_equal(info["action_mask"], (env.env.board == -1).reshape(-1))
+        assert reward in (1.0, -1.0)
+
+    def test_first_step_is_safe_and_rewarded(self):
+        env = MinesweeperGymEnv(9, 9, 10, seed=2)
+        env.reset()
+        _, reward, done, _, _ = env.step(40)
+        assert not done
+        assert reward > 0
+
+
+class TestMinesweeperVectorEnv:
+    def test_step_shapes_and_auto_reset(self):
+        env = MinesweeperVectorEnv(32, 9, 9, 10, seed=3)
+        obs, info = env.reset()
+        assert obs.shape == (32, NUM_PLANES, 9, 9)
+        rng = np.random.default_rng(3)
+        finished = 0
+        for _ in range(40):
+            obs, rewards, terminated, truncated, info = env.step(random_actions(info["action_mask"], rng))
+            assert rewards.shape == (32,)
+            assert np.all(rewards[terminated] != 0)
+            finished += terminated.sum()
+            assert np.array_equal(obs, encode_planes(env.batch.board))
+        assert finished > 0
+        assert env.batch.games_finished == finished
+
+    def test_subprocess_workers_share_buffers(self):
+        subproc = SubprocMinesweeperVectorEnv(8, 9, 9, 10, num_workers=2, seed=5)
+        try:
+            obs, info = subproc.reset()
+            assert obs.shape == (8, NUM_PLANES, 9, 9)
+            rng = np.random.default_rng(5)
+            for _ in range(20):
+                obs, rewards, terminated, truncated, info = subproc.step(random_actions(info["action_mask"], rng))
+                hidden = obs[:, 9].reshape(8, -1).astype(bool)
+                assert np.array_equal(hidden, info["action_mask"])
+        finally:
+            subproc.close()
+
+    def test_subproc_reset_seed_reseeds_workers(self):
+        results = []
+        for seed in (1, 2):
+            subproc = SubprocMinesweeperVectorEnv(4, 9, 9, 10, num_workers=2, seed=seed)
+            try:
+                subproc.reset(seed=7)
+                obs, *_ = subproc.step(np.full(4, 40))
+                results.append(obs)
+            finally:
+                subproc.close()
+        assert np.array_equal(results[0], results[1])
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from minesweeper_env import MinesweeperEnv
+from minesweeper_patterns import (
+    PatternTable,
+    build_pattern_table,
+    canonical_windows,
+    cell_codes,
+    default_pattern_table,
+    solve_window,
+)
+from minesweeper_probability import analyze_frontier
+from minesweeper_solver import MinesweeperSolver
+
+
+def one_two_one_board():
+    # 1-2-1 along the top edge of a wider board: the ends of the 2 are mines, the middle is safe
+    board = np.full((6, 7), -1)
+    board[1, 1:6] = [0, 1, 2, 1, 0]
+    board[0, 1] = 0
+    board[0, 5] = 0
+    board[2:, :] = 0
+    board[1, 0] = 0
+    board[1, 6] = 0
+    board[0, 0] = 0
+    board[0, 6] = 0
+    return board
+
+
+class TestSolveWindow:
+    def test_one_two_one(self):
+        board = one_two_one_board()
+        codes = cell_codes(board, np.zeros(board.shape, dtype=bool))
+        window = codes[1:6, 3:8]  # centred on the 2 at (1, 3)
+        safe, mines = solve_window(window)
+        assert safe == 1 << (1 * 5 + 2)
+        assert mines == (1 << (1 * 5 + 1)) | (1 << (1 * 5 + 3))
+
+
+class TestPatternTable:
+    def test_lookup_in_any_orientation(self):
+        board = one_two_one_board()
+        flagged = np.zeros(board.shape, dtype=bool)
+        keys, _, windows = canonical_windows(cell_codes(board, flagged), np.array([[1, 3]]))
+        table = PatternTable({int(keys[0]): solve_window(windows[0])})
+
+        assert table.lookup(board, flagged, [(1, 3)]) == ({(0, 3)}, {(0, 2), (0, 4)})
+        # the same position turned on its side and mirrored hits the same entry
+        turned = np.flip(board.T, axis=0)
+        safe, mines = table.lookup(turned, flagged.T, [(3, 1)])
+        assert safe == {(3, 0)}
+        assert mines == {(2, 0), (4, 0)}
+
+    def test_save_and_load(self, tmp_path):
+        path = str(tmp_path / "patterns.bin")
+        table = PatternTable({5: (1, 2), 1 << 60: (3, 0)})
+        table.save(path)
+        assert PatternTable.load(path).entries == table.entries
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "not_patterns.bin"
+        path.write_bytes(b"MSCORPUS" + bytes(32))
+        with pytest.raises(ValueError):
+            PatternTable.load(str(path))
+
+    def test_build_finds_patterns(self):
+        table = build_pattern_table([(9, 9, 10)], games=3, seed=0)
+        assert len(table) > 0
+
+    def test_shipped_table_agrees_with_enumeration(self):
+        table = default_pattern_table()
+        assert len(table) > 0
+        found = 0
+        for seed in range(20):
+            env = MinesweeperEnv(16, 30, 99, seed=seed)
+            env.click_cell(8, 15)
+            board = env.board_state()
+            solver = MinesweeperSolver(16, 30, 99)
+            solver.observe(board)
+            safe, mines = table.lookup(board, solver._flags, sorted(solver._constraints))
+            constraints = solver._frontier_constraints()
+            if not safe and not mines or len(constraints) > 80:
+                continue
+            exact = analyze_frontier(constraints, 0, 0, max_nodes=None)
+            assert all(exact.probabilities[cell] == 0.0 for cell in safe)
+            assert all(exact.probabilities[cell] == 1.0 for cell in mines)
+            found += len(safe) + len(mines)
+        assert found > 0
+
+
+class TestSolverPatternStage:
+    def test_pattern_stage_answers_before_the_subset_stage(self):
+        board = np.array([
+            [-1, -1, -1],
+            [1, 2, 1],
+            [0, 0, 0],
+        ])
+        solver = MinesweeperSolver(3, 3, 2)
+        assert solver.get_action(board, "playing") == ("click_all", [(0, 1)])
+        assert solver.stats["pattern_hits"] == 1
+        assert solver.stats["guesses_avoided"] == 0
@@ -0,0 +1,315 @@
+import itertools
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from minesweeper_probability import (
+    ComponentCache,
+    EnumerationLimitExceeded,
+    LogBinomialTable,
+    _enumerate_compact,
+    analyze_frontier,
+    canonical_component,
+    compact_component,
+    enumerate_component,
+    frontier_pool,
+    linear_deductions,
+    reduce_frontier,
+    split_components,
+    subset_deductions,
+)
+from minesweeper_patterns import PatternTable
+from minesweeper_solver import MinesweeperSolver
+
+
+def brute_force(constraints, interior, mines_left):
+    cells = sorted({cell for group, _ in constraints for cell in group})
+    weights = dict.fromkeys(cells, 0)
+    total = 0
+    for bits in itertools.product([0, 1], repeat=len(cells)):
+        assignment = dict(zip(cells, bits))
+        if all(sum(assignment[c] for c in group) == value for group, value in constraints):
+            rest = mines_left - sum(bits)
+            if 0 <= rest <= interior:
+                w = math.comb(interior, rest)
+                total += w
+                for cell, bit in assignment.items():
+                    weights[cell] += bit * w
+    return {cell: w / total for cell, w in weights.items()}
+
+
+class TestSplitComponents:
+    def test_disjoint_constraints_are_separate(self):
+        constraints = [(((0, 0), (0, 1)), 1), (((5, 5), (5, 6)), 1), (((0, 1), (0, 2)), 1)]
+        components = split_components(constraints)
+        assert len(components) == 2
+        sizes = sorted(len(cells) for cells, _ in components)
+        assert sizes == [2, 3]
+
+
+class TestEnumerateComponent:
+    def test_counts_by_mine_total(self):
+        cells = [(0, 0), (0, 1), (0, 2)]
+        solution = enumerate_component(cells, [(((0, 0), (0, 1)), 1), (((0, 1), (0, 2)), 1)])
+        # either the middle cell alone, or both ends
+        assert solution.counts == {1: 1, 2: 1}
+        assert solution.cell_counts[1] == [0, 1, 0]
+        assert solution.cell_counts[2] == [1, 0, 1]
+
+    def test_component_deeper_than_recursion_limit(self):
+        # a 1500-cell chain of "one of these two": only the two alternating layouts fit
+        cells = [(0, c) for c in range(1500)]
+        constraints = [((cells[c], cells[c + 1]), 1) for c in range(1499)]
+        solution = enumerate_component(cells, constraints)
+        assert solution.counts == {750: 2}
+        assert solution.cell_counts[750][:4] == [1, 1, 1, 1]
+
+        analysis = analyze_frontier(constraints, 100, 770)
+        assert analysis.exact
+        assert analysis.probabilities[(0, 0)] == pytest.approx(0.5)
+
+    def test_node_limit(self):
+        cells = [(0, c) for c in range(20)]
+        with pytest.raises(EnumerationLimitExceeded):
+            enumerate_component(cells, [(tuple(cells), 10)], max_nodes=100)
+
+
+class TestAnalyzeFrontier:
+    def test_matches_brute_force(self):
+        constraints = [
+            (((1, 0), (1, 1), (1, 2)), 1),
+            (((1, 1), (1, 2), (1, 3)), 2),
+            (((1, 2), (1, 3), (1, 4)), 2),
+            (((5, 5), (5, 6)), 1),
+        ]
+        for interior, mines_left in [(10, 4), (3, 5), (0, 4)]:
+            analysis = analyze_frontier(constraints, interior, mines_left)
+            expected = brute_force(constraints, interior, mines_left)
+            for cell, p in expected.items():
+                assert analysis.probabilities[cell] == pytest.approx(p)
+
+    def test_finds_certain_cells_the_basic_rules_miss(self):
+        # the classic 1-2-1: the ends of the 2 are mines, the cell under the 2 is safe
+        board = np.array([
+            [-1, -1, -1],
+            [1, 2, 1],
+            [0, 0, 0],
+        ])
+        solver = MinesweeperSolver(3, 3, 2, pattern_table=PatternTable())
+        safe, mines = solver._analyze_constraints(board)
+        assert not safe and not mines
+        analysis = solver.analyze_frontier(board)
+        assert analysis.safe == [(0, 1)]
+        assert sorted(analysis.mines) == [(0, 0), (0, 2)]
+        # the subset stage gets there first, without enumerating
+        assert solver.get_action(board, "playing") == ("flag_all", [(0, 0), (0, 2)])
+        assert solver.stats["guesses_avoided"] == 1
+
+    def test_global_count_decides_between_layouts(self):
+        # either the middle cell is a mine, or both ends are
+        constraints = [(((0, 0), (0, 1)), 1), (((0, 1), (0, 2)), 1)]
+        analysis = analyze_frontier(constraints, 0, 1)
+        assert analysis.mines == [(0, 1)]
+        assert sorted(analysis.safe) == [(0, 0), (0, 2)]
+        analysis = analyze_frontier(constraints, 0, 2)
+        assert analysis.safe == [(0, 1)]
+        # with a big interior the two-mine layout leaves fewer ways to place the rest
+        analysis = analyze_frontier(constraints, 20, 3)
+        assert analysis.probabilities[(0, 1)] == pytest.approx(190 / (190 + 20))
+
+    def test_contradictory_board_uses_fallback(self):
+        constraints = [(((0, 0),), 2)]
+        analysis = analyze_frontier(constraints, 0, 1, fallback=lambda group: {(0, 0): 1.0})
+        assert analysis.probabilities == {(0, 0): 1.0}
+        assert analysis.safe == [] and analysis.mines == []
+
+    def test_interior_probability(self):
+        constraints = [(((0, 0), (0, 1)), 1), (((0, 1), (0, 2)), 1)]
+        analysis = analyze_frontier(constraints, 20, 3)
+        # layouts: middle mine (190 interior fillings, 2 left) or both ends (20 fillings, 1 left)
+        expected = (190 * 2 + 20 * 1) / (210 * 20)
+        assert analysis.interior_probability == pytest.approx(expected)
+        assert analyze_frontier(constraints, 4, 1).interior_probability == 0.0
+
+    def test_expert_plus_board_does_not_overflow(self):
+        constraints = [(((0, 0), (0, 1)), 1), (((0, 1), (0, 2)), 1)]
+        analysis = analyze_frontier(constraints, 500 * 500, 50000)
+        assert 0 < analysis.probabilities[(0, 1)] < 1
+        assert analysis.interior_probability == pytest.approx(0.2, abs=1e-3)
+
+
+class TestLogBinomialTable:
+    def test_matches_math_comb(self):
+        table = LogBinomialTable(size=8)
+        for n, k in [(5, 2), (30, 15), (480, 99), (3000, 700)]:
+            assert table.log_comb(n, k) == pytest.approx(math.log(math.comb(n, k)))
+        assert table.log_comb(5, 6) == -math.inf
+        assert len(table.log_factorial) > 3000
+
+
+class TestReduceFrontier:
+    def test_one_two_pattern(self):
+        # A = {x, y} holds 1, B = {x, y, z} holds 2: z is a mine
+        constraints = [(((0, 0), (0, 1)), 1), (((0, 0), (0, 1), (0, 2)), 2)]
+        assert subset_deductions(constraints) == (set(), {(0, 2)})
+        # B holding 1 instead makes z safe
+        constraints = [(((0, 0), (0, 1)), 1), (((0, 0), (0, 1), (0, 2)), 1)]
+        assert subset_deductions(constraints) == ({(0, 2)}, set())
+
+    def test_elimination_finds_what_pairs_miss(self):
+        # a+b = 1, b+c = 1, c+d = 1, a+d+e = 2: only the chain together pins e to a mine
+        a, b, c, d, e = [(0, i) for i in range(5)]
+        constraints = [((a, b), 1), ((b, c), 1), ((c, d), 1), ((a, d, e), 2)]
+        assert subset_deductions(constraints) == (set(), set())
+        safe, mines = linear_deductions(constraints)
+        assert e in mines
+        assert safe | mines <= {a, b, c, d, e}
+
+    def test_agrees_with_enumeration_on_real_boards(self):
+        from minesweeper_env import MinesweeperEnv
+        found = 0
+        for seed in range(30):
+            env = MinesweeperEnv(16, 30, 99, seed=seed)
+            env.click_cell(8, 15)
+            solver = MinesweeperSolver(16, 30, 99)
+            solver.observe(env.board_state())
+            constraints = solver._frontier_constraints()
+            if not constraints or len(constraints) > 60:
+                continue
+            safe, mines = reduce_frontier(constraints)
+            exact = analyze_frontier(constraints, 0, 0, max_nodes=None)
+            for cell in safe:
+                assert exact.probabilities[cell] == 0.0
+            for cell in mines:
+                assert exact.probabilities[cell] == 1.0
+            found += len(safe) + len(mines)
+        assert found > 0
+
+
+def asymmetric_constraints(transform=lambda r, c: (r, c), shift=(0, 0)):
+    def place(r, c):
+        r, c = transform(r, c)
+        return (r + shift[0], c + shift[1])
+    groups = [([(0, 0), (0, 1), (0, 2)], 1), ([(0, 1), (0, 2), (1, 2)], 2), ([(1, 2), (2, 2)], 1)]
+    return [(tuple(place(*cell) for cell in cells), value) for cells, value in groups]
+
+
+class TestComponentCache:
+    def test_canonical_key_ignores_symmetry_and_position(self):
+        base = asymmetric_constraints()
+        key = canonical_component(sorted({c for g, _ in base for c in g}), base)[0]
+        for transform in [lambda r, c: (c, -r), lambda r, c: (-r, c), lambda r, c: (-c, -r)]:
+            moved = asymmetric_constraints(transform, shift=(7, 9))
+            cells = sorted({c for g, _ in moved for c in g})
+            assert canonical_component(cells, moved)[0] == key
+
+    def test_hit_maps_solution_back_to_the_board(self):
+        cache = ComponentCache()
+        base = asymmetric_constraints()
+        analyze_frontier(base, 10, 3, cache=cache)
+        assert (cache.hits, cache.misses) == (0, 1)
+
+        rotated = asymmetric_constraints(lambda r, c: (c, -r), shift=(4, 6))
+        cached = analyze_frontier(rotated, 10, 3, cache=cache)
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert cache.hit_rate == 0.5
+        direct = analyze_frontier(rotated, 10, 3)
+        assert cached.probabilities == pytest.approx(direct.probabilities)
+        assert sorted(cached.safe) == sorted(direct.safe)
+        assert sorted(cached.mines) == sorted(direct.mines)
+
+    def test_evicts_least_recently_used(self):
+        cache = ComponentCache(max_bytes=3000)
+        for width in range(1, 10):
+            constraints = [(tuple((0, c) for c in range(width)), 1)]
+            analyze_frontier(constraints, 0, 1, cache=cache)
+        assert cache.bytes <= 3000
+        assert 0 < len(cache.entries) < 9
+        # the newest shape survived, the oldest did not
+        assert analyze_frontier([(tuple((0, c) for c in range(9)), 1)], 0, 1, cache=cache)
+        assert cache.hits == 1
+        analyze_frontier([(((0, 0),), 1)], 0, 1, cache=cache)
+        assert cache.hits == 1
+
+    def test_persists_between_runs(self, tmp_path):
+        path = str(tmp_path / "components.json")
+        cache = ComponentCache(path=path)
+        analyze_frontier(asymmetric_constraints(), 10, 3, cache=cache)
+        cache.save()
+
+        reloaded = ComponentCache(path=path)
+        assert len(reloaded.entries) == 1
+        assert reloaded.bytes == cache.bytes
+        assert list(reloaded.entries.items()) == list(cache.entries.items())
+        analyze_frontier(asymmetric_constraints(lambda r, c: (-r, -c)), 10, 3, cache=reloaded)
+        assert reloaded.hits == 1
+
+    def test_cache_file_is_plain_json(self, tmp_path):
+        import json
+        path = str(tmp_path / "components.json")
+        cache = ComponentCache(path=path)
+        analyze_frontier(band(0, 6), 20, 10, cache=cache)
+        cache.save()
+        with open(path) as f:
+            assert len(json.load(f)) == len(cache.entries)
+
+
+def band(offset, length, value=2):
+    # a strip of numbers over two unknown rows, many consistent layouts
+    constraints = []
+    for c in range(length):
+        cells = tuple((offset + r, c + d) for r in (0, 1) for d in (-1, 0, 1) if 0 <= c + d < length)
+        constraints.append((cells, value))
+    return constraints
+
+
+class RecordingPool(ThreadPoolExecutor):
+    submitted = 0
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+class TestParallelEnumeration:
+    def test_compact_round_trip(self):
+        constraints = band(0, 6)
+        cells = sorted({c for g, _ in constraints for c in g})
+        counts, cell_counts = _enumerate_compact(compact_component(cells, constraints), None)
+        direct = enumerate_component(cells, constraints)
+        assert counts == direct.counts
+        assert cell_counts == direct.cell_counts
+
+    def test_pool_matches_serial(self):
+        constraints = band(0, 12) + band(10, 12) + band(20, 3) + [(((40, 0), (40, 1)), 1)]
+        serial = analyze_frontier(constraints, 100, 40)
+        pool = frontier_pool(2)
+        assert frontier_pool(2) is pool
+        parallel = analyze_frontier(constraints, 100, 40, executor=pool, parallel_threshold=10)
+        assert parallel.probabilities == serial.probabilities
+        assert sorted(parallel.safe) == sorted(serial.safe)
+        assert parallel.interior_probability == serial.interior_probability
+
+    def test_every_large_component_submitted(self):
+        constraints = band(0, 12) + band(10, 12) + band(20, 12)
+        with RecordingPool(max_workers=2) as pool:
+            analyze_frontier(constraints, 100, 40, executor=pool, parallel_threshold=10)
+            assert pool.submitted == 3
+
+    def test_single_large_component_submitted(self):
+        # the small ones are enumerated here while the pool works on the large one
+        constraints = band(0, 12) + band(10, 3) + [(((40, 0), (40, 1)), 1)]
+        serial = analyze_frontier(constraints, 100, 20)
+        with RecordingPool(max_workers=2) as pool:
+            parallel = analyze_frontier(constraints, 100, 20, executor=pool, parallel_threshold=10)
+            assert pool.submitted == 1
+        assert parallel.probabilities == serial.probabilities
+
+    def test_pool_limit_falls_back(self):
+        constraints = band(0, 12) + band(10, 12)
+        analysis = analyze_frontier(constraints, 100, 40, max_nodes=10, fallback=lambda group: {
+            cell: 0.5 for cells, _ in group for cell in cells}, executor=frontier_pool(2), parallel_threshold=10)
+        assert not analysis.exact
+        assert set(analysis.probabilities.values()) == {0.5}
@@ -0,0 +1,93 @@
+import time
+
+import numpy as np
+import pytest
+
+from minesweeper_env import neighbour_sum
+from minesweeper_probability import analyze_frontier
+from minesweeper_sampling import FrontierSampler, local_density, sample_frontier
+from minesweeper_patterns import PatternTable
+from minesweeper_solver import MinesweeperSolver
+
+
+def lattice_constraints(seed, n):
+    # every other cell revealed over a 30% mine field: one tangled component
+    rng = np.random.default_rng(seed)
+    mines = rng.random((n, n)) < 0.3
+    counts = neighbour_sum(mines.astype(np.int64))
+    r, c = np.indices((n, n))
+    revealed = (r % 2 == 1) & (c % 2 == 1) & ~mines & (counts > 0)
+    board = np.where(revealed, counts, -1)
+    solver = MinesweeperSolver(n, n, int(mines.sum()), pattern_table=PatternTable())
+    solver.observe(board)
+    return solver._frontier_constraints(), int(solver._interior_mask(board).sum()), solver._mines_left(board)
+
+
+class TestFrontierSampler:
+    def test_sums_track_state(self):
+        constraints, interior, mines_left = lattice_constraints(0, 8)
+        sampler = FrontierSampler(constraints, interior, mines_left, chains=32, seed=0)
+        for _ in range(5):
+            sampler.sweep(2.0)
+        index = {cell: i for i, cell in enumerate(sampler.cells)}
+        order = [constraint for _, group in sampler.components for constraint in group]
+        for c, (group, _) in enumerate(order):
+            assert (sampler.sums[c] == sampler.state[[index[cell] for cell in group]].sum(axis=0)).all()
+        assert (sampler.mines == sampler.state.sum(axis=0)).all()
+
+    def test_colour_classes_touch_disjoint_numbers(self):
+        constraints, interior, mines_left = lattice_constraints(1, 8)
+        sampler = FrontierSampler(constraints, interior, mines_left, chains=4, seed=0)
+        assert sorted(np.concatenate(sampler.classes).tolist()) == list(range(len(sampler.cells)))
+        for cells in sampler.classes:
+            numbers = sampler.membership[cells]
+            numbers = numbers[numbers < sampler.dummy]
+            assert len(numbers) == len(set(numbers.tolist()))
+        for pairs in sampler.pair_classes:
+            numbers = [set(sampler.membership[pair].ravel().tolist()) - {sampler.dummy} for pair in pairs]
+            assert sum(map(len, numbers)) == len(set().union(*numbers))
+
+
+class TestSampleFrontier:
+    def test_matches_exact(self):
+        for seed in range(2):
+            constraints, interior, mines_left = lattice_constraints(seed, 6)
+            exact = analyze_frontier(constraints, interior, mines_left, max_nodes=None)
+            sampled = sample_frontier(constraints, interior, mines_left, seed=seed)
+            assert not sampled.exact and not sampled.safe and not sampled.mines
+            inside = 0
+            for cell, p in exact.probabilities.items():
+                assert sampled.probabilities[cell] == pytest.approx(p, abs=0.06)
+                low, high = sampled.intervals[cell]
+                inside += low <= p <= high
+            assert inside >= 0.8 * len(exact.probabilities)
+            assert sampled.interior_probability == pytest.approx(exact.interior_probability, abs=0.03)
+
+    def test_global_mine_count(self):
+        # two mines for five cells with nowhere else to go: one in each group
+        constraints = [(((0, 0), (0, 1)), 1), (((5, 0), (5, 1), (5, 2)), 1)]
+        analysis = sample_frontier(constraints, 0, 2, tolerance=0.0, max_sweeps=60, seed=0)
+        assert analysis.probabilities[(0, 0)] == pytest.approx(0.5, abs=0.03)
+        assert analysis.probabilities[(5, 2)] == pytest.approx(1 / 3, abs=0.03)
+        assert analysis.interior_probability is None
+
+    def test_stops_once_best_cell_separated(self):
+        # (0, 0) is next to a 0-like corner: far safer than anything else
+        constraints = [(((0, 0), (0, 1), (0, 2), (0, 3)), 3), (((0, 3), (0, 4)), 1)]
+        analysis = sample_frontier(constraints, 20, 5, seed=0)
+        assert analysis.sweeps < 200
+        best = min(analysis.probabilities, key=analysis.probabilities.get)
+        assert best == (0, 4)
+
+    def test_past_deadline_returns_local_density(self):
+        constraints, interior, mines_left = lattice_constraints(0, 8)
+        analysis = sample_frontier(constraints, interior, mines_left, deadline=time.perf_counter() - 1)
+        assert analysis.timed_out and analysis.sweeps == 0
+        assert analysis.probabilities == local_density(constraints)
+        assert set(analysis.intervals.values()) == {(0.0, 1.0)}
+
+    def test_empty_frontier(self):
+        analysis = sample_frontier([], 10, 3)
+        assert analysis.probabilities == {}
+        assert analysis.interior_probability == pytest.approx(0.3)
+        assert not analysis.timed_out
@@ -1,6 +1,6 @@
 import pytest
 import numpy as np
-from minesweeper_solver import MinesweeperSolver
+from minesweeper_solver import MinesweeperSolver, basic_deduction_masks
 
 
 class TestMinesweeperSolver:
@@ -125,7 +125,9 @@ class TestMinesweeperSolver:
         ])
         action = solver.get_action(board, "playing")
         assert action is not None
-        assert action[0] in ["click", "flag_all"]
+        # the only mine touches the 1, so every cell away from it is safe
+        assert action[0] == "click_all"
+        assert sorted(action[1]) == [(0, 2), (1, 2), (2, 0), (2, 1), (2, 2)]
 
     def test_get_action_won(self):
         solver = MinesweeperSolver(3, 3, 1)
@@ -228,3 +230,223 @@ class TestMinesweeperSolver:
         assert action is not None
         assert action[0] == "click"
         assert action[1] in [(0, 2), (1, 1), (2, 0), (2, 1)]
+
+
+class TestIncrementalConstraints:
+    def play(self, seed, use_changes):
+        from minesweeper_env import MinesweeperEnv
+        env = MinesweeperEnv(16, 30, 99, seed=seed)
+        solver = MinesweeperSolver(16, 30, 99, seed=seed)
+        pending = []
+        env.subscribe(pending.extend)
+        env.click_cell(8, 15)
+        while env.game_state() == "playing":
+            board = env.board_state()
+            fresh = MinesweeperSolver(16, 30, 99)
+            fresh.flagged = set(solver.flagged)
+            fresh.observe(board)
+            action = solver.get_action(board, "playing", changes=pending if use_changes else None)
+            assert solver._frontier_constraints() == fresh._frontier_constraints()
+            pending.clear()
+            if action is None:
+                break
+            kind, data = action
+            cells = [data] if kind == "click" else data
+            for row, col in cells:
+                if kind == "flag_all":
+                    if (row, col) not in solver.flagged:
+                        env.flag_cell(row, col)
+                        solver.update_flag(row, col, True)
+                else:
+                    env.click_cell(row, col)
+        return solver
+
+    def test_matches_fresh_rebuild_with_diffs(self):
+        for seed in range(3):
+            self.play(seed, use_changes=False)
+
+    def test_matches_fresh_rebuild_with_changes(self):
+        for seed in range(3):
+            self.play(seed, use_changes=True)
+
+    def test_updates_only_around_changes(self):
+        solver = MinesweeperSolver(50, 50, 10)
+        board = np.full((50, 50), -1)
+        board[:, :25] = 1
+        solver.get_action(board, "playing")
+        before = solver.stats["constraint_updates"]
+        board[10, 25] = 2
+        solver.get_action(board, "playing", changes=[(10, 25, 2)])
+        assert solver.stats["constraint_updates"] - before <= 9
+
+    def test_flag_refreshes_only_its_neighbours(self):
+        solver = MinesweeperSolver(50, 50, 10)
+        board = np.full((50, 50), -1)
+        board[:, :25] = 1
+        for row in range(0, 50, 2):
+            solver.update_flag(row, 25, True)
+        solver.observe(board)
+        assert solver._constraints[(1, 24)] == (((1, 25),), -1)
+
+        before = solver.stats["constraint_updates"]
+        solver.update_flag(0, 25, False)
+        solver.update_flag(5, 25, True)
+        solver.observe(board)
+        assert solver.stats["constraint_updates"] - before == 5
+        assert solver._constraints[(1, 24)] == (((0, 25), (1, 25)), 0)
+
+    def test_flag_mask_follows_update_flag(self):
+        solver = MinesweeperSolver(9, 9, 10)
+        board = np.full((9, 9), -1)
+        board[4, 4] = 2
+        solver.update_flag(3, 3, True)
+        solver.get_action(board, "playing")
+        mask = solver._flags
+        solver.update_flag(3, 3, False)
+        solver.update_flag(5, 5, True)
+        solver.get_action(board, "playing")
+        assert solver._flags is mask
+        assert np.array_equal(np.argwhere(mask), [[5, 5]])
+
+
+def loop_deductions(solver, board):
+    # the original per-number loop, kept as the reference for the vectorized pass
+    safe_cells, mine_cells = set(), set()
+    for row, col in np.argwhere((board >= 0) & (board <= 8)):
+        unrevealed = []
+        flagged_count = 0
+        for nr, nc in solver.get_neighbours(row, col):
+            if (nr, nc) in solver.flagged or board[nr, nc] == 9:
+                flagged_count += 1
+            elif board[nr, nc] == -1:
+                unrevealed.append((nr, nc))
+        remaining = board[row, col] - flagged_count
+        if flagged_count == board[row, col] and unrevealed:
+            safe_cells.update(unrevealed)
+        elif remaining > 0 and len(unrevealed) == remaining:
+            mine_cells.update(unrevealed)
+    return safe_cells, mine_cells
+
+
+class TestBasicDeductionMasks:
+    def test_matches_loop_on_random_boards(self):
+        from minesweeper_env import MinesweeperEnv
+        rng = np.random.default_rng(0)
+        for seed in range(20):
+            env = MinesweeperEnv(16, 30, 99, seed=seed)
+            env.click_cell(8, 15)
+            for row, col in rng.integers(0, (16, 30), size=(rng.integers(0, 40), 2)):
+                if not env.game_over:
+                    env.click_cell(int(row), int(col))
+            board = env.board_state()
+            solver = MinesweeperSolver(16, 30, 99)
+            # some flags on the board, some only known to the solver, a few of them wrong
+            for row, col in np.argwhere(board == -1)[::7]:
+                board[row, col] = 9
+            for row, col in np.argwhere(board == -1)[::11]:
+                solver.update_flag(int(row), int(col), True)
+            safe, mines = solver._analyze_constraints(board)
+            assert len(safe) == len(set(safe)) and len(mines) == len(set(mines))
+            assert (set(safe), set(mines)) == loop_deductions(solver, board)
+
+    def test_masks_on_small_board(self):
+        board = np.array([
+            [1, 1, 0],
+            [-1, 1, 0],
+            [-1, 1, 0],
+        ])
+        flagged = np.zeros(board.shape, dtype=bool)
+        safe, mines = basic_deduction_masks(board, flagged)
+        assert np.argwhere(mines).tolist() == [[1, 0]]
+        assert not safe.any()
+
+        flagged[1, 0] = True
+        safe, mines = basic_deduction_masks(board, flagged)
+        assert np.argwhere(safe).tolist() == [[2, 0]]
+        assert not mines.any()
+
+
+class TestAnytime:
+    def hard_board(self, seed=0, n=20):
+        # every other cell revealed, so the frontier is one large tangled component
+        from minesweeper_env import neighbour_sum
+        rng = np.random.default_rng(seed)
+        mines = rng.random((n, n)) < 0.3
+        counts = neighbour_sum(mines.astype(np.int64))
+        r, c = np.indices((n, n))
+        revealed = (r % 2 == 1) & (c % 2 == 1) & ~mines & (counts > 0)
+        return np.where(revealed, counts, -1), int(mines.sum())
+
+    def solver(self, board, mines):
+        from minesweeper_patterns import PatternTable
+        return MinesweeperSolver(*board.shape, mines, pattern_table=PatternTable())
+
+    def test_stage_reported(self):
+        solver = MinesweeperSolver(3, 3, 1)
+        board = np.array([[0, 1, -1], [0, 1, -1], [0, 1, 1]])
+        solver.get_action(board, "playing")
+        assert solver.last_stage == "rules"
+        assert solver.stats["stage_rules"] == 1
+
+    def test_without_deadline_is_exact(self):
+        board, mines = self.hard_board(n=6)
+        solver = self.solver(board, mines)
+        solver.get_action(board, "playing")
+        assert solver.last_stage == "exact"
+
+    def test_over_budget_component_is_sampled(self):
+        from minesweeper_backends import ExactBackend, SamplingBackend
+        board, mines = self.hard_board(n=8)
+        exact = ExactBackend(max_nodes=1000, sampler=SamplingBackend(budget=0.5, seed=0))
+        solver = MinesweeperSolver(8, 8, mines, backends=[(None, exact)])
+        kind, cell = solver.get_action(board, "playing")
+        assert solver.last_stage == "sampling"
+        assert kind == "click" and board[cell] == -1
+        analysis = solver.analyze_frontier(board)
+        assert set(analysis.intervals) == set(analysis.probabilities)
+
+    def test_deadline_bounds_latency(self):
+        import time
+        board, mines = self.hard_board()
+        for deadline_ms in (0, 5, 50):
+            solver = self.solver(board, mines)
+            start = time.perf_counter()
+            kind, data = solver.get_action(board, "playing", deadline_ms=deadline_ms)
+            assert time.perf_counter() - start < deadline_ms / 1000 + 0.1
+            assert solver.last_stage in ("heuristic", "partial", "subset", "exact", "sampling")
+            cells = [data] if kind == "click" else data
+            assert all(board[row, col] == -1 for row, col in cells)
+
+    def test_deadline_holds_on_large_board(self):
+        import time
+        board, mines = self.hard_board(n=200)
+        for deadline_ms in (0, 20, 50):
+            solver = MinesweeperSolver(200, 200, mines)
+            # the first call starts from scratch, the second from what the first built
+            for _ in range(2):
+                start = time.perf_counter()
+                kind, data = solver.get_action(board, "playing", deadline_ms=deadline_ms)
+                assert time.perf_counter() - start < deadline_ms / 1000 + 0.05
+                cells = [data] if kind == "click" else data
+                assert all(board[row, col] == -1 for row, col in cells)
+
+    def test_heuristic_grid_matches_constraint_heuristic(self):
+        from minesweeper_backends import heuristic_probabilities
+        from minesweeper_solver import heuristic_probability_grid
+        board, mines = self.hard_board(n=12)
+        solver = self.solver(board, mines)
+        solver.observe(board)
+        grid = heuristic_probability_grid(board, solver._flags, mines)
+        probabilities = heuristic_probabilities(solver._frontier_constraints())
+        for cell, p in probabilities.items():
+            assert grid[cell] == pytest.approx(p)
+        interior = solver._interior_mask(board)
+        expected = (mines - sum(probabilities.values())) / np.count_nonzero(interior)
+        assert np.allclose(grid[interior], min(1.0, max(0.0, expected)))
+        assert np.isinf(grid[board != -1]).all()
+
+    def test_expired_deadline_falls_back_to_heuristic(self):
+        board, mines = self.hard_board()
+        solver = self.solver(board, mines)
+        solver.get_action(board, "playing", deadline_ms=0)
+        assert solver.last_stage == "heuristic"
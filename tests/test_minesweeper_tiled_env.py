@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+from minesweeper_tiled_env import TiledMinesweeperEnv
+from minesweeper_env import MinesweeperEnv, MinePositions, neighbour_sum, label_zero_regions
+
+
+def dense_copy(tiled):
+    mine_mask = np.zeros((tiled.rows, tiled.cols), dtype=bool)
+    for tile_row in range(tiled.tile_rows):
+        for tile_col in range(tiled.tile_cols):
+            mines = tiled._tile_mines(tile_row, tile_col)
+            top, left = tile_row * tiled.tile_size, tile_col * tiled.tile_size
+            mine_mask[top:top + mines.shape[0], left:left + mines.shape[1]] = mines
+
+    env = MinesweeperEnv(tiled.rows, tiled.cols, int(mine_mask.sum()))
+    env.mine_mask = mine_mask
+    env.adjacent_counts = neighbour_sum(mine_mask).astype(np.int8)
+    env.zero_labels, env.zero_regions = label_zero_regions((env.adjacent_counts == 0) & ~mine_mask)
+    env.mine_positions = MinePositions(mine_mask, env.mines)
+    env.mines_placed = True
+    return env
+
+
+class TestTiledMinesweeperEnv:
+    def test_first_click_safe(self):
+        env = TiledMinesweeperEnv(1000, 1000, 300000, seed=3, tile_size=32)
+        won, done = env.click_cell(500, 500)
+        assert not done
+        assert env.cell_value(500, 500) == 0
+
+    def test_matches_dense_env_across_tile_borders(self):
+        rng = np.random.default_rng(5)
+        for seed in range(5):
+            tiled = TiledMinesweeperEnv(50, 70, 350, seed=seed, tile_size=16)
+            first = tuple(int(v) for v in rng.integers(0, [50, 70]))
+            tiled.click_cell(*first)
+            dense = dense_copy(tiled)
+            dense.click_cell(*first)
+
+            for r, c in rng.integers(0, [50, 70], size=(30, 2)):
+                if rng.random() < 0.2:
+                    tiled.flag_cell(int(r), int(c))
+                    dense.flag_cell(int(r), int(c))
+                else:
+                    tiled.click_cell(int(r), int(c))
+                    dense.click_cell(int(r), int(c))
+                assert np.array_equal(tiled.board_window(0, 0, 50, 70), dense.board)
+                assert tiled.revealed_count == dense.revealed_count
+                assert tiled.game_state() == dense.game_state()
+                if dense.game_over:
+                    break
+
+    def test_memory_follows_explored_area(self):
+        env = TiledMinesweeperEnv(100000, 100000, 1600000000, seed=1, tile_size=64)
+        env.click_cell(50000, 50000)
+        assert len(env.tiles) <= 4
+        assert len(env._mine_tiles) <= 16
+        assert env.board_window(0, 0, 4, 4).tolist() == [[-1] * 4] * 4
+
+    def test_small_board_can_be_won(self):
+        env = TiledMinesweeperEnv(12, 12, 10, seed=2, tile_size=5)
+        env.click_cell(6, 6)
+        dense = dense_copy(env)
+        for r, c in np.argwhere(~dense.mine_mask):
+            env.click_cell(int(r), int(c))
+        assert env.game_state() == "won"
+
+    def test_flag_blocks_click(self):
+        env = TiledMinesweeperEnv(100, 100, 1500, seed=4, tile_size=32)
+        env.click_cell(50, 50)
+        r, c = np.argwhere(env.board_window(0, 0, 100, 100) == -1)[0]
+        env.flag_cell(int(r), int(c))
+        assert env.cell_value(int(r), int(c)) == 9
+        assert env.click_cell(int(r), int(c)) == (False, False)
+        assert env.flagged_count == 1
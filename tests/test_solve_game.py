@@ -33,6 +33,17 @@ class TestSolveGameSimulator:
         won = solve_game_simulator(2, 2, 1, max_moves=5, show_board=False)
         assert isinstance(won, bool)
 
+    def test_solve_game_seeded_is_reproducible(self):
+        results = [solve_game_simulator(16, 30, 99, seed=s) for s in range(5)]
+        assert results == [solve_game_simulator(16, 30, 99, seed=s) for s in range(5)]
+
+    def test_solve_game_saves_component_cache(self, tmp_path):
+        from minesweeper_probability import ComponentCache
+        path = str(tmp_path / "components.json")
+        for s in range(3):
+            solve_game_simulator(16, 30, 99, seed=s, cache_path=path)
+        assert len(ComponentCache(path=path).entries) > 0
+
 
 class TestGameStateFunctions:
     def test_game_state_playing(self):